@@ -0,0 +1,150 @@
+"""
+Upload Admission - Global/per-user upload concurrency limits and a disk space guard
+
+Every request that writes an upload body to UPLOAD_DIR goes through
+upload_scheduler.admit() before the body is read:
+    * a user with UPLOAD_MAX_PER_USER uploads in progress gets 429
+    * the projected disk usage (used + bytes already admitted + Content-Length)
+      must stay under UPLOAD_DISK_MAX_USAGE of the volume, else 507
+    * at most UPLOAD_MAX_CONCURRENT bodies stream at once; up to
+      UPLOAD_MAX_QUEUE more wait (FIFO) for UPLOAD_QUEUE_TIMEOUT_SECONDS, the
+      rest get 503 with Retry-After
+"""
+
+import asyncio
+import os
+import shutil
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, Request, status
+
+from app.config import get_settings
+from app.metrics import Histogram, register_metrics
+
+settings = get_settings()
+
+
+class UploadScheduler:
+    def __init__(self, max_active: int, max_queue: int, per_user: int, queue_timeout: float):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.per_user = per_user
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()  # only for stats readers on other threads
+        self._waiters = deque()
+        self._by_user = defaultdict(int)
+        self.active = 0
+        self.bytes_in_flight = 0
+        self.admitted = 0
+        self.rejected = {"per_user": 0, "disk": 0, "queue_full": 0, "queue_timeout": 0, "too_large": 0}
+        self.wait_ms = Histogram()
+
+    def _reject(self, reason: str, status_code: int, detail: str, headers: dict = None):
+        with self._lock:
+            self.rejected[reason] += 1
+        raise HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+    @staticmethod
+    def expected_bytes(request: Request) -> int:
+        """Content-Length if the client sent one, else assume the largest allowed upload"""
+        try:
+            return max(int(request.headers["content-length"]), 0)
+        except (KeyError, ValueError):
+            return settings.MAX_UPLOAD_SIZE
+
+    def _check_disk(self, expected: int):
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        usage = shutil.disk_usage(settings.UPLOAD_DIR)
+        projected = usage.used + self.bytes_in_flight + expected
+        if projected > usage.total * settings.UPLOAD_DISK_MAX_USAGE:
+            self._reject("disk", status.HTTP_507_INSUFFICIENT_STORAGE, "Insufficient storage for upload")
+
+    async def _acquire(self):
+        if self.active < self.max_active and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject(
+                "queue_full", status.HTTP_503_SERVICE_UNAVAILABLE, "Upload capacity reached, please retry",
+                headers={"Retry-After": str(int(self.queue_timeout) or 1)},
+            )
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # A releasing upload hands its slot straight to the waiter (active stays the same)
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject(
+                "queue_timeout", status.HTTP_503_SERVICE_UNAVAILABLE, "Upload capacity reached, please retry",
+                headers={"Retry-After": str(int(self.queue_timeout) or 1)},
+            )
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # slot was handed over just as we were cancelled
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def _release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def admit(self, request: Request, user_id: str):
+        expected = self.expected_bytes(request)
+        if expected > settings.MAX_UPLOAD_SIZE:
+            self._reject("too_large", status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "File too large")
+        if self._by_user[user_id] >= self.per_user:
+            self._reject("per_user", status.HTTP_429_TOO_MANY_REQUESTS, "Too many concurrent uploads")
+        self._check_disk(expected)
+
+        self._by_user[user_id] += 1
+        start = time.perf_counter()
+        try:
+            await self._acquire()
+            self.wait_ms.observe((time.perf_counter() - start) * 1000)
+            with self._lock:
+                self.bytes_in_flight += expected
+                self.admitted += 1
+            try:
+                yield
+            finally:
+                with self._lock:
+                    self.bytes_in_flight -= expected
+                self._release()
+        finally:
+            self._by_user[user_id] -= 1
+            if not self._by_user[user_id]:
+                del self._by_user[user_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrent": self.max_active,
+                "max_queue": self.max_queue,
+                "max_per_user": self.per_user,
+                "active": self.active,
+                "queue_depth": len(self._waiters),
+                "bytes_in_flight": self.bytes_in_flight,
+                "uploading_users": len(self._by_user),
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "queue_wait_ms": self.wait_ms.snapshot(),
+            }
+
+
+upload_scheduler = UploadScheduler(
+    settings.UPLOAD_MAX_CONCURRENT,
+    settings.UPLOAD_MAX_QUEUE,
+    settings.UPLOAD_MAX_PER_USER,
+    settings.UPLOAD_QUEUE_TIMEOUT_SECONDS,
+)
+register_metrics("uploads", upload_scheduler.stats)
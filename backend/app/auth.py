@@ -1,7 +1,17 @@
 """
 Authentication Utilities - JWT, Password Hashing, Dependencies
+
+The authenticated user (role, username, is_active) is cached per process for
+PRINCIPAL_CACHE_TTL_SECONDS. A change committed through this process's sessions
+drops the entry at once; other processes (workers, replicas) and changes made
+with raw SQL keep serving the old principal until the TTL runs out. Privileged
+access (get_admin_user, has_role) therefore re-reads role and is_active from the
+database, so a demoted or deactivated admin loses it on the next request.
 """
 
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -9,27 +19,97 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 
+from app.cache import TTLCache
 from app.config import get_settings
 from app.database import get_db
+from app.metrics import Histogram, register_metrics
 from app.models import User
 
 settings = get_settings()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Password hashing. Hashes made with other cost parameters are upgraded on login.
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
 
 # JWT Bearer scheme
 security = HTTPBearer(auto_error=False)
 
 
+class PasswordHashPool:
+    """
+    Runs Argon2 work on a small dedicated pool so login bursts can't take over
+    the request threadpool. argon2-cffi releases the GIL, so threads give real
+    parallelism. Beyond `workers + max_queue` outstanding calls, requests are
+    rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.duration_ms = Histogram()
+
+    def run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server busy, please retry",
+            )
+        with self._lock:
+            self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self.duration_ms.observe((time.perf_counter() - start) * 1000)
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "duration_ms": self.duration_ms.snapshot(),
+            }
+
+
+password_pool = PasswordHashPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+register_metrics("password_hashing", password_pool.stats)
+
+
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_pool.run(pwd_context.hash, password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_pool.run(pwd_context.verify, plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Verify, and return a replacement hash if the stored one uses outdated cost parameters"""
+    return password_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -48,6 +128,42 @@ def create_refresh_token(data: dict) -> str:
     return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 
+def create_download_token(user_id: str, video_id: str) -> str:
+    """Short-lived token that authorizes downloading one video via ?token= (no headers needed)"""
+    expire = datetime.now(timezone.utc) + timedelta(seconds=settings.DOWNLOAD_TOKEN_EXPIRE_SECONDS)
+    to_encode = {"sub": user_id, "vid": video_id, "exp": expire, "type": "download"}
+    return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def verify_download_token(token: str, video_id: str) -> str:
+    """User id from a download token issued for `video_id`"""
+    payload = decode_token(token)
+    if payload.get("type") != "download" or payload.get("vid") != video_id or not payload.get("sub"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid download token",
+        )
+    return payload["sub"]
+
+
+def create_dedup_token(video_id: str, claims: dict) -> str:
+    """Signed dedup challenge for one upload, checked again at /complete"""
+    expire = datetime.now(timezone.utc) + timedelta(seconds=settings.DEDUP_CHALLENGE_EXPIRE_SECONDS)
+    to_encode = {**claims, "vid": video_id, "exp": expire, "type": "dedup"}
+    return jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
+
+
+def verify_dedup_token(token: str, video_id: str) -> dict:
+    """Challenge claims from a dedup token issued for `video_id`"""
+    payload = decode_token(token)
+    if payload.get("type") != "dedup" or payload.get("vid") != video_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid dedup token",
+        )
+    return payload
+
+
 def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
@@ -59,11 +175,75 @@ def decode_token(token: str) -> dict:
         )
 
 
-async def get_current_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-    db: Session = Depends(get_db),
-) -> User:
-    """Get current authenticated user"""
+class Principal:
+    """Lightweight identity of an authenticated user, cached across requests"""
+
+    __slots__ = ("id", "role", "username", "is_active")
+
+    def __init__(self, id: str, role: str, username: str, is_active: bool):
+        self.id = id
+        self.role = role
+        self.username = username
+        self.is_active = is_active
+
+
+# user_id -> Principal (or None for unknown/inactive users)
+principal_cache = TTLCache(
+    "principals", settings.PRINCIPAL_CACHE_MAX_ENTRIES, settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+register_metrics("principal_cache", principal_cache.stats)
+
+PRINCIPAL_FIELDS = ("role", "username", "is_active")
+
+
+def invalidate_principal(user_id: str):
+    principal_cache.delete(user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_principals(session, flush_context):
+    # Remember now (history is gone after the flush), invalidate once committed:
+    # dropping the entry at flush time lets a concurrent request re-cache the old row
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, User) and (
+            obj in session.deleted
+            or any(inspect(obj).attrs[name].history.has_changes() for name in PRINCIPAL_FIELDS)
+        ):
+            session.info.setdefault("changed_principals", set()).add(obj.id)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _invalidate_changed_principals(session, transaction):
+    # Only when the outermost transaction ends (savepoints don't publish anything);
+    # invalidating after a rollback is harmless
+    if transaction.parent is None:
+        for user_id in session.info.pop("changed_principals", ()):
+            invalidate_principal(user_id)
+
+
+def load_principal(db: Session, user_id: str) -> Optional[Principal]:
+    """Active user's principal from cache, falling back to a narrow users lookup"""
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal if principal.is_active else None
+    return _read_principal(db, user_id)
+
+
+def _read_principal(db: Session, user_id: str) -> Optional[Principal]:
+    """Active user's principal from the database; refreshes the cache entry"""
+    row = (
+        db.query(User.id, User.role, User.username, User.is_active)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if not row:
+        return None
+    principal = Principal(row.id, row.role, row.username, bool(row.is_active))
+    principal_cache.set(user_id, principal)
+    return principal if principal.is_active else None
+
+
+def _token_user_id(credentials: Optional[HTTPAuthorizationCredentials]) -> str:
     if not credentials:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,44 +252,72 @@ async def get_current_user(
 
     payload = decode_token(credentials.credentials)
     user_id = payload.get("sub")
-    if not user_id:
+    # Download tokens travel in URLs; they only ever grant that one download
+    if not user_id or payload.get("type") == "download":
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
+    return user_id
 
-    user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
-    if not user:
+
+def get_current_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """Get current authenticated user's id/role/username (usually without a DB query)"""
+    principal = load_principal(db, _token_user_id(credentials))
+    if not principal:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive",
         )
-
-    return user
+    return principal
 
 
-async def get_optional_user(
+def get_optional_principal(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db),
-) -> Optional[User]:
-    """Get current user if authenticated, None otherwise"""
+) -> Optional[Principal]:
+    """Get current user's principal if authenticated, None otherwise"""
     if not credentials:
         return None
     try:
-        payload = decode_token(credentials.credentials)
-        user_id = payload.get("sub")
-        if user_id:
-            return db.query(User).filter(User.id == user_id, User.is_active == True).first()
-    except:
-        pass
-    return None
+        return load_principal(db, _token_user_id(credentials))
+    except HTTPException:
+        return None
 
 
-async def get_admin_user(
-    current_user: User = Depends(get_current_user),
+def get_current_user(
+    principal: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
 ) -> User:
-    """Require admin role"""
-    if current_user.role not in ("admin", "moderator"):
+    """Get current authenticated user as a full ORM entity (for handlers that need it)"""
+    user = db.query(User).filter(User.id == principal.id, User.is_active == True).first()
+    if not user:
+        invalidate_principal(principal.id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found or inactive",
+        )
+
+    return user
+
+
+def has_role(db: Session, principal: Principal, *roles: str) -> bool:
+    """Privilege check that doesn't trust the (possibly stale) cached role"""
+    if principal.role not in roles:
+        return False
+    fresh = _read_principal(db, principal.id)
+    return fresh is not None and fresh.role in roles
+
+
+def get_admin_user(
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+) -> Principal:
+    """Require admin role (checked against the database)"""
+    if not has_role(db, current_user, "admin", "moderator"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required",
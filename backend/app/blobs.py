@@ -0,0 +1,250 @@
+"""
+Blob Store - Content-addressed, reference-counted storage for uploaded video files
+
+Files are stored under the SHA-256 of the bytes as uploaded, so identical
+uploads share one stored file: Video.s3_key points at the blob and
+video_blobs.ref_count counts the videos using it. A re-upload of a known file
+just takes a reference and discards its copy. The file is removed once the
+last reference is released.
+
+Clients that send the file's SHA-256 and size at upload init can skip the
+upload entirely when the blob exists, after proving they hold the file: they
+hash a random slice of it with a server nonce (knowing the hash alone is not
+enough to obtain someone else's video).
+
+The media pipeline rewrites blobs in place (fast start moves `moov`), so the
+challenges can't be answered from the stored file: DEDUP_CHALLENGES of them are
+computed from the original bytes when the blob is created and kept in a
+sidecar, and init hands out one at random. Blobs without the sidecar are never
+offered for dedup.
+"""
+
+import hashlib
+import json
+import os
+import secrets
+import shutil
+from typing import Optional
+
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.keyframes import KEYFRAME_SUFFIX
+from app.models import Video, VideoBlob
+from app.storage import delete_sidecar, get_s3_client, is_local_key, open_video_file, read_sidecar, write_sidecar
+
+settings = get_settings()
+
+CHALLENGE_SUFFIX = ".challenges.json"
+
+
+def blob_key(sha256: str, local: bool) -> str:
+    if local:
+        return os.path.join(settings.UPLOAD_DIR, "blobs", sha256[:2], f"{sha256}.mp4")
+    return f"blobs/{sha256[:2]}/{sha256}.mp4"
+
+
+def _acquire(db: Session, sha256: str, key: str, size: int) -> bool:
+    """Take a reference on the blob, creating its row if needed. True if it is new."""
+    bump = update(VideoBlob).where(VideoBlob.sha256 == sha256).values(ref_count=VideoBlob.ref_count + 1)
+    if db.execute(bump).rowcount:
+        return False
+    try:
+        with db.begin_nested():
+            db.execute(insert(VideoBlob).values(sha256=sha256, s3_key=key, size_bytes=size, ref_count=1))
+        return True
+    except IntegrityError:
+        # Same file finished uploading concurrently
+        db.execute(bump)
+        return False
+
+
+def store_local_upload(db: Session, video: Video, path: str, sha256: str, size: int) -> bool:
+    """
+    Point `video` at the blob for a freshly uploaded local file (which is
+    consumed). Returns True if the content was already stored.
+    """
+    key = blob_key(sha256, local=True)
+    existed = not _acquire(db, sha256, key, size) and os.path.exists(key)
+    if existed:
+        os.remove(path)
+    else:
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+        os.replace(path, key)
+        write_challenges(key, size)
+    video.s3_key = key
+    video.content_sha256 = sha256
+    return existed
+
+
+def attach_blob(db: Session, video: Video, sha256: str) -> bool:
+    """Point `video` at an existing blob (in the caller's transaction); False if it is gone"""
+    bump = update(VideoBlob).where(VideoBlob.sha256 == sha256).values(ref_count=VideoBlob.ref_count + 1)
+    if not db.execute(bump).rowcount:
+        return False
+    blob = db.query(VideoBlob.s3_key, VideoBlob.size_bytes).filter(VideoBlob.sha256 == sha256).one()
+    video.s3_key = blob.s3_key
+    video.size_bytes = blob.size_bytes
+    video.content_sha256 = sha256
+    return True
+
+
+def find_blob(db: Session, sha256: Optional[str], size: Optional[int]):
+    if not sha256 or not size:
+        return None
+    return (
+        db.query(VideoBlob.sha256, VideoBlob.s3_key, VideoBlob.size_bytes)
+        .filter(VideoBlob.sha256 == sha256.lower(), VideoBlob.size_bytes == size, VideoBlob.ref_count > 0)
+        .first()
+    )
+
+
+def _proof(f, offset: int, length: int, nonce: str) -> str:
+    """sha256(nonce + file[offset:offset + length]), hex"""
+    digest = hashlib.sha256(nonce.encode())
+    f.seek(offset)
+    digest.update(f.read(length))
+    return digest.hexdigest()
+
+
+def write_challenges(key: str, size: int):
+    """Precompute the blob's dedup challenges; must run before anything rewrites the file"""
+    length = min(settings.DEDUP_PROOF_BYTES, size)
+    challenges = []
+    with open_video_file(key) as f:
+        for _ in range(settings.DEDUP_CHALLENGES):
+            offset = secrets.randbelow(size - length + 1)
+            nonce = secrets.token_hex(16)
+            challenges.append({"offset": offset, "length": length, "nonce": nonce,
+                               "proof": _proof(f, offset, length, nonce)})
+    write_sidecar(key, CHALLENGE_SUFFIX, json.dumps(challenges, separators=(",", ":")).encode())
+
+
+def _challenges(key: str) -> list:
+    try:
+        raw = read_sidecar(key, CHALLENGE_SUFFIX)
+        return json.loads(raw) if raw else []
+    except Exception as e:
+        print(f"Dedup challenges unreadable for {key}: {e}")
+        return []
+
+
+def dedup_challenge(key: str) -> Optional[dict]:
+    """One of the blob's challenges (index, offset, length, nonce), or None if it has none"""
+    challenges = _challenges(key)
+    if not challenges:
+        return None
+    index = secrets.randbelow(len(challenges))
+    challenge = challenges[index]
+    return {"index": index, "offset": challenge["offset"], "length": challenge["length"], "nonce": challenge["nonce"]}
+
+
+def expected_proof(key: str, index: int) -> Optional[str]:
+    challenges = _challenges(key)
+    if not isinstance(index, int) or not 0 <= index < len(challenges):
+        return None
+    return challenges[index]["proof"]
+
+
+def discard_upload(key: str):
+    """Delete an upload that never made it into the blob store"""
+    try:
+        if is_local_key(key):
+            if os.path.exists(key):
+                os.remove(key)
+        else:
+            get_s3_client().delete_object(Bucket=settings.S3_BUCKET, Key=key)
+        delete_sidecar(key, KEYFRAME_SUFFIX)
+    except Exception as e:
+        print(f"Upload cleanup failed for {key}: {e}")
+
+
+def _hash_file(key: str) -> tuple[str, int]:
+    digest, size = hashlib.sha256(), 0
+    with open_video_file(key) as f:
+        while chunk := f.read(settings.UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def deduplicate(db: Session, video: Video):
+    """
+    Media pipeline step for uploads that weren't hashed on the way in
+    (multipart and presigned S3 uploads): move the file under its content key,
+    or drop it in favour of the existing blob.
+    """
+    if video.content_sha256:
+        return
+    original = video.s3_key
+    local = is_local_key(original)
+    sha256, size = _hash_file(original)
+    key = blob_key(sha256, local)
+
+    created = _acquire(db, sha256, key, size)
+    if local:
+        if not os.path.exists(key):
+            os.makedirs(os.path.dirname(key), exist_ok=True)
+            try:
+                os.link(original, key)
+            except FileExistsError:
+                pass
+            except OSError:
+                shutil.copyfile(original, key)
+    elif created:
+        get_s3_client().copy({"Bucket": settings.S3_BUCKET, "Key": original}, settings.S3_BUCKET, key)
+    if created:
+        write_challenges(key, size)
+
+    video.s3_key = key
+    video.content_sha256 = sha256
+    db.commit()
+
+    # Only drop the upload once the row points at the blob
+    if local:
+        os.remove(original)
+    else:
+        get_s3_client().delete_object(Bucket=settings.S3_BUCKET, Key=original)
+
+
+def release_blob(db: Session, video: Video) -> str:
+    """Drop `video`'s reference (in the caller's transaction); returns the hash to collect after commit"""
+    sha256 = video.content_sha256
+    if not sha256:
+        return None
+    db.execute(update(VideoBlob).where(VideoBlob.sha256 == sha256).values(ref_count=VideoBlob.ref_count - 1))
+    video.content_sha256 = None
+    return sha256
+
+
+def collect_blob(sha256: str):
+    """Delete the blob and its file if nothing references it any more"""
+    if not sha256:
+        return
+    db = SessionLocal()
+    try:
+        blob = db.query(VideoBlob).filter(VideoBlob.sha256 == sha256).first()
+        if not blob:
+            return
+        key = blob.s3_key
+        # Conditional delete: a concurrent upload may have just taken a reference
+        result = db.execute(delete(VideoBlob).where(VideoBlob.sha256 == sha256, VideoBlob.ref_count <= 0))
+        if not result.rowcount:
+            db.rollback()
+            return
+        if is_local_key(key):
+            if os.path.exists(key):
+                os.remove(key)
+        else:
+            get_s3_client().delete_object(Bucket=settings.S3_BUCKET, Key=key)
+        delete_sidecar(key, KEYFRAME_SUFFIX)
+        delete_sidecar(key, CHALLENGE_SUFFIX)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Blob cleanup failed for {sha256}: {e}")
+    finally:
+        db.close()
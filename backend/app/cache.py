@@ -0,0 +1,89 @@
+"""
+Response Cache - In-process TTL + LRU cache with hit-rate counters
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import get_settings
+from app.metrics import register_metrics
+
+settings = get_settings()
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, name: str, max_entries: int, ttl_seconds: float):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING or entry[0] <= now:
+                if entry is not _MISSING:
+                    del self._entries[key]
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Public video feeds (list_videos without a search query)
+feed_cache = TTLCache("feeds", settings.FEED_CACHE_MAX_ENTRIES, settings.FEED_CACHE_TTL_SECONDS)
+register_metrics("feed_cache", feed_cache.stats)
+
+
+def feed_cache_key(**params) -> tuple:
+    """Normalize query parameters into a hashable cache key"""
+    return tuple(sorted((k, v) for k, v in params.items() if v is not None))
+
+
+def invalidate_feeds():
+    """Drop cached feeds after an event that changes them (approve, reject, delete, like)"""
+    feed_cache.clear()
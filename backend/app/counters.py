@@ -0,0 +1,207 @@
+"""
+Denormalized Counters - Atomic in-database increments and periodic reconciliation
+
+Counter columns are only ever changed with a single `UPDATE ... SET x = x + n`,
+so concurrent requests can't lose updates and no entity is loaded first. A
+background job recomputes the true values from the source tables in id-ordered
+batches and repairs drift with compare-and-set updates, so a counter that
+moved while the batch was being counted is left for the next run instead of
+being overwritten with a stale value.
+"""
+
+import asyncio
+import threading
+import time
+
+from sqlalchemy import and_, bindparam, case, func, update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.metrics import register_metrics
+from app.models import Comment, Follow, User, Video, VideoLike
+from app.video_counts import video_count_reconciler
+
+settings = get_settings()
+
+
+def increment(db: Session, model, pk, column: str, delta: int = 1) -> bool:
+    """Atomically add `delta` to `model.column` (floored at 0); False if the row doesn't exist"""
+    col = getattr(model, column)
+    new_value = func.coalesce(col, 0) + delta
+    if delta < 0:
+        new_value = case((new_value < 0, 0), else_=new_value)
+    result = db.execute(
+        update(model)
+        .where(model.id == pk)
+        .values({column: new_value})
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount > 0
+
+
+def video_counter_sources(db: Session, ids: list) -> dict:
+    """True counts per video id, computed from the source tables"""
+    likes = dict(
+        db.query(VideoLike.video_id, func.count())
+        .filter(VideoLike.video_id.in_(ids))
+        .group_by(VideoLike.video_id)
+    )
+    comments = dict(
+        db.query(Comment.video_id, func.count())
+        .filter(Comment.video_id.in_(ids), Comment.is_deleted == False)
+        .group_by(Comment.video_id)
+    )
+    return {"likes_count": likes, "comments_count": comments}
+
+
+def comment_counter_sources(db: Session, ids: list) -> dict:
+    """True reply counts per comment id"""
+    replies = dict(
+        db.query(Comment.parent_id, func.count())
+        .filter(Comment.parent_id.in_(ids), Comment.is_deleted == False)
+        .group_by(Comment.parent_id)
+    )
+    return {"replies_count": replies}
+
+
+def user_counter_sources(db: Session, ids: list) -> dict:
+    """True follower/following counts per user id"""
+    followers = dict(
+        db.query(Follow.following_id, func.count())
+        .filter(Follow.following_id.in_(ids))
+        .group_by(Follow.following_id)
+    )
+    following = dict(
+        db.query(Follow.follower_id, func.count())
+        .filter(Follow.follower_id.in_(ids))
+        .group_by(Follow.follower_id)
+    )
+    return {"followers_count": followers, "following_count": following}
+
+
+class CounterReconciler:
+    """
+    Walks `model` in primary-key order, `batch_size` rows at a time, comparing
+    each counter column with the value `sources(db, ids)` computes.
+    """
+
+    def __init__(self, name: str, model, columns: tuple, sources, batch_size: int):
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.sources = sources
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.rows_checked = 0
+        self.repaired = {column: 0 for column in columns}
+        self.last_run_seconds = None
+        self.last_run_at = None
+
+    def _reconcile_batch(self, db: Session, after):
+        """Check the next batch after pk `after`; returns (last pk, rows, repaired) or None when done"""
+        model = self.model
+        query = db.query(model.id, *[getattr(model, c) for c in self.columns]).order_by(model.id)
+        if after is not None:
+            query = query.filter(model.id > after)
+        rows = query.limit(self.batch_size).all()
+        if not rows:
+            return None
+        actual = self.sources(db, [row[0] for row in rows])
+
+        repaired = {}
+        for i, column in enumerate(self.columns, start=1):
+            fixes = [
+                {"pk": row[0], "observed": row[i], "actual": actual[column].get(row[0], 0)}
+                for row in rows
+                if (row[i] or 0) != actual[column].get(row[0], 0)
+            ]
+            if not fixes:
+                continue
+            table = model.__table__
+            # Compare-and-set: skip rows whose counter moved since we read it
+            stmt = (
+                update(table)
+                .where(and_(
+                    table.c.id == bindparam("pk"),
+                    func.coalesce(table.c[column], 0) == func.coalesce(bindparam("observed"), 0),
+                ))
+                .values({column: bindparam("actual")})
+            )
+            db.connection().execute(stmt, fixes)
+            repaired[column] = len(fixes)
+        db.commit()
+        return rows[-1][0], len(rows), repaired
+
+    def run(self) -> dict:
+        """Reconcile every row once; returns how many counters were repaired per column"""
+        start = time.perf_counter()
+        totals = {column: 0 for column in self.columns}
+        checked = 0
+        after = None
+        db = SessionLocal()
+        try:
+            while True:
+                result = self._reconcile_batch(db, after)
+                if result is None:
+                    break
+                after, count, repaired = result
+                checked += count
+                for column, n in repaired.items():
+                    totals[column] += n
+        finally:
+            db.close()
+        with self._lock:
+            self.runs += 1
+            self.rows_checked += checked
+            for column, n in totals.items():
+                self.repaired[column] += n
+            self.last_run_seconds = round(time.perf_counter() - start, 3)
+            self.last_run_at = time.time()
+        return totals
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "rows_checked": self.rows_checked,
+                "repaired": dict(self.repaired),
+                "last_run_seconds": self.last_run_seconds,
+                "last_run_at": self.last_run_at,
+            }
+
+
+video_counter_reconciler = CounterReconciler(
+    "videos", Video, ("likes_count", "comments_count"), video_counter_sources,
+    settings.COUNTER_RECONCILE_BATCH_SIZE,
+)
+comment_counter_reconciler = CounterReconciler(
+    "comments", Comment, ("replies_count",), comment_counter_sources,
+    settings.COUNTER_RECONCILE_BATCH_SIZE,
+)
+user_counter_reconciler = CounterReconciler(
+    "users", User, ("followers_count", "following_count"), user_counter_sources,
+    settings.COUNTER_RECONCILE_BATCH_SIZE,
+)
+reconcilers = [video_counter_reconciler, comment_counter_reconciler, user_counter_reconciler, video_count_reconciler]
+register_metrics("counter_reconciliation", lambda: {r.name: r.stats() for r in reconcilers})
+
+
+def reconcile_all() -> dict:
+    results = {}
+    for reconciler in reconcilers:
+        try:
+            results[reconciler.name] = reconciler.run()
+        except Exception as e:
+            print(f"Counter reconciliation failed for {reconciler.name}: {e}")
+            results[reconciler.name] = {"error": str(e)}
+    return results
+
+
+async def run_counter_reconciler(interval: float = None):
+    """Background task: reconcile all denormalized counters every interval until cancelled"""
+    interval = interval or settings.COUNTER_RECONCILE_INTERVAL_SECONDS
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(reconcile_all)
@@ -2,22 +2,80 @@
 Database Configuration - SQLAlchemy
 """
 
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import QueuePool
 from app.config import get_settings
+from app.metrics import Histogram, register_metrics
 
 settings = get_settings()
 
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits (including connect time)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_ms = Histogram()
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.wait_ms.observe((time.perf_counter() - start) * 1000)
+
+
 connect_args = {}
+pool_args = {}
 if "sqlite" in settings.DATABASE_URL:
     connect_args["check_same_thread"] = False
+if ":memory:" not in settings.DATABASE_URL:
+    pool_args = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
 
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
     connect_args=connect_args,
+    **pool_args,
 )
 
+# Connections held outside request handlers: one per media worker, plus the
+# view flusher, counter reconciler and timeline trimmer
+BACKGROUND_CONNECTIONS = 3
+
+
+def threadpool_workers() -> int:
+    """
+    Threads for sync route handlers. Each one may hold a DB connection, so
+    more threads than the pool can hand out would just queue on checkout (and
+    time out after DB_POOL_TIMEOUT); refuse to start with such a setting.
+    """
+    if not pool_args:
+        return settings.THREADPOOL_WORKERS or 40
+    capacity = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW - settings.MEDIA_WORKERS - BACKGROUND_CONNECTIONS
+    if not settings.THREADPOOL_WORKERS:
+        return max(capacity, 1)
+    if settings.THREADPOOL_WORKERS > capacity:
+        raise RuntimeError(
+            f"THREADPOOL_WORKERS={settings.THREADPOOL_WORKERS} exceeds the {capacity} connections "
+            f"DB_POOL_SIZE + DB_MAX_OVERFLOW leave for request handlers"
+        )
+    return settings.THREADPOOL_WORKERS
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
@@ -32,3 +90,38 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def pool_stats() -> dict:
+    pool = engine.pool
+    stats = {"class": type(pool).__name__, "status": pool.status()}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        stats["timeouts"] = pool.timeouts
+        stats["checkout_wait_ms"] = pool.wait_ms.snapshot()
+    return stats
+
+
+def warm_pool(connections: int = None) -> int:
+    """Open pool connections up front so the first requests skip connect latency"""
+    connections = settings.DB_POOL_WARMUP if connections is None else connections
+    if isinstance(engine.pool, QueuePool):
+        connections = min(connections, engine.pool.size())
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+register_metrics("db_pool", pool_stats)
@@ -0,0 +1,61 @@
+"""
+Keyframe Index - Timestamp to byte-offset map for seeking into stored videos
+
+Built once per file by the media pipeline from the MP4 sample tables and kept
+next to the file as `<key>.keyframes.json`. GET /videos/:id/seek answers a
+"watch from 1:23" link with the keyframe's time (for the player's currentTime)
+and byte offset.
+"""
+
+import bisect
+import json
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app import mp4
+from app.cache import TTLCache
+from app.config import get_settings
+from app.metrics import register_metrics
+from app.models import Video
+from app.storage import open_video_file, read_sidecar, write_sidecar
+
+settings = get_settings()
+
+KEYFRAME_SUFFIX = ".keyframes.json"
+
+# s3_key -> (times, offsets)
+keyframe_cache = TTLCache("keyframes", settings.KEYFRAME_CACHE_MAX_ENTRIES, settings.KEYFRAME_CACHE_TTL_SECONDS)
+register_metrics("keyframe_cache", keyframe_cache.stats)
+
+
+def build_keyframe_index(db: Session, video: Video):
+    """Media pipeline step: write the keyframe index sidecar for the video's file"""
+    with open_video_file(video.s3_key) as f:
+        points = mp4.keyframe_index(f)
+    write_sidecar(video.s3_key, KEYFRAME_SUFFIX, json.dumps({"points": points}, separators=(",", ":")).encode())
+    keyframe_cache.delete(video.s3_key)
+
+
+def _load(key: str) -> tuple[list, list]:
+    index = keyframe_cache.get(key)
+    if index is None:
+        raw = read_sidecar(key, KEYFRAME_SUFFIX)
+        if raw is None:
+            # Not indexed (yet): cache the miss too, or every ?t= on S3 costs a GET
+            index = ([], [])
+        else:
+            points = json.loads(raw)["points"]
+            index = ([p[0] for p in points], [p[1] for p in points])
+        keyframe_cache.set(key, index)
+    return index
+
+
+def keyframe_at(key: str, seconds: float) -> Optional[tuple[float, int]]:
+    """(time, byte offset) of the last keyframe at or before `seconds`, if the file is indexed"""
+    index = _load(key)
+    if not index or not index[0]:
+        return None
+    times, offsets = index
+    i = max(bisect.bisect_right(times, seconds) - 1, 0)
+    return times[i], offsets[i]
@@ -0,0 +1,211 @@
+"""
+Media Pipeline - Post-upload processing of video files on a bounded worker pool
+
+A finished upload is marked `processing_status = "queued"` and handed to the
+pipeline, which runs each step in PIPELINE_STEPS on a worker thread, so the
+upload response never waits for file work. When the pool is saturated the job
+stays queued in the database and is picked up again once a worker frees up (or
+on the next startup).
+
+A worker claims a job by flipping it from "queued" to "processing" in one
+conditional UPDATE, so with several app processes each video runs once. Jobs
+left "processing" for MEDIA_STALE_SECONDS (worker crashed) are queued again.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app import mp4
+from app.blobs import collect_blob, deduplicate, release_blob
+from app.config import get_settings
+from app.keyframes import build_keyframe_index
+from app.database import SessionLocal
+from app.metrics import Histogram, register_metrics
+from app.models import Video
+from app.pagination import encode_key, key_bounds
+from app.storage import open_video_file, replace_video_file, scratch_path_for
+
+settings = get_settings()
+
+
+def make_faststart(db: Session, video: Video):
+    """Move `moov` ahead of `mdat` so players can start before downloading the whole file"""
+    if not settings.MEDIA_FASTSTART:
+        return
+    scratch = scratch_path_for(video.s3_key)
+    try:
+        with open_video_file(video.s3_key) as src, open(scratch, "wb") as dst:
+            rewritten = mp4.faststart(src, dst)
+        if rewritten:
+            replace_video_file(video.s3_key, scratch)
+    finally:
+        if os.path.exists(scratch):
+            os.remove(scratch)
+
+
+def extract_metadata(db: Session, video: Video):
+    """Fill duration, resolution, codecs, bitrate and size from the MP4 headers"""
+    with open_video_file(video.s3_key) as f:
+        info = mp4.probe(f)
+    video.size_bytes = info["size"]
+    if info["duration"]:
+        video.duration_seconds = max(1, round(info["duration"]))
+    video.width = info["width"]
+    video.height = info["height"]
+    video.video_codec = info["video_codec"]
+    video.audio_codec = info["audio_codec"]
+    video.bitrate = info["bitrate"]
+
+
+# deduplicate first: blobs are keyed (and dedup challenges computed) by the bytes as uploaded
+PIPELINE_STEPS = [deduplicate, make_faststart, extract_metadata, build_keyframe_index]
+
+
+def process_video(video_id: str) -> bool:
+    """Run the pipeline for one video; False if a step failed"""
+    db = SessionLocal()
+    try:
+        claimed = db.execute(
+            update(Video)
+            .where(Video.id == video_id, Video.processing_status == "queued")
+            .values(processing_status="processing")
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return True  # already done, or another worker has it
+        video = db.query(Video).filter(Video.id == video_id).first()
+        if not video:
+            return True
+        if not video.s3_key or video.status == "deleted":
+            video.processing_status = None
+            db.commit()
+            return True
+        try:
+            for step in PIPELINE_STEPS:
+                step(db, video)
+            video.processing_status = "ready"
+        except Exception as e:
+            print(f"Media processing failed for {video_id}: {e}")
+            db.rollback()
+            video.processing_status = "failed"
+        db.commit()
+        ok = video.processing_status == "ready"
+
+        # Deleted while processing: the delete could not see the blob reference yet
+        db.refresh(video)
+        if video.status == "deleted" and video.content_sha256:
+            released = release_blob(db, video)
+            db.commit()
+            collect_blob(released)
+        return ok
+    finally:
+        db.close()
+
+
+class MediaPipeline:
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="media")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._backlog = False
+        self._active = set()  # video ids submitted and not finished yet
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.deferred = 0
+        self.duration_ms = Histogram(buckets=(100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000))
+
+    def submit(self, video_id: str) -> bool:
+        """Queue a video without blocking; returns False if it was left for a later sweep"""
+        with self._lock:
+            if video_id in self._active:
+                return True
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.deferred += 1
+                self._backlog = True
+            return False
+        with self._lock:
+            self.in_flight += 1
+            self._active.add(video_id)
+        try:
+            self._executor.submit(self._run, video_id)
+        except RuntimeError:  # executor shut down
+            self._finish(video_id)
+            return False
+        return True
+
+    def _finish(self, video_id: str):
+        with self._lock:
+            self.in_flight -= 1
+            self._active.discard(video_id)
+        self._slots.release()
+
+    def _run(self, video_id: str):
+        start = time.perf_counter()
+        try:
+            ok = process_video(video_id)
+            with self._lock:
+                self.completed += 1
+                self.failed += not ok
+        except Exception as e:
+            print(f"Media pipeline error for {video_id}: {e}")
+            with self._lock:
+                self.failed += 1
+        finally:
+            self.duration_ms.observe((time.perf_counter() - start) * 1000)
+            self._finish(video_id)
+        with self._lock:
+            backlog, self._backlog = self._backlog, False
+        if backlog:
+            self.requeue_pending()
+
+    def requeue_pending(self) -> int:
+        """Submit videos left queued (pool was full, or the process restarted) or abandoned mid-run"""
+        db = SessionLocal()
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.MEDIA_STALE_SECONDS)
+            updated_col, stale_before = key_bounds(Video.updated_at, encode_key(cutoff))
+            db.execute(
+                update(Video)
+                .where(Video.processing_status == "processing", updated_col < stale_before)
+                .values(processing_status="queued")
+            )
+            db.commit()
+            ids = [
+                row.id for row in db.query(Video.id)
+                .filter(Video.processing_status == "queued")
+                .order_by(Video.created_at)
+                .limit(self.workers + self.max_queue)
+            ]
+        finally:
+            db.close()
+        return sum(self.submit(video_id) for video_id in ids)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queued": max(0, self.in_flight - self.workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "deferred": self.deferred,
+                "duration_ms": self.duration_ms.snapshot(),
+            }
+
+
+media_pipeline = MediaPipeline(settings.MEDIA_WORKERS, settings.MEDIA_MAX_QUEUE)
+register_metrics("media_pipeline", media_pipeline.stats)
@@ -0,0 +1,61 @@
+"""
+Metrics - Lightweight in-process counters/histograms and a registry read by /api/admin/metrics
+"""
+
+import bisect
+import threading
+from typing import Callable
+
+# Default latency buckets in milliseconds
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            # Cumulative counts per upper bound, Prometheus style
+            cumulative, running = {}, 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], self._counts):
+                running += count
+                cumulative[str(bound)] = running
+            return {
+                "count": self.count,
+                "sum": round(self.total, 3),
+                "avg": round(self.total / self.count, 3) if self.count else 0.0,
+                "max": round(self.max, 3),
+                "buckets": cumulative,
+            }
+
+
+_registry: dict[str, Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, collect: Callable[[], dict]):
+    """Register a callable whose dict output is published under `name`"""
+    _registry[name] = collect
+
+
+def collect_metrics() -> dict:
+    result = {}
+    for name, collect in _registry.items():
+        try:
+            result[name] = collect()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
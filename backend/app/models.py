@@ -2,9 +2,10 @@
 SQLAlchemy ORM Models
 """
 
-from sqlalchemy import Column, String, Text, Boolean, Integer, BigInteger, DateTime, ForeignKey, UniqueConstraint, JSON
+from sqlalchemy import Column, String, Text, Boolean, Integer, BigInteger, DateTime, ForeignKey, UniqueConstraint, Index, JSON
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 import uuid
 
 from app.database import Base
@@ -14,6 +15,13 @@ def generate_uuid():
     return str(uuid.uuid4())
 
 
+def utcnow():
+    # Timestamps are written from Python (server_default only covers raw SQL)
+    # so SQLite stores one text format: CURRENT_TIMESTAMP has no fractional
+    # seconds, and cursor seeks compare the stored text directly
+    return datetime.now(timezone.utc)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -25,8 +33,10 @@ class User(Base):
     avatar_url = Column(Text, nullable=True)
     bio = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    followers_count = Column(Integer, default=0)
+    following_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now(), onupdate=utcnow)
 
     # Relationships
     videos = relationship("Video", back_populates="owner", cascade="all, delete-orphan")
@@ -44,9 +54,18 @@ class Video(Base):
     tags = Column(JSON, default=[])
     type = Column(String, default="ai")  # ai, human
     s3_key = Column(String, nullable=True)
+    content_sha256 = Column(String(64), ForeignKey("video_blobs.sha256"), nullable=True, index=True)
+    multipart_upload_id = Column(String, nullable=True)  # set while a multipart upload is open
     thumbnail_url = Column(Text, nullable=True)
     duration_seconds = Column(Integer, nullable=True)
     size_bytes = Column(BigInteger, nullable=True)
+    # Filled from the file itself by the media pipeline (app/media.py)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    video_codec = Column(String, nullable=True)
+    audio_codec = Column(String, nullable=True)
+    bitrate = Column(Integer, nullable=True)  # bits per second
+    processing_status = Column(String, nullable=True)  # queued, processing, ready, failed
     allow_download = Column(Boolean, default=False)
     status = Column(String, default="pending")  # pending, approved, rejected, deleted
     views = Column(BigInteger, default=0)
@@ -55,8 +74,17 @@ class Video(Base):
     # AI-specific fields
     ai_model = Column(String, nullable=True)
     ai_prompt = Column(Text, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now(), onupdate=utcnow)
+
+    # Keyset pagination indexes: (status, sort key, id) for every feed sort
+    __table_args__ = (
+        Index("ix_videos_status_created_id", "status", "created_at", "id"),
+        Index("ix_videos_status_views_id", "status", "views", "id"),
+        Index("ix_videos_status_likes_id", "status", "likes_count", "id"),
+        # Per-owner listings and large accounts merged into following feeds
+        Index("ix_videos_owner_status_created_id", "owner_id", "status", "created_at", "id"),
+    )
 
     # Relationships
     owner = relationship("User", back_populates="videos")
@@ -64,17 +92,50 @@ class Video(Base):
     video_likes = relationship("VideoLike", back_populates="video", cascade="all, delete-orphan")
 
 
+class VideoBlob(Base):
+    """Content-addressed video file shared by identical uploads - see app/blobs.py"""
+    __tablename__ = "video_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    s3_key = Column(String, nullable=False)
+    size_bytes = Column(BigInteger, nullable=True)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+
+
+class VideoCount(Base):
+    """Maintained video totals per (status, type, owner) - see app/video_counts.py"""
+    __tablename__ = "video_counts"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    status = Column(String, nullable=False)
+    type = Column(String, nullable=False)
+    owner_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    count = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (UniqueConstraint("status", "type", "owner_id", name="uq_video_count_bucket"),)
+
+
 class Comment(Base):
     __tablename__ = "comments"
 
     id = Column(String, primary_key=True, default=generate_uuid)
     video_id = Column(String, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    parent_id = Column(String, ForeignKey("comments.id", ondelete="CASCADE"), nullable=True)  # thread root
     content = Column(Text, nullable=False)
     likes_count = Column(Integer, default=0)
+    replies_count = Column(Integer, default=0)
     is_deleted = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now(), onupdate=utcnow)
+
+    # Keyset pagination indexes: top-level comments per video, replies per thread
+    __table_args__ = (
+        Index("ix_comments_video_parent_created_id", "video_id", "parent_id", "created_at", "id"),
+        Index("ix_comments_video_parent_likes_id", "video_id", "parent_id", "likes_count", "id"),
+        Index("ix_comments_parent_created_id", "parent_id", "created_at", "id"),
+    )
 
     # Relationships
     video = relationship("Video", back_populates="comments")
@@ -87,7 +148,7 @@ class VideoLike(Base):
     id = Column(String, primary_key=True, default=generate_uuid)
     video_id = Column(String, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
 
     __table_args__ = (UniqueConstraint("video_id", "user_id", name="uq_video_user_like"),)
 
@@ -104,7 +165,7 @@ class Report(Base):
     reason = Column(String, nullable=False)
     details = Column(Text, nullable=True)
     status = Column(String, default="open")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
 
 
 class Notification(Base):
@@ -116,7 +177,7 @@ class Notification(Base):
     message = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False)
     reference_id = Column(String, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
 
     # Relationships
     user = relationship("User", back_populates="notifications")
@@ -129,7 +190,7 @@ class RefreshToken(Base):
     user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     token = Column(String, unique=True, nullable=False)
     is_revoked = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
 
 
@@ -140,7 +201,7 @@ class PasswordReset(Base):
     email = Column(String, nullable=False)
     token = Column(String, unique=True, nullable=False)
     used = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
     expires_at = Column(DateTime(timezone=True), nullable=False)
 
 
@@ -150,21 +211,38 @@ class Follow(Base):
     id = Column(String, primary_key=True, default=generate_uuid)
     follower_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     following_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
 
-    __table_args__ = (UniqueConstraint("follower_id", "following_id", name="uq_follower_following"),)
+    __table_args__ = (
+        UniqueConstraint("follower_id", "following_id", name="uq_follower_following"),
+        Index("ix_follows_following_id", "following_id"),  # follower counts / reconciliation
+    )
+
+
+class TimelineEntry(Base):
+    """Precomputed following-feed entry - see app/timelines.py"""
+    __tablename__ = "timeline_entries"
+
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    video_id = Column(String, ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True)
+    owner_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)  # the video's created_at (sort key)
+
+    __table_args__ = (
+        Index("ix_timeline_user_created_video", "user_id", "created_at", "video_id"),
+    )
 
 
 class Playlist(Base):
     __tablename__ = "playlists"
 
     id = Column(String, primary_key=True, default=generate_uuid)
-    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=True)
     is_public = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now(), onupdate=utcnow)
 
 
 class PlaylistVideo(Base):
@@ -174,6 +252,6 @@ class PlaylistVideo(Base):
     playlist_id = Column(String, ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False)
     video_id = Column(String, ForeignKey("videos.id", ondelete="CASCADE"), nullable=False)
     position = Column(Integer, default=0)
-    added_at = Column(DateTime(timezone=True), server_default=func.now())
+    added_at = Column(DateTime(timezone=True), default=utcnow, server_default=func.now())
 
     __table_args__ = (UniqueConstraint("playlist_id", "video_id", name="uq_playlist_video"),)
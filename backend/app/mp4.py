@@ -0,0 +1,388 @@
+"""
+MP4 Parsing - Minimal ISO BMFF box reader for upload post-processing
+
+Only the container structure is read: top-level boxes are walked by seeking
+over their payloads, so `mdat` (the media data) is never loaded. The `moov`
+box, which holds every header the pipeline needs, is read into memory once and
+parsed from there.
+"""
+
+import struct
+from typing import NamedTuple, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+class MP4Error(ValueError):
+    pass
+
+
+class Box(NamedTuple):
+    type: str
+    offset: int       # start of the box (header included)
+    header_size: int
+    size: int         # whole box, header included
+
+    @property
+    def payload_offset(self) -> int:
+        return self.offset + self.header_size
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+
+def _parse_header(header: bytes, offset: int, limit: int, read_more=None) -> Box:
+    size, box_type = struct.unpack(">I4s", header[:8])
+    header_size = 8
+    if size == 1:
+        large = header[8:16] if len(header) >= 16 else read_more(8)
+        if len(large) < 8:
+            raise MP4Error("Truncated box header")
+        size = struct.unpack(">Q", large)[0]
+        header_size = 16
+    elif size == 0:
+        size = limit - offset  # box extends to the end of its parent
+    if size < header_size or offset + size > limit:
+        raise MP4Error(f"Invalid size for box '{box_type.decode('latin-1')}' at {offset}")
+    return Box(box_type.decode("latin-1"), offset, header_size, size)
+
+
+def iter_file_boxes(f, start: int = 0, end: Optional[int] = None):
+    """Yield the boxes in [start, end) of a seekable file, reading only their headers"""
+    if end is None:
+        end = f.seek(0, 2)
+    offset = start
+    while offset + 8 <= end:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            raise MP4Error("Truncated box header")
+        box = _parse_header(header, offset, end, f.read)
+        yield box
+        offset = box.end
+
+
+def iter_boxes(data, start: int = 0, end: Optional[int] = None):
+    """Yield the boxes in data[start:end] (offsets relative to `data`)"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        box = _parse_header(bytes(data[offset:offset + 16]), offset, end)
+        yield box
+        offset = box.end
+
+
+def find_box(data, path: str, start: int = 0, end: Optional[int] = None) -> Optional[Box]:
+    """First box matching a '/'-separated path below data[start:end], e.g. 'mdia/minf/stbl'"""
+    name, _, rest = path.partition("/")
+    for box in iter_boxes(data, start, end):
+        if box.type == name:
+            if not rest:
+                return box
+            return find_box(data, rest, box.payload_offset, box.end)
+    return None
+
+
+def read_moov(f, max_bytes: int = None) -> tuple[Box, bytes, list[Box]]:
+    """
+    Locate and read the `moov` box. Returns (moov box, moov bytes, top-level
+    boxes) - the box list lets callers check whether `moov` precedes `mdat`.
+    """
+    max_bytes = max_bytes or settings.MP4_MAX_MOOV_BYTES
+    top_level = []
+    moov = None
+    for box in iter_file_boxes(f):
+        top_level.append(box)
+        if box.type == "moov":
+            moov = box
+    if not top_level or top_level[0].type not in ("ftyp", "styp", "free", "skip", "wide", "moov"):
+        raise MP4Error("Not an MP4 file")
+    if moov is None:
+        raise MP4Error("No moov box")
+    if moov.size > max_bytes:
+        raise MP4Error(f"moov box too large ({moov.size} bytes)")
+    f.seek(moov.offset)
+    data = f.read(moov.size)
+    if len(data) < moov.size:
+        raise MP4Error("Truncated moov box")
+    return moov, data, top_level
+
+
+def full_box_version(data, box: Box) -> int:
+    return data[box.payload_offset]
+
+
+def _duration_fields(data, box: Box) -> tuple[int, int]:
+    """(timescale, duration) from an mvhd/mdhd full box"""
+    p = box.payload_offset
+    if full_box_version(data, box) == 1:
+        return struct.unpack_from(">IQ", data, p + 20)
+    return struct.unpack_from(">II", data, p + 12)
+
+
+def _handler_type(data, trak: Box) -> Optional[str]:
+    hdlr = find_box(data, "mdia/hdlr", trak.payload_offset, trak.end)
+    if hdlr is None:
+        return None
+    return bytes(data[hdlr.payload_offset + 8:hdlr.payload_offset + 12]).decode("latin-1")
+
+
+def _sample_entry(data, trak: Box) -> Optional[Box]:
+    stsd = find_box(data, "mdia/minf/stbl/stsd", trak.payload_offset, trak.end)
+    if stsd is None:
+        return None
+    # full box header (4) + entry_count (4), then the first sample entry
+    return next(iter_boxes(data, stsd.payload_offset + 8, stsd.end), None)
+
+
+def _codec_string(data, entry: Box) -> str:
+    """RFC 6381 style codec string where cheap to build (avc1.PPCCLL), else the fourcc"""
+    if entry.type in ("avc1", "avc3"):
+        # VisualSampleEntry fields take 78 bytes before the child boxes
+        avcc = find_box(data, "avcC", entry.payload_offset + 78, entry.end)
+        if avcc is not None and avcc.size >= avcc.header_size + 4:
+            profile, compat, level = data[avcc.payload_offset + 1:avcc.payload_offset + 4]
+            return f"{entry.type}.{profile:02x}{compat:02x}{level:02x}"
+    return entry.type
+
+
+def _video_size(data, trak: Box, entry: Optional[Box]) -> tuple[Optional[int], Optional[int]]:
+    tkhd = find_box(data, "tkhd", trak.payload_offset, trak.end)
+    if tkhd is not None:
+        # Display size, 16.16 fixed point, in the last 8 bytes of tkhd
+        width, height = struct.unpack_from(">II", data, tkhd.end - 8)
+        if width and height:
+            return width >> 16, height >> 16
+    if entry is not None:
+        # Coded size from the VisualSampleEntry
+        return struct.unpack_from(">HH", data, entry.payload_offset + 24)
+    return None, None
+
+
+def probe(f) -> dict:
+    """
+    Container metadata of an MP4: duration (seconds, float), width, height,
+    video/audio codec, overall bitrate (bits/s) and whether `moov` is ahead of
+    `mdat` (fast start).
+    """
+    file_size = f.seek(0, 2)
+    moov, data, top_level = read_moov(f)
+    types = [box.type for box in top_level]
+
+    info = {
+        "duration": None,
+        "width": None,
+        "height": None,
+        "video_codec": None,
+        "audio_codec": None,
+        "bitrate": None,
+        "size": file_size,
+        "faststart": "mdat" not in types or types.index("moov") < types.index("mdat"),
+    }
+
+    children = moov.header_size  # moov children start right after its header in `data`
+    mvhd = find_box(data, "mvhd", children)
+    if mvhd is not None:
+        timescale, duration = _duration_fields(data, mvhd)
+        if timescale and duration not in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+            info["duration"] = duration / timescale
+
+    for trak in iter_boxes(data, children):
+        if trak.type != "trak":
+            continue
+        handler = _handler_type(data, trak)
+        entry = _sample_entry(data, trak)
+        if handler == "vide" and info["video_codec"] is None:
+            info["video_codec"] = _codec_string(data, entry) if entry else None
+            info["width"], info["height"] = _video_size(data, trak, entry)
+            if info["duration"] is None:
+                mdhd = find_box(data, "mdia/mdhd", trak.payload_offset, trak.end)
+                if mdhd is not None:
+                    timescale, duration = _duration_fields(data, mdhd)
+                    info["duration"] = duration / timescale if timescale else None
+        elif handler == "soun" and info["audio_codec"] is None:
+            info["audio_codec"] = entry.type if entry else None
+
+    if info["duration"]:
+        info["bitrate"] = int(file_size * 8 / info["duration"])
+    return info
+
+
+# ==================== Fast start ====================
+
+# Path from moov to the boxes holding chunk offsets
+_STBL_PATH = ("trak", "mdia", "minf", "stbl")
+
+
+class _NeedsCo64(Exception):
+    pass
+
+
+def _box_bytes(box_type: str, payload: bytes) -> bytes:
+    if len(payload) + 8 <= 0xFFFFFFFF:
+        return struct.pack(">I4s", len(payload) + 8, box_type.encode("latin-1")) + payload
+    return struct.pack(">I4sQ", 1, box_type.encode("latin-1"), len(payload) + 16) + payload
+
+
+def _chunk_offset_box(data, box: Box, relocate, force_co64: bool) -> bytes:
+    p = box.payload_offset
+    count = struct.unpack_from(">I", data, p + 4)[0]
+    code = "I" if box.type == "stco" else "Q"
+    offsets = [relocate(o) for o in struct.unpack_from(f">{count}{code}", data, p + 8)]
+    if box.type == "co64" or force_co64:
+        return _box_bytes("co64", bytes(data[p:p + 8]) + struct.pack(f">{count}Q", *offsets))
+    if offsets and max(offsets) > 0xFFFFFFFF:
+        raise _NeedsCo64()
+    return _box_bytes("stco", bytes(data[p:p + 8]) + struct.pack(f">{count}I", *offsets))
+
+
+def _rewrite_moov(data, moov: Box, relocate, force_co64: bool) -> bytes:
+    """Copy of `moov` with every stco/co64 entry passed through relocate()"""
+
+    def rewrite(start: int, end: int, depth: int) -> bytes:
+        out = []
+        for box in iter_boxes(data, start, end):
+            if depth < len(_STBL_PATH) and box.type == _STBL_PATH[depth]:
+                out.append(_box_bytes(box.type, rewrite(box.payload_offset, box.end, depth + 1)))
+            elif depth == len(_STBL_PATH) and box.type in ("stco", "co64"):
+                out.append(_chunk_offset_box(data, box, relocate, force_co64))
+            else:
+                out.append(bytes(data[box.offset:box.end]))
+        return b"".join(out)
+
+    return _box_bytes("moov", rewrite(moov.header_size, moov.size, 0))
+
+
+def _copy_range(src, dst, start: int, length: int, chunk_size: int):
+    src.seek(start)
+    while length > 0:
+        chunk = src.read(min(chunk_size, length))
+        if not chunk:
+            raise MP4Error("Unexpected end of file")
+        dst.write(chunk)
+        length -= len(chunk)
+
+
+def faststart(src, dst, chunk_size: int = None) -> bool:
+    """
+    Write `src` to `dst` with `moov` moved ahead of the media data, fixing up
+    every chunk offset. Returns False (writing nothing) when the file is
+    already fast-start or is fragmented. Memory use is the size of `moov` plus
+    one copy buffer, whatever the file size.
+    """
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+    moov, data, top_level = read_moov(src)
+    types = [box.type for box in top_level]
+    if "moof" in types or "mdat" not in types or types.index("moov") < types.index("mdat"):
+        return False
+
+    first_mdat = types.index("mdat")
+    head = [box for box in top_level[:first_mdat] if box.type != "moov"]
+    tail = [box for box in top_level[first_mdat:] if box.type != "moov"]
+    head_size = sum(box.size for box in head)
+
+    force_co64 = False
+    while True:
+        # moov only changes size if stco has to become co64, so its size with
+        # unchanged offsets gives the final layout
+        new_moov_size = len(_rewrite_moov(data, moov, lambda offset: offset, force_co64))
+        moves = []  # (old start, old end, shift) for every box that moves
+        position = head_size + new_moov_size
+        for box in tail:
+            moves.append((box.offset, box.end, position - box.offset))
+            position += box.size
+
+        def relocate(offset: int) -> int:
+            for start, end, shift in moves:
+                if start <= offset < end:
+                    return offset + shift
+            if offset < head_size:
+                return offset
+            raise MP4Error(f"Chunk offset {offset} outside the media data")
+
+        try:
+            new_moov = _rewrite_moov(data, moov, relocate, force_co64)
+            break
+        except _NeedsCo64:
+            force_co64 = True
+
+    for box in head:
+        _copy_range(src, dst, box.offset, box.size, chunk_size)
+    dst.write(new_moov)
+    for box in tail:
+        _copy_range(src, dst, box.offset, box.size, chunk_size)
+    return True
+
+
+# ==================== Keyframe index ====================
+
+def _table(data, box: Box, code: str, header: int = 8) -> tuple:
+    """Entries of a full-box table: version/flags, entry_count, then the entries"""
+    count = struct.unpack_from(">I", data, box.payload_offset + header - 4)[0]
+    return struct.unpack_from(f">{count * len(code)}{code[0]}", data, box.payload_offset + header) if count else ()
+
+
+def _track_by_handler(data, moov: Box, handler: str) -> Optional[Box]:
+    for trak in iter_boxes(data, moov.header_size):
+        if trak.type == "trak" and _handler_type(data, trak) == handler:
+            return trak
+    return None
+
+
+def keyframe_index(f, min_spacing: float = 1.0) -> list[tuple[float, int]]:
+    """
+    (seconds, byte offset) of every sync sample in the first video track, built
+    from stts (timing), stss (sync samples), stsc/stco/co64 (chunk layout) and
+    stsz (sample sizes). Tracks without stss have only sync samples; those are
+    thinned to one point per `min_spacing` seconds.
+    """
+    moov, data, _ = read_moov(f)
+    trak = _track_by_handler(data, moov, "vide")
+    if trak is None:
+        raise MP4Error("No video track")
+    mdhd = find_box(data, "mdia/mdhd", trak.payload_offset, trak.end)
+    stbl = find_box(data, "mdia/minf/stbl", trak.payload_offset, trak.end)
+    if mdhd is None or stbl is None:
+        raise MP4Error("Incomplete video track")
+    timescale, _ = _duration_fields(data, mdhd)
+    boxes = {box.type: box for box in iter_boxes(data, stbl.payload_offset, stbl.end)}
+    chunk_box = boxes.get("stco") or boxes.get("co64")
+    if not timescale or chunk_box is None or not all(name in boxes for name in ("stts", "stsc", "stsz")):
+        raise MP4Error("Missing sample tables")
+
+    chunk_offsets = _table(data, chunk_box, "I" if chunk_box.type == "stco" else "Q")
+    stsc = _table(data, boxes["stsc"], "III")       # first_chunk, samples_per_chunk, description
+    stts = _table(data, boxes["stts"], "II")        # sample_count, sample_delta
+    sync = set(_table(data, boxes["stss"], "I")) if "stss" in boxes else None
+    uniform_size, sample_count = struct.unpack_from(">II", data, boxes["stsz"].payload_offset + 4)
+    sizes = _table(data, boxes["stsz"], "I", header=12) if uniform_size == 0 else None
+
+    def deltas():
+        for i in range(0, len(stts), 2):
+            for _ in range(stts[i]):
+                yield stts[i + 1]
+        while True:
+            yield 0
+
+    points = []
+    delta_iter = deltas()
+    sample, decode_time, next_point, run = 1, 0, 0.0, 0
+    for chunk, chunk_offset in enumerate(chunk_offsets, start=1):
+        # Advance to the last stsc run whose first_chunk <= chunk
+        while run + 3 < len(stsc) and stsc[run + 3] <= chunk:
+            run += 3
+        per_chunk = stsc[run + 1] if stsc and stsc[run] <= chunk else 0
+        offset = chunk_offset
+        for _ in range(per_chunk):
+            if sample > sample_count:
+                break
+            seconds = decode_time / timescale
+            if (sync is None and seconds >= next_point) or (sync is not None and sample in sync):
+                points.append((round(seconds, 3), offset))
+                next_point = seconds + min_spacing
+            offset += sizes[sample - 1] if sizes is not None else uniform_size
+            decode_time += next(delta_iter)
+            sample += 1
+    return points
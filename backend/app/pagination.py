@@ -0,0 +1,92 @@
+"""
+Pagination Utilities - Opaque keyset (cursor) pagination helpers
+"""
+
+import base64
+import json
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, and_, literal, or_
+
+
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return data
+
+
+def encode_key(value):
+    """JSON-safe form of a sort key"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def key_bounds(sort_column, value) -> tuple:
+    """
+    (column, bound value) for comparing `sort_column` with a sort key taken
+    from a cursor; raises 400 if the key doesn't fit the column. The column is
+    compared as stored so the (..., created_at, id) indexes apply; on SQLite the
+    bound datetime is rendered in the same text format the models write.
+    """
+    if isinstance(sort_column.type, DateTime):
+        if not isinstance(value, str):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)  # SQLite stores UTC without an offset
+        return sort_column, literal(value, sort_column.type)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_column, literal(value, sort_column.type)
+
+
+def seek_after(model, sort_column, cursor: dict, descending: bool = True):
+    """
+    Filter for rows strictly after the cursor's row in (sort_column, id)
+    order, both DESC by default or both ASC. The comparison uses the sort key
+    stored in the cursor, so rows whose key changed (views, likes) or that were
+    deleted since the page was served don't shift the next page.
+    """
+    anchor_id = cursor.get("id")
+    if not isinstance(anchor_id, str) or "key" not in cursor:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    sort_column, anchor_key = key_bounds(sort_column, cursor["key"])
+    if descending:
+        return or_(
+            sort_column < anchor_key,
+            and_(sort_column == anchor_key, model.id < anchor_id),
+        )
+    return or_(
+        sort_column > anchor_key,
+        and_(sort_column == anchor_key, model.id > anchor_id),
+    )
+
+
+def next_cursor(rows: list, limit: int, sort_column=None, **extra) -> Optional[str]:
+    """
+    Build the cursor for the page after `rows` (fetched with limit + 1). With
+    `sort_column`, the last row's value of it is stored for seek_after.
+    """
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    data = {**extra, "id": last.id}
+    if sort_column is not None:
+        data["key"] = encode_key(getattr(last, sort_column.key))
+    return encode_cursor(data)
@@ -0,0 +1,21 @@
+"""
+Query Shaping - Eager-loading options shared by list endpoints
+"""
+
+from sqlalchemy.orm import joinedload
+
+from app.models import Video, Comment, User
+
+
+def with_owner(query):
+    """Join each video's owner in the same SELECT, loading only what serializers read"""
+    return query.options(
+        joinedload(Video.owner).load_only(User.id, User.username)
+    )
+
+
+def with_author(query):
+    """Join each comment's author in the same SELECT, loading only what serializers read"""
+    return query.options(
+        joinedload(Comment.user).load_only(User.id, User.username, User.avatar_url)
+    )
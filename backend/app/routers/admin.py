@@ -7,8 +7,14 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Video, Report, User, Notification
-from app.auth import get_admin_user
+from app.models import Video, Report, Notification
+from app.auth import Principal, get_admin_user
+from app.queries import with_owner
+from app.search import index_video, remove_video
+from app.cache import feed_cache, invalidate_feeds
+from app.metrics import collect_metrics
+from app.counters import reconcile_all
+from app.timelines import timeline_store
 
 router = APIRouter()
 
@@ -18,12 +24,12 @@ class RejectRequest(BaseModel):
 
 
 @router.get("/pending")
-async def get_pending_videos(
-    admin: User = Depends(get_admin_user),
+def get_pending_videos(
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db),
 ):
     videos = (
-        db.query(Video)
+        with_owner(db.query(Video))
         .filter(Video.status == "pending")
         .order_by(Video.created_at.desc())
         .all()
@@ -47,9 +53,9 @@ async def get_pending_videos(
 
 
 @router.post("/videos/{video_id}/approve")
-async def approve_video(
+def approve_video(
     video_id: str,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db),
 ):
     video = db.query(Video).filter(Video.id == video_id).first()
@@ -57,6 +63,8 @@ async def approve_video(
         raise HTTPException(status_code=404, detail="Video not found")
 
     video.status = "approved"
+    index_video(db, video)
+    timeline_store.fan_out(db, video)
 
     # Notify owner
     notif = Notification(
@@ -67,15 +75,16 @@ async def approve_video(
     )
     db.add(notif)
     db.commit()
+    invalidate_feeds()
 
     return {"success": True, "message": "Video approved"}
 
 
 @router.post("/videos/{video_id}/reject")
-async def reject_video(
+def reject_video(
     video_id: str,
     req: RejectRequest,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db),
 ):
     video = db.query(Video).filter(Video.id == video_id).first()
@@ -83,6 +92,7 @@ async def reject_video(
         raise HTTPException(status_code=404, detail="Video not found")
 
     video.status = "rejected"
+    remove_video(db, video.id)
 
     # Notify owner
     notif = Notification(
@@ -93,13 +103,14 @@ async def reject_video(
     )
     db.add(notif)
     db.commit()
+    invalidate_feeds()
 
     return {"success": True, "message": "Video rejected"}
 
 
 @router.get("/reports")
-async def get_reports(
-    admin: User = Depends(get_admin_user),
+def get_reports(
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db),
 ):
     reports = (
@@ -128,9 +139,9 @@ async def get_reports(
 
 
 @router.post("/reports/{report_id}/resolve")
-async def resolve_report(
+def resolve_report(
     report_id: str,
-    admin: User = Depends(get_admin_user),
+    admin: Principal = Depends(get_admin_user),
     db: Session = Depends(get_db),
 ):
     report = db.query(Report).filter(Report.id == report_id).first()
@@ -141,3 +152,19 @@ async def resolve_report(
     db.commit()
 
     return {"success": True, "message": "Report resolved"}
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(admin: Principal = Depends(get_admin_user)):
+    return {"success": True, "data": {"feeds": feed_cache.stats()}}
+
+
+@router.get("/metrics")
+async def get_metrics(admin: Principal = Depends(get_admin_user)):
+    return {"success": True, "data": collect_metrics()}
+
+
+@router.post("/counters/reconcile")
+def reconcile_counters(admin: Principal = Depends(get_admin_user)):
+    """Recompute denormalized counters now instead of waiting for the background job"""
+    return {"success": True, "data": {"repaired": reconcile_all()}}
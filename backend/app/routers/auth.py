@@ -11,7 +11,7 @@ import uuid
 from app.database import get_db
 from app.models import User, RefreshToken, PasswordReset
 from app.auth import (
-    hash_password, verify_password,
+    hash_password, verify_and_update_password,
     create_access_token, create_refresh_token, decode_token,
     get_current_user,
 )
@@ -49,7 +49,7 @@ class ResetPasswordRequest(BaseModel):
 # ==================== Endpoints ====================
 
 @router.post("/register")
-async def register(req: RegisterRequest, db: Session = Depends(get_db)):
+def register(req: RegisterRequest, db: Session = Depends(get_db)):
     # Check if email exists
     if db.query(User).filter(User.email == req.email).first():
         raise HTTPException(status_code=400, detail="Email already registered")
@@ -87,14 +87,22 @@ async def register(req: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login")
-async def login(req: LoginRequest, db: Session = Depends(get_db)):
+def login(req: LoginRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == req.email).first()
-    if not user or not verify_password(req.password, user.password_hash):
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    valid, new_hash = verify_and_update_password(req.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     if not user.is_active:
         raise HTTPException(status_code=403, detail="Account is deactivated")
 
+    # Transparently upgrade hashes made with old Argon2 cost parameters
+    if new_hash:
+        user.password_hash = new_hash
+
     # Create tokens
     access_token = create_access_token(data={"sub": user.id})
     refresh_token = create_refresh_token(data={"sub": user.id})
@@ -126,7 +134,7 @@ async def login(req: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/refresh")
-async def refresh_token(req: RefreshRequest, db: Session = Depends(get_db)):
+def refresh_token(req: RefreshRequest, db: Session = Depends(get_db)):
     payload = decode_token(req.refresh_token)
 
     if payload.get("type") != "refresh":
@@ -153,7 +161,7 @@ async def refresh_token(req: RefreshRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/logout")
-async def logout(req: LogoutRequest, db: Session = Depends(get_db)):
+def logout(req: LogoutRequest, db: Session = Depends(get_db)):
     if req.refresh_token:
         stored = db.query(RefreshToken).filter(RefreshToken.token == req.refresh_token).first()
         if stored:
@@ -180,7 +188,7 @@ async def get_me(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/forgot-password")
-async def forgot_password(req: ForgotPasswordRequest, db: Session = Depends(get_db)):
+def forgot_password(req: ForgotPasswordRequest, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == req.email).first()
     # Always return success to prevent email enumeration
     if user:
@@ -198,7 +206,7 @@ async def forgot_password(req: ForgotPasswordRequest, db: Session = Depends(get_
 
 
 @router.post("/reset-password")
-async def reset_password(req: ResetPasswordRequest, db: Session = Depends(get_db)):
+def reset_password(req: ResetPasswordRequest, db: Session = Depends(get_db)):
     pr = db.query(PasswordReset).filter(
         PasswordReset.token == req.token,
         PasswordReset.used == False,
@@ -1,69 +1,135 @@
 """
-Comments Router - CRUD for video comments
+Comments Router - CRUD for video comments and their reply threads
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Comment, Video, User
-from app.auth import get_current_user
+from app.models import Comment, Video
+from app.auth import Principal, get_current_principal, has_role
+from app.queries import with_author
+from app.counters import increment
+from app.pagination import decode_cursor, next_cursor, seek_after
 
 router = APIRouter()
 
+# sort name -> (column, descending); ties are broken by id in the same direction
+COMMENT_SORTS = {
+    "newest": (Comment.created_at, True),
+    "oldest": (Comment.created_at, False),
+    "top": (Comment.likes_count, True),
+}
+
 
 class CommentCreate(BaseModel):
     content: str
+    parent_id: Optional[str] = None
 
 
-@router.get("/videos/{video_id}/comments")
-async def get_comments(video_id: str, db: Session = Depends(get_db)):
-    comments = (
-        db.query(Comment)
-        .filter(Comment.video_id == video_id, Comment.is_deleted == False)
-        .order_by(Comment.created_at.desc())
-        .all()
-    )
+def serialize_comment(c: Comment) -> dict:
     return {
-        "success": True,
-        "data": {
-            "comments": [
-                {
-                    "id": c.id,
-                    "video_id": c.video_id,
-                    "user_id": c.user_id,
-                    "username": c.user.username if c.user else "unknown",
-                    "content": c.content,
-                    "likes_count": c.likes_count,
-                    "created_at": str(c.created_at),
-                }
-                for c in comments
-            ]
-        }
+        "id": c.id,
+        "video_id": c.video_id,
+        "user_id": c.user_id,
+        "username": c.user.username if c.user else "unknown",
+        "avatar_url": c.user.avatar_url if c.user else None,
+        "content": c.content,
+        "likes_count": c.likes_count or 0,
+        "parent_id": c.parent_id,
+        "replies_count": c.replies_count or 0,
+        "created_at": str(c.created_at),
     }
 
 
+def _page(query, sort: str, limit: int, cursor: Optional[str]) -> dict:
+    """One keyset page of `query` in the given sort order; the cursor is bound to the sort"""
+    sort_column, descending = COMMENT_SORTS[sort]
+    if cursor:
+        cursor_data = decode_cursor(cursor)
+        if cursor_data.get("sort") != sort:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.filter(seek_after(Comment, sort_column, cursor_data, descending))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), Comment.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), Comment.id.asc())
+    comments = query.limit(limit + 1).all()
+
+    return {
+        "comments": [serialize_comment(c) for c in comments[:limit]],
+        "next_cursor": next_cursor(comments, limit, sort_column, sort=sort),
+    }
+
+
+@router.get("/videos/{video_id}/comments")
+def get_comments(
+    video_id: str,
+    sort: str = Query("newest", regex="^(newest|oldest|top)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """Top-level comments; replies are fetched per thread from /comments/{id}/replies"""
+    query = with_author(db.query(Comment)).filter(
+        Comment.video_id == video_id,
+        Comment.parent_id.is_(None),
+        Comment.is_deleted == False,
+    )
+    return {"success": True, "data": _page(query, sort, limit, cursor)}
+
+
+@router.get("/comments/{comment_id}/replies")
+def get_replies(
+    comment_id: str,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    query = with_author(db.query(Comment)).filter(
+        Comment.parent_id == comment_id,
+        Comment.is_deleted == False,
+    )
+    return {"success": True, "data": _page(query, "oldest", limit, cursor)}
+
+
 @router.post("/videos/{video_id}/comments")
-async def create_comment(
+def create_comment(
     video_id: str,
     req: CommentCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
-    video = db.query(Video).filter(Video.id == video_id).first()
-    if not video:
+    parent_id = None
+    if req.parent_id:
+        parent = (
+            db.query(Comment.id, Comment.video_id, Comment.parent_id)
+            .filter(Comment.id == req.parent_id, Comment.is_deleted == False)
+            .first()
+        )
+        if not parent or parent.video_id != video_id:
+            raise HTTPException(status_code=404, detail="Parent comment not found")
+        # Threads are one level deep: a reply to a reply joins the root's thread
+        parent_id = parent.parent_id or parent.id
+
+    # Update comment count (also the existence check)
+    if not increment(db, Video, video_id, "comments_count", 1):
         raise HTTPException(status_code=404, detail="Video not found")
+    if parent_id:
+        increment(db, Comment, parent_id, "replies_count", 1)
 
     comment = Comment(
         video_id=video_id,
         user_id=current_user.id,
+        parent_id=parent_id,
         content=req.content,
     )
     db.add(comment)
-
-    # Update comment count
-    video.comments_count = (video.comments_count or 0) + 1
     db.commit()
     db.refresh(comment)
 
@@ -73,30 +139,36 @@ async def create_comment(
             "id": comment.id,
             "content": comment.content,
             "username": current_user.username,
+            "parent_id": comment.parent_id,
             "created_at": str(comment.created_at),
         }
     }
 
 
 @router.delete("/comments/{comment_id}")
-async def delete_comment(
+def delete_comment(
     comment_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     comment = db.query(Comment).filter(Comment.id == comment_id).first()
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
 
-    if comment.user_id != current_user.id and current_user.role != "admin":
+    if comment.user_id != current_user.id and not has_role(db, current_user, "admin"):
         raise HTTPException(status_code=403, detail="Not authorized")
 
-    # Update video comment count
-    video = db.query(Video).filter(Video.id == comment.video_id).first()
-    if video:
-        video.comments_count = max(0, (video.comments_count or 1) - 1)
-
-    comment.is_deleted = True
+    # Only the request that actually flips is_deleted decrements the counts
+    flipped = db.execute(
+        update(Comment)
+        .where(Comment.id == comment_id, Comment.is_deleted == False)
+        .values(is_deleted=True)
+        .execution_options(synchronize_session=False)
+    )
+    if flipped.rowcount:
+        increment(db, Video, comment.video_id, "comments_count", -1)
+        if comment.parent_id:
+            increment(db, Comment, comment.parent_id, "replies_count", -1)
     db.commit()
 
     return {"success": True, "message": "Comment deleted"}
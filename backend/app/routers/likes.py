@@ -3,61 +3,60 @@ Likes Router - Like/Unlike videos
 """
 
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import VideoLike, Video, User
-from app.auth import get_current_user
+from app.models import VideoLike, Video
+from app.auth import Principal, get_current_principal
+from app.cache import invalidate_feeds
+from app.counters import increment
 
 router = APIRouter()
 
 
 @router.post("/videos/{video_id}/like")
-async def like_video(
+def like_video(
     video_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
-    video = db.query(Video).filter(Video.id == video_id).first()
-    if not video:
-        raise HTTPException(status_code=404, detail="Video not found")
-
-    existing = db.query(VideoLike).filter(
-        VideoLike.video_id == video_id,
-        VideoLike.user_id == current_user.id,
-    ).first()
-
-    if existing:
+    # The unique constraint decides duplicates, so there is no check-then-insert race
+    try:
+        db.add(VideoLike(video_id=video_id, user_id=current_user.id))
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        if not db.query(Video.id).filter(Video.id == video_id).first():
+            raise HTTPException(status_code=404, detail="Video not found")
         raise HTTPException(status_code=400, detail="Already liked")
 
-    like = VideoLike(video_id=video_id, user_id=current_user.id)
-    db.add(like)
-    video.likes_count = (video.likes_count or 0) + 1
+    # Counter last: the video row stays locked only until the commit
+    if not increment(db, Video, video_id, "likes_count", 1):
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Video not found")
     db.commit()
+    invalidate_feeds()
 
     return {"success": True, "message": "Video liked"}
 
 
 @router.delete("/videos/{video_id}/like")
-async def unlike_video(
+def unlike_video(
     video_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
-    existing = db.query(VideoLike).filter(
+    removed = db.execute(delete(VideoLike).where(
         VideoLike.video_id == video_id,
         VideoLike.user_id == current_user.id,
-    ).first()
-
-    if not existing:
+    ))
+    if not removed.rowcount:
         raise HTTPException(status_code=400, detail="Not liked yet")
 
-    db.delete(existing)
-
-    video = db.query(Video).filter(Video.id == video_id).first()
-    if video:
-        video.likes_count = max(0, (video.likes_count or 1) - 1)
-
+    increment(db, Video, video_id, "likes_count", -1)
     db.commit()
+    invalidate_feeds()
 
     return {"success": True, "message": "Like removed"}
@@ -6,15 +6,15 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Notification, User
-from app.auth import get_current_user
+from app.models import Notification
+from app.auth import Principal, get_current_principal
 
 router = APIRouter()
 
 
 @router.get("")
-async def get_notifications(
-    current_user: User = Depends(get_current_user),
+def get_notifications(
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     notifications = (
@@ -43,8 +43,8 @@ async def get_notifications(
 
 
 @router.get("/unread-count")
-async def get_unread_count(
-    current_user: User = Depends(get_current_user),
+def get_unread_count(
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     count = (
@@ -59,9 +59,9 @@ async def get_unread_count(
 
 
 @router.put("/{notification_id}/read")
-async def mark_read(
+def mark_read(
     notification_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     notif = db.query(Notification).filter(
@@ -79,8 +79,8 @@ async def mark_read(
 
 
 @router.put("/read-all")
-async def mark_all_read(
-    current_user: User = Depends(get_current_user),
+def mark_all_read(
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     db.query(Notification).filter(
@@ -5,10 +5,11 @@ Playlists Router - CRUD for playlists and playlist videos
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from sqlalchemy import func
 
 from app.database import get_db
-from app.models import Playlist, PlaylistVideo, Video, User
-from app.auth import get_current_user
+from app.models import Playlist, PlaylistVideo, Video
+from app.auth import Principal, get_current_principal
 
 router = APIRouter()
 
@@ -24,8 +25,8 @@ class PlaylistVideoAdd(BaseModel):
 
 
 @router.get("")
-async def get_user_playlists(
-    current_user: User = Depends(get_current_user),
+def get_user_playlists(
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     playlists = (
@@ -35,9 +36,17 @@ async def get_user_playlists(
         .all()
     )
 
+    # One grouped count for all playlists instead of one COUNT per row
+    video_counts = dict(
+        db.query(PlaylistVideo.playlist_id, func.count(PlaylistVideo.id))
+        .filter(PlaylistVideo.playlist_id.in_([p.id for p in playlists]))
+        .group_by(PlaylistVideo.playlist_id)
+        .all()
+    ) if playlists else {}
+
     result = []
     for p in playlists:
-        video_count = db.query(PlaylistVideo).filter(PlaylistVideo.playlist_id == p.id).count()
+        video_count = video_counts.get(p.id, 0)
         result.append({
             "id": p.id,
             "title": p.title,
@@ -51,9 +60,9 @@ async def get_user_playlists(
 
 
 @router.post("")
-async def create_playlist(
+def create_playlist(
     req: PlaylistCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     playlist = Playlist(
@@ -76,10 +85,10 @@ async def create_playlist(
 
 
 @router.post("/{playlist_id}/videos")
-async def add_video_to_playlist(
+def add_video_to_playlist(
     playlist_id: str,
     req: PlaylistVideoAdd,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     playlist = db.query(Playlist).filter(
@@ -117,10 +126,10 @@ async def add_video_to_playlist(
 
 
 @router.delete("/{playlist_id}/videos/{video_id}")
-async def remove_video_from_playlist(
+def remove_video_from_playlist(
     playlist_id: str,
     video_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     playlist = db.query(Playlist).filter(
@@ -146,9 +155,9 @@ async def remove_video_from_playlist(
 
 
 @router.delete("/{playlist_id}")
-async def delete_playlist(
+def delete_playlist(
     playlist_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     playlist = db.query(Playlist).filter(
@@ -7,8 +7,8 @@ from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.models import Report, Video, User
-from app.auth import get_current_user
+from app.models import Report, Video
+from app.auth import Principal, get_current_principal
 
 router = APIRouter()
 
@@ -19,10 +19,10 @@ class ReportCreate(BaseModel):
 
 
 @router.post("/videos/{video_id}/report")
-async def report_video(
+def report_video(
     video_id: str,
     req: ReportCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     video = db.query(Video).filter(Video.id == video_id).first()
@@ -2,14 +2,23 @@
 Users Router - Profile, Follow/Unfollow, Update
 """
 
+from typing import Optional
+
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
 from app.database import get_db
 from app.models import User, Follow
-from app.auth import get_current_user, get_optional_user
+from app.auth import (
+    Principal, get_current_principal, get_optional_principal, get_current_user,
+    load_principal, invalidate_principal,
+)
+from app.viewer_state import user_states
+from app.counters import increment
+from app.timelines import timeline_store
 
 router = APIRouter()
 
@@ -20,24 +29,19 @@ class ProfileUpdate(BaseModel):
 
 
 @router.get("/{user_id}")
-async def get_user_profile(
+def get_user_profile(
     user_id: str,
-    current_user: User = Depends(get_optional_user),
+    current_user: Optional[Principal] = Depends(get_optional_principal),
     db: Session = Depends(get_db),
 ):
+    # Counts are maintained on the row, so the profile is a single primary-key read
     user = db.query(User).filter(User.id == user_id, User.is_active == True).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    followers_count = db.query(Follow).filter(Follow.following_id == user_id).count()
-    following_count = db.query(Follow).filter(Follow.follower_id == user_id).count()
-
     is_following = False
     if current_user:
-        is_following = db.query(Follow).filter(
-            Follow.follower_id == current_user.id,
-            Follow.following_id == user_id,
-        ).first() is not None
+        is_following = user_states(db, current_user.id, [user_id])[user_id]["is_following"]
 
     return {
         "success": True,
@@ -47,8 +51,8 @@ async def get_user_profile(
             "bio": user.bio,
             "avatar_url": user.avatar_url,
             "role": user.role,
-            "followers_count": followers_count,
-            "following_count": following_count,
+            "followers_count": user.followers_count or 0,
+            "following_count": user.following_count or 0,
             "is_following": is_following,
             "created_at": str(user.created_at),
         }
@@ -56,7 +60,7 @@ async def get_user_profile(
 
 
 @router.put("/profile")
-async def update_profile(
+def update_profile(
     req: ProfileUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
@@ -67,6 +71,7 @@ async def update_profile(
         current_user.avatar_url = req.avatar_url
 
     db.commit()
+    invalidate_principal(current_user.id)
 
     return {
         "success": True,
@@ -79,48 +84,49 @@ async def update_profile(
 
 
 @router.post("/{user_id}/follow")
-async def follow_user(
+def follow_user(
     user_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     if current_user.id == user_id:
         raise HTTPException(status_code=400, detail="Cannot follow yourself")
 
-    target = db.query(User).filter(User.id == user_id, User.is_active == True).first()
+    target = load_principal(db, user_id)
     if not target:
         raise HTTPException(status_code=404, detail="User not found")
 
-    existing = db.query(Follow).filter(
-        Follow.follower_id == current_user.id,
-        Follow.following_id == user_id,
-    ).first()
-
-    if existing:
+    # The unique constraint decides duplicates, so there is no check-then-insert race
+    try:
+        with db.begin_nested():
+            db.add(Follow(follower_id=current_user.id, following_id=user_id))
+    except IntegrityError:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Already following")
-
-    follow = Follow(follower_id=current_user.id, following_id=user_id)
-    db.add(follow)
+    increment(db, User, user_id, "followers_count", 1)
+    increment(db, User, current_user.id, "following_count", 1)
+    timeline_store.backfill(db, current_user.id, user_id)
     db.commit()
 
     return {"success": True, "message": "Now following"}
 
 
 @router.delete("/{user_id}/follow")
-async def unfollow_user(
+def unfollow_user(
     user_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
-    existing = db.query(Follow).filter(
+    removed = db.execute(delete(Follow).where(
         Follow.follower_id == current_user.id,
         Follow.following_id == user_id,
-    ).first()
-
-    if not existing:
+    ))
+    if not removed.rowcount:
         raise HTTPException(status_code=400, detail="Not following")
 
-    db.delete(existing)
+    increment(db, User, user_id, "followers_count", -1)
+    increment(db, User, current_user.id, "following_count", -1)
+    timeline_store.remove_owner(db, current_user.id, user_id)
     db.commit()
 
     return {"success": True, "message": "Unfollowed"}
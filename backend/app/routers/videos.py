@@ -2,20 +2,48 @@
 Videos Router - CRUD, Upload (S3 presigned + local), Stream, Download
 """
 
+import hmac
 import os
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, RedirectResponse
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, or_, update
 
 from app.database import get_db
-from app.models import Video, User, VideoLike
-from app.auth import get_current_user, get_optional_user
+from app.models import Video
+from app.auth import (
+    Principal, get_current_principal, get_optional_principal,
+    create_download_token, verify_download_token, load_principal,
+    create_dedup_token, verify_dedup_token, has_role,
+)
+from app.cache import feed_cache, feed_cache_key, invalidate_feeds
 from app.config import get_settings
+from app.pagination import decode_cursor, encode_cursor, next_cursor, seek_after
+from app.queries import with_owner
+from app.search import search_videos, remove_video
+from app.view_counter import view_counter
+from app.media import media_pipeline
+from app.blobs import (
+    attach_blob, collect_blob, dedup_challenge, discard_upload, expected_proof,
+    find_blob, release_blob, store_local_upload,
+)
+from app.video_counts import video_total
+from app.uploads import StreamedUpload, stream_upload_to_file
+from app.admission import upload_scheduler
+from app.viewer_state import video_states
+from app.timelines import timeline_store
+from app.streaming import content_disposition, file_response
+from app.keyframes import keyframe_at
+from app.storage import (
+    MAX_PARTS, get_s3_client, is_local_key, local_multipart, multipart_storage_for,
+    presigned_get_url, s3_enabled,
+)
 
 router = APIRouter()
 settings = get_settings()
@@ -31,26 +59,99 @@ class VideoInitRequest(BaseModel):
     allow_download: bool = False
     ai_model: str = None
     ai_prompt: str = None
+    multipart: bool = False
+    sha256: str = None  # with size_bytes: offer to skip the upload if the file is already stored
+    size_bytes: int = None
+
+class UploadedPart(BaseModel):
+    part_number: int
+    etag: str
 
 class VideoCompleteRequest(BaseModel):
     uploadId: str
     s3_key: str
     size_bytes: int = 0
     duration_seconds: int = 0
+    parts: list[UploadedPart] = None  # multipart only; defaults to every uploaded part
+    dedup_token: str = None  # answer to the init `dedup` challenge instead of uploading
+    dedup_proof: str = None
+
+class PartUrlsRequest(BaseModel):
+    part_numbers: list[int]
+
+
+SORT_COLUMNS = {
+    "newest": Video.created_at,
+    "popular": Video.views,
+    "likes": Video.likes_count,
+}
 
 
 # ==================== Endpoints ====================
 
+def serialize_video_card(v: Video) -> dict:
+    return {
+        "id": v.id,
+        "title": v.title,
+        "description": v.description,
+        "type": v.type,
+        "tags": v.tags or [],
+        "thumbnail_url": v.thumbnail_url,
+        "views": v.views,
+        "likes_count": v.likes_count,
+        "comments_count": v.comments_count,
+        "owner_id": v.owner_id,
+        "owner_username": v.owner.username if v.owner else "unknown",
+        "created_at": str(v.created_at),
+        "allow_download": v.allow_download,
+    }
+
+
+def with_viewer_state(db: Session, response: dict, user: Optional[Principal]) -> dict:
+    """
+    Copy of a video list response with the viewer's is_liked/in_playlist on
+    each card. The cached response is shared, so it is never modified.
+    """
+    if user is None:
+        return response
+    videos = response["data"]["videos"]
+    states = video_states(db, user.id, [v["id"] for v in videos])
+    return {
+        **response,
+        "data": {**response["data"], "videos": [{**v, **states[v["id"]]} for v in videos]},
+    }
+
+
 @router.get("")
-async def list_videos(
-    sort: str = Query("newest", regex="^(newest|popular|likes)$"),
+def list_videos(
+    sort: Optional[str] = Query(None, regex="^(newest|popular|likes|relevance)$"),
     type: Optional[str] = Query(None, regex="^(ai|human)$"),
     q: Optional[str] = None,
     limit: int = Query(20, ge=1, le=100),
     page: int = Query(1, ge=1),
+    cursor: Optional[str] = None,
     owner: Optional[str] = None,
+    include_total: bool = True,
+    viewer_state: bool = False,
+    user: Optional[Principal] = Depends(get_optional_principal),
     db: Session = Depends(get_db),
 ):
+    # Searches rank by relevance unless another sort is asked for
+    sort = sort or ("relevance" if q else "newest")
+    if sort == "relevance" and not q:
+        raise HTTPException(status_code=400, detail="Relevance sort requires a search query")
+
+    # Plain feeds (no search) are served from the feed cache
+    cache_key = None
+    if not q:
+        cache_key = feed_cache_key(
+            sort=sort, type=type, owner=owner, limit=limit,
+            page=None if cursor else page, cursor=cursor, include_total=include_total,
+        )
+        cached = feed_cache.get(cache_key)
+        if cached is not None:
+            return with_viewer_state(db, cached, user if viewer_state else None)
+
     query = db.query(Video).filter(Video.status == "approved")
 
     # Type filter
@@ -62,71 +163,119 @@ async def list_videos(
         query = query.filter(Video.owner_id == owner)
 
     # Search
+    hits = {}
     if q:
-        query = query.filter(Video.title.ilike(f"%{q}%"))
-
-    # Sort
-    if sort == "popular":
-        query = query.order_by(desc(Video.views))
-    elif sort == "likes":
-        query = query.order_by(desc(Video.likes_count))
+        hits = {h["id"]: h for h in search_videos(db, q)}
+        query = query.filter(Video.id.in_(list(hits)))
+
+    cursor_data = decode_cursor(cursor) if cursor else None
+    if cursor_data is not None and cursor_data.get("sort") != sort:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    total = None
+    if sort == "relevance":
+        # Rank order comes from the search engine; the DB only applies filters
+        matching = {row.id for row in query.with_entities(Video.id)}
+        ranked_ids = [vid for vid in hits if vid in matching]
+        if cursor_data is not None:
+            offset = cursor_data.get("offset")
+            if not isinstance(offset, int) or offset < 0:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        else:
+            offset = (page - 1) * limit
+            total = len(ranked_ids) if include_total else None
+        page_ids = ranked_ids[offset:offset + limit]
+        by_id = {v.id: v for v in with_owner(db.query(Video)).filter(Video.id.in_(page_ids))}
+        videos = [by_id[vid] for vid in page_ids if vid in by_id]
+        cursor_next = (
+            encode_cursor({"sort": sort, "offset": offset + limit})
+            if offset + limit < len(ranked_ids) else None
+        )
     else:
-        query = query.order_by(desc(Video.created_at))
+        # Sort (id breaks ties so keyset pages are stable)
+        sort_column = SORT_COLUMNS[sort]
+        query = query.order_by(desc(sort_column), desc(Video.id))
+
+        # Pagination: keyset when a cursor is given, offset otherwise
+        if cursor_data is not None:
+            query = query.filter(seek_after(Video, sort_column, cursor_data))
+        else:
+            if include_total:
+                total = video_total(db, query, "approved", type=type, owner=owner, exact_only=bool(q))
+            query = query.offset((page - 1) * limit)
+
+        videos = with_owner(query).limit(limit + 1).all()
+        cursor_next = next_cursor(videos, limit, sort_column, sort=sort)
+        videos = videos[:limit]
+
+    results = []
+    for v in videos:
+        item = serialize_video_card(v)
+        if q:
+            item["highlight"] = hits[v.id]["highlight"]
+        results.append(item)
+
+    response = {
+        "success": True,
+        "data": {
+            "videos": results,
+            "total": total,
+            "page": None if cursor else page,
+            "limit": limit,
+            "next_cursor": cursor_next,
+        }
+    }
+    if cache_key is not None:
+        feed_cache.set(cache_key, response)
+    return with_viewer_state(db, response, user if viewer_state else None)
 
-    # Pagination
-    offset = (page - 1) * limit
-    total = query.count()
-    videos = query.offset(offset).limit(limit).all()
 
-    return {
+@router.get("/feed")
+def following_feed(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    viewer_state: bool = False,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    """Newest approved videos from accounts the caller follows"""
+    cursor_data = None
+    if cursor:
+        cursor_data = decode_cursor(cursor)
+        if cursor_data.get("sort") != "feed":
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    page_ids, next_page = timeline_store.read(db, current_user.id, limit, cursor_data)
+    by_id = {v.id: v for v in with_owner(db.query(Video)).filter(Video.id.in_(page_ids))} if page_ids else {}
+    videos = [serialize_video_card(by_id[vid]) for vid in page_ids if vid in by_id]
+
+    response = {
         "success": True,
         "data": {
-            "videos": [
-                {
-                    "id": v.id,
-                    "title": v.title,
-                    "description": v.description,
-                    "type": v.type,
-                    "tags": v.tags or [],
-                    "thumbnail_url": v.thumbnail_url,
-                    "views": v.views,
-                    "likes_count": v.likes_count,
-                    "comments_count": v.comments_count,
-                    "owner_id": v.owner_id,
-                    "owner_username": v.owner.username if v.owner else "unknown",
-                    "created_at": str(v.created_at),
-                    "allow_download": v.allow_download,
-                }
-                for v in videos
-            ],
-            "total": total,
-            "page": page,
+            "videos": videos,
             "limit": limit,
+            "next_cursor": encode_cursor({"sort": "feed", **next_page}) if next_page else None,
         }
     }
+    return with_viewer_state(db, response, current_user if viewer_state else None)
 
 
 @router.get("/{video_id}")
-async def get_video(
+def get_video(
     video_id: str,
-    user: Optional[User] = Depends(get_optional_user),
+    user: Optional[Principal] = Depends(get_optional_principal),
     db: Session = Depends(get_db),
 ):
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = with_owner(db.query(Video)).filter(Video.id == video_id).first()
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    # Increment views
-    video.views = (video.views or 0) + 1
-    db.commit()
+    # Count the view; it is written to the DB in the next batched flush
+    view_counter.record(video.id)
 
-    # Check if user liked
-    is_liked = False
+    state = {"is_liked": False, "in_playlist": False}
     if user:
-        is_liked = db.query(VideoLike).filter(
-            VideoLike.video_id == video_id,
-            VideoLike.user_id == user.id,
-        ).first() is not None
+        state = video_states(db, user.id, [video.id])[video.id]
 
     return {
         "success": True,
@@ -140,7 +289,12 @@ async def get_video(
             "thumbnail_url": video.thumbnail_url,
             "duration_seconds": video.duration_seconds,
             "size_bytes": video.size_bytes,
-            "views": video.views,
+            "width": video.width,
+            "height": video.height,
+            "video_codec": video.video_codec,
+            "audio_codec": video.audio_codec,
+            "bitrate": video.bitrate,
+            "views": (video.views or 0) + view_counter.pending(video.id),
             "likes_count": video.likes_count,
             "comments_count": video.comments_count,
             "allow_download": video.allow_download,
@@ -149,20 +303,25 @@ async def get_video(
             "owner_username": video.owner.username if video.owner else "unknown",
             "ai_model": video.ai_model,
             "ai_prompt": video.ai_prompt,
-            "is_liked": is_liked,
+            "is_liked": state["is_liked"],
+            "in_playlist": state["in_playlist"],
             "created_at": str(video.created_at),
         }
     }
 
 
 @router.post("/init")
-async def init_upload(
+def init_upload(
     req: VideoInitRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     video_id = str(uuid.uuid4())
-    s3_key = f"videos/{current_user.id}/{video_id}.mp4"
+    if req.multipart and not s3_enabled():
+        # Local multipart uploads are assembled where upload-local stores files
+        s3_key = os.path.join(settings.UPLOAD_DIR, current_user.id, f"{video_id}.mp4")
+    else:
+        s3_key = f"videos/{current_user.id}/{video_id}.mp4"
 
     video = Video(
         id=video_id,
@@ -177,21 +336,42 @@ async def init_upload(
         s3_key=s3_key,
         status="pending",
     )
+
+    # Already stored: the client may prove it has the file and skip the upload
+    dedup = None
+    blob = find_blob(db, req.sha256, req.size_bytes)
+    challenge = blob and dedup_challenge(blob.s3_key)
+    if challenge:
+        index = challenge.pop("index")
+        claims = {"challenge": index, "sha256": blob.sha256, "size": blob.size_bytes}
+        dedup = {**challenge, "token": create_dedup_token(video_id, claims)}
+
+    if req.multipart:
+        try:
+            video.multipart_upload_id = multipart_storage_for(s3_key).create(s3_key)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"Multipart upload init failed: {e}")
+        db.add(video)
+        db.commit()
+        return {
+            "success": True,
+            "data": {
+                "uploadId": video_id,
+                "multipartUploadId": video.multipart_upload_id,
+                "partSize": settings.MULTIPART_PART_SIZE,
+                "s3_key": s3_key,
+                "dedup": dedup,
+            }
+        }
+
     db.add(video)
     db.commit()
 
     # Generate presigned URL if S3 is configured
     presigned_url = None
-    if settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY:
+    if s3_enabled():
         try:
-            import boto3
-            s3_client = boto3.client(
-                "s3",
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION,
-            )
-            presigned_url = s3_client.generate_presigned_url(
+            presigned_url = get_s3_client().generate_presigned_url(
                 "put_object",
                 Params={
                     "Bucket": settings.S3_BUCKET,
@@ -209,14 +389,15 @@ async def init_upload(
             "uploadId": video_id,
             "presignedUrl": presigned_url,
             "s3_key": s3_key,
+            "dedup": dedup,
         }
     }
 
 
 @router.post("/complete")
-async def complete_upload(
+def complete_upload(
     req: VideoCompleteRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     video = db.query(Video).filter(
@@ -227,125 +408,346 @@ async def complete_upload(
     if not video:
         raise HTTPException(status_code=404, detail="Upload not found")
 
-    video.size_bytes = req.size_bytes
+    if req.dedup_token:
+        _attach_known_file(db, video, req)
+    else:
+        video.size_bytes = req.size_bytes
+        if video.multipart_upload_id:
+            _complete_multipart(video, req)
+
     video.duration_seconds = req.duration_seconds
     video.status = "pending"
+    video.processing_status = "queued"
     db.commit()
+    media_pipeline.submit(video.id)
 
     return {
         "success": True,
         "message": "Upload completed, pending review",
-        "data": {"id": video.id},
+        "data": {"id": video.id, "deduplicated": bool(req.dedup_token)},
     }
 
 
-@router.post("/upload-local")
-async def upload_local(
-    video_file: UploadFile = File(..., alias="video"),
-    title: str = Form(...),
-    description: str = Form(""),
-    tags: str = Form(""),
-    type: str = Form("ai"),
-    allow_download: bool = Form(False),
-    current_user: User = Depends(get_current_user),
+def _complete_multipart(video: Video, req: VideoCompleteRequest):
+    storage = multipart_storage_for(video.s3_key)
+    if req.parts:
+        parts = [p.model_dump() for p in req.parts]
+    else:
+        parts = storage.list_parts(video.s3_key, video.multipart_upload_id)
+    parts = sorted(parts, key=lambda p: p["part_number"])
+    if not parts:
+        raise HTTPException(status_code=400, detail="No parts uploaded")
+    missing = sorted(set(range(1, parts[-1]["part_number"] + 1)) - {p["part_number"] for p in parts})
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing parts: {missing[:20]}")
+    video.size_bytes = storage.complete(video.s3_key, video.multipart_upload_id, parts)
+    video.multipart_upload_id = None
+
+
+def _attach_known_file(db: Session, video: Video, req: VideoCompleteRequest):
+    """Skip the upload: check the client's proof against the stored blob and share it"""
+    if video.content_sha256:
+        raise HTTPException(status_code=409, detail="Upload already completed")
+    claims = verify_dedup_token(req.dedup_token, video.id)
+    blob = find_blob(db, claims.get("sha256"), claims.get("size"))
+    try:
+        expected = blob and expected_proof(blob.s3_key, claims.get("challenge"))
+    except Exception as e:
+        print(f"Dedup proof check failed for {video.id}: {e}")
+        expected = None
+    if not expected or not hmac.compare_digest(expected, (req.dedup_proof or "").lower()):
+        raise HTTPException(status_code=400, detail="Dedup proof rejected; upload the file instead")
+
+    upload_key, multipart_upload_id = video.s3_key, video.multipart_upload_id
+    if not attach_blob(db, video, blob.sha256):
+        raise HTTPException(status_code=400, detail="Dedup proof rejected; upload the file instead")
+    if multipart_upload_id:
+        multipart_storage_for(upload_key).abort(upload_key, multipart_upload_id)
+        video.multipart_upload_id = None
+
+
+def _open_multipart_upload(db: Session, video_id: str, owner_id: str) -> Video:
+    video = db.query(Video).filter(Video.id == video_id, Video.owner_id == owner_id).first()
+    if not video or not video.multipart_upload_id:
+        raise HTTPException(status_code=404, detail="Multipart upload not found")
+    return video
+
+
+@router.post("/{video_id}/parts")
+def get_part_urls(
+    video_id: str,
+    req: PartUrlsRequest,
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
-    """Local file upload (fallback when S3 is not configured)"""
-    # Create upload directory
-    upload_dir = os.path.join(settings.UPLOAD_DIR, current_user.id)
-    os.makedirs(upload_dir, exist_ok=True)
+    """Presigned URLs for a batch of parts, so the client can upload them in parallel"""
+    video = _open_multipart_upload(db, video_id, current_user.id)
+    numbers = sorted(set(req.part_numbers))
+    if not numbers or numbers[0] < 1 or numbers[-1] > MAX_PARTS:
+        raise HTTPException(status_code=400, detail=f"Part numbers must be between 1 and {MAX_PARTS}")
+    storage = multipart_storage_for(video.s3_key)
+    urls = storage.presign_parts(video.s3_key, video.multipart_upload_id, numbers, video_id=video.id)
+    return {"success": True, "data": {"parts": urls, "expiresIn": settings.MULTIPART_URL_EXPIRES}}
+
+
+@router.get("/{video_id}/parts")
+def list_uploaded_parts(
+    video_id: str,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    """Parts already stored, so an interrupted upload can resume with the rest"""
+    video = _open_multipart_upload(db, video_id, current_user.id)
+    parts = multipart_storage_for(video.s3_key).list_parts(video.s3_key, video.multipart_upload_id)
+    return {"success": True, "data": {"parts": parts, "partSize": settings.MULTIPART_PART_SIZE}}
 
-    # Save file
-    file_id = str(uuid.uuid4())
-    file_path = os.path.join(upload_dir, f"{file_id}.mp4")
 
-    with open(file_path, "wb") as f:
-        content = await video_file.read()
-        f.write(content)
+@router.put("/{video_id}/parts/{part_number}")
+async def upload_part_local(
+    video_id: str,
+    part_number: int,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...),
+    db: Session = Depends(get_db),
+):
+    """Part upload target for the local backend; authorized by the signed URL"""
+    row = await run_in_threadpool(
+        lambda: db.query(Video.multipart_upload_id, Video.s3_key, Video.owner_id).filter(Video.id == video_id).first()
+    )
+    if not row or not row.multipart_upload_id or not is_local_key(row.s3_key):
+        raise HTTPException(status_code=404, detail="Multipart upload not found")
+    upload_id = row.multipart_upload_id
+    local_multipart.verify_signature(upload_id, part_number, expires, signature)
+    async with upload_scheduler.admit(request, row.owner_id):
+        part = await local_multipart.write_part(upload_id, part_number, request.stream())
+    return JSONResponse(
+        {"success": True, "data": part},
+        headers={"ETag": f'"{part["etag"]}"'},
+    )
 
-    # Create video record
+
+@router.delete("/{video_id}/parts")
+def abort_multipart_upload(
+    video_id: str,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    video = _open_multipart_upload(db, video_id, current_user.id)
+    multipart_storage_for(video.s3_key).abort(video.s3_key, video.multipart_upload_id)
+    video.multipart_upload_id = None
+    video.status = "deleted"
+    db.commit()
+    return {"success": True, "message": "Upload aborted"}
+
+
+def _create_local_video(db: Session, owner_id: str, title: str, form: dict, upload: StreamedUpload, file_path: str):
+    """Create the pending video for a finished local upload; returns (video id, deduplicated)"""
+    tags = form.get("tags", "")
     video = Video(
-        owner_id=current_user.id,
+        owner_id=owner_id,
         title=title,
-        description=description,
+        description=form.get("description", ""),
         tags=[t.strip() for t in tags.split(",") if t.strip()] if tags else [],
-        type=type,
-        allow_download=allow_download,
-        s3_key=file_path,
-        size_bytes=len(content),
+        type=form.get("type") or "ai",
+        allow_download=form.get("allow_download", "").lower() in ("true", "1", "on", "yes"),
+        size_bytes=upload.size,
         status="pending",
+        processing_status="queued",
     )
+    # Identical files share one stored blob
+    deduplicated = store_local_upload(db, video, file_path, upload.sha256, upload.size)
     db.add(video)
     db.commit()
-    db.refresh(video)
+    return video.id, deduplicated
+
+
+@router.post("/upload-local")
+async def upload_local(
+    request: Request,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    """
+    Local file upload (fallback when S3 is not configured).
+
+    multipart/form-data with a `video` file part and title, description, tags,
+    type, allow_download fields. The file is streamed to disk as it arrives.
+    """
+    file_path = os.path.join(settings.UPLOAD_DIR, ".tmp", f"{uuid.uuid4()}.upload")
+
+    async with upload_scheduler.admit(request, current_user.id):
+        upload = await stream_upload_to_file(request, file_path, file_field="video")
+    form = upload.fields
+
+    title = form.get("title", "").strip()
+    if not title:
+        os.remove(file_path)
+        raise HTTPException(status_code=400, detail="Title is required")
+
+    # Blob store file moves and DB writes block; keep them off the event loop
+    video_id, deduplicated = await run_in_threadpool(
+        _create_local_video, db, current_user.id, title, form, upload, file_path
+    )
+    media_pipeline.submit(video_id)
 
     return {
         "success": True,
         "message": "Video uploaded, pending review",
-        "data": {"id": video.id},
+        "data": {
+            "id": video_id,
+            "size_bytes": upload.size,
+            "sha256": upload.sha256,
+            "deduplicated": deduplicated,
+        },
     }
 
 
-@router.get("/{video_id}/stream")
-async def stream_video(video_id: str, db: Session = Depends(get_db)):
+@router.api_route("/{video_id}/stream", methods=["GET", "HEAD"])
+def stream_video(video_id: str, request: Request, db: Session = Depends(get_db)):
     video = db.query(Video).filter(Video.id == video_id).first()
-    if not video:
+    if not video or not video.s3_key:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    # If S3, return signed URL
-    if settings.AWS_ACCESS_KEY_ID and video.s3_key and not video.s3_key.startswith("./"):
+    # Local file: served here with Range / conditional request support
+    if is_local_key(video.s3_key):
+        return file_response(request, video.s3_key)
+
+    # S3: redirect the player to a signed URL (S3 handles Range itself)
+    if s3_enabled():
         try:
-            import boto3
-            s3_client = boto3.client(
-                "s3",
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION,
-            )
-            url = s3_client.generate_presigned_url(
-                "get_object",
-                Params={"Bucket": settings.S3_BUCKET, "Key": video.s3_key},
-                ExpiresIn=3600,
-            )
-            return {"success": True, "data": {"url": url}}
+            url = presigned_get_url(video.s3_key)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Stream error: {e}")
+        return RedirectResponse(url, status_code=302)
 
-    # Local fallback
-    return {"success": True, "data": {"url": f"/uploads/{video.s3_key}"}}
+    raise HTTPException(status_code=404, detail="Video file not available")
 
 
-@router.get("/{video_id}/download")
-async def download_video(
+@router.get("/{video_id}/seek")
+def seek_video(
     video_id: str,
-    current_user: User = Depends(get_current_user),
+    t: float = Query(..., ge=0, description="Requested position in seconds"),
     db: Session = Depends(get_db),
 ):
+    """
+    Deep link ("watch from 1:23"): the keyframe at or before `t`. The player
+    loads /stream as usual and sets currentTime to `time`; `offset` is where
+    that keyframe's bytes start, for a Range read-ahead once moov is loaded.
+    """
+    video = db.query(Video.s3_key).filter(Video.id == video_id).first()
+    if not video or not video.s3_key:
+        raise HTTPException(status_code=404, detail="Video not found")
+
+    # Not indexed (yet): seek to the requested second, the player finds the keyframe
+    time, offset = keyframe_at(video.s3_key, t) or (t, None)
+    return {
+        "success": True,
+        "data": {"time": time, "offset": offset, "stream_url": f"/api/videos/{video_id}/stream"},
+    }
+
+
+@router.post("/{video_id}/download-link")
+def create_download_link(
+    video_id: str,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    """Signed URL the browser can open directly (plain link / window.location)"""
+    video = db.query(Video.id, Video.s3_key, Video.allow_download).filter(Video.id == video_id).first()
+    if not video or not video.s3_key:
+        raise HTTPException(status_code=404, detail="Video not found")
+    if not video.allow_download:
+        raise HTTPException(status_code=403, detail="Download not allowed for this video")
+
+    token = create_download_token(current_user.id, video_id)
+    return {
+        "success": True,
+        "data": {
+            "url": f"/api/videos/{video_id}/download?token={token}",
+            "expires_in": settings.DOWNLOAD_TOKEN_EXPIRE_SECONDS,
+        }
+    }
+
+
+@router.api_route("/{video_id}/download", methods=["GET", "HEAD"])
+def download_video(
+    video_id: str,
+    request: Request,
+    token: Optional[str] = None,
+    user: Optional[Principal] = Depends(get_optional_principal),
+    db: Session = Depends(get_db),
+):
+    # Either a Bearer header or a signed link from /download-link
+    if token is not None:
+        user = load_principal(db, verify_download_token(token, video_id))
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
     video = db.query(Video).filter(Video.id == video_id).first()
-    if not video:
+    if not video or not video.s3_key:
         raise HTTPException(status_code=404, detail="Video not found")
 
     if not video.allow_download:
         raise HTTPException(status_code=403, detail="Download not allowed for this video")
 
-    # Similar to stream but with download disposition
-    return {"success": True, "data": {"url": f"/api/videos/{video_id}/stream"}}
+    filename = f"{video.title or video.id}.mp4"
+
+    # Local file: resumable, conditional, and paced so downloads don't starve viewers
+    if is_local_key(video.s3_key):
+        return file_response(
+            request, video.s3_key,
+            filename=filename, disposition="attachment",
+            rate_limit=settings.DOWNLOAD_RATE_LIMIT or None,
+        )
+
+    # S3: signed URL that makes S3 send the attachment headers itself
+    if s3_enabled():
+        try:
+            url = presigned_get_url(video.s3_key, content_disposition("attachment", filename))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Download error: {e}")
+        return RedirectResponse(url, status_code=302)
+
+    raise HTTPException(status_code=404, detail="Video file not available")
 
 
 @router.delete("/{video_id}")
-async def delete_video(
+def delete_video(
     video_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     video = db.query(Video).filter(Video.id == video_id).first()
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    if video.owner_id != current_user.id and current_user.role != "admin":
+    if video.owner_id != current_user.id and not has_role(db, current_user, "admin"):
         raise HTTPException(status_code=403, detail="Not authorized")
 
+    released_blob = release_blob(db, video) if video.status != "deleted" else None
+    # Not yet moved into the blob store (queued, failed, or never completed) and
+    # no worker holding it: the upload itself has to go. Unqueuing it in the same
+    # conditional UPDATE keeps the pipeline from claiming it afterwards.
+    orphaned_upload = None
+    if video.status != "deleted" and video.s3_key and not video.content_sha256:
+        unqueued = db.execute(
+            update(Video)
+            .where(
+                Video.id == video.id,
+                Video.content_sha256.is_(None),
+                or_(Video.processing_status.is_(None), Video.processing_status != "processing"),
+            )
+            .values(processing_status=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        orphaned_upload = video.s3_key if unqueued else None
     video.status = "deleted"
+    remove_video(db, video.id)
     db.commit()
+    invalidate_feeds()
+    collect_blob(released_blob)
+    if orphaned_upload:
+        discard_upload(orphaned_upload)
 
     return {"success": True, "message": "Video deleted"}
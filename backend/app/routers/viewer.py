@@ -0,0 +1,35 @@
+"""
+Viewer Router - Batch lookup of the current user's state for many videos/users
+"""
+
+from typing import List
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.auth import Principal, get_current_principal
+from app.viewer_state import user_states, video_states
+
+router = APIRouter()
+
+
+class ViewerStateRequest(BaseModel):
+    video_ids: List[str] = Field(default_factory=list, max_length=100)
+    user_ids: List[str] = Field(default_factory=list, max_length=100)
+
+
+@router.post("/viewer-state")
+def get_viewer_state(
+    req: ViewerStateRequest,
+    current_user: Principal = Depends(get_current_principal),
+    db: Session = Depends(get_db),
+):
+    return {
+        "success": True,
+        "data": {
+            "videos": video_states(db, current_user.id, req.video_ids),
+            "users": user_states(db, current_user.id, req.user_ids),
+        }
+    }
@@ -0,0 +1,390 @@
+"""
+Search Engine - Ranked full-text search over approved videos
+
+Backends:
+- postgres: tsvector over title/description/tags/ai_prompt with a GIN expression
+            index (built by migration 0012, or init_db.py for new databases)
+- fts5:     SQLite FTS5 virtual table kept in sync on approve/reject/delete
+- python:   in-process inverted index (fallback for other databases), rebuilt
+            every SEARCH_INDEX_TTL_SECONDS to pick up other workers' changes
+
+Highlights are HTML-escaped text in which only the matched terms are wrapped
+in <mark> tags, so clients can render them as HTML.
+"""
+
+import html
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import Index, Text, cast, func, inspect, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import engine, SessionLocal
+from app.models import Video
+
+settings = get_settings()
+
+SEARCH_INDEX = "ix_videos_search"
+
+# Relative weight of each indexed field
+FIELD_WEIGHTS = {"title": 4.0, "tags": 3.0, "description": 1.5, "ai_prompt": 1.0}
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(value: str) -> list[str]:
+    return [t.lower() for t in TOKEN_RE.findall(value or "")]
+
+
+def video_fields(video: Video) -> dict:
+    return {
+        "title": video.title or "",
+        "description": video.description or "",
+        "tags": " ".join(video.tags or []),
+        "ai_prompt": video.ai_prompt or "",
+    }
+
+
+# Match delimiters handed to FTS5/ts_headline; the fragment is HTML-escaped
+# first and only then are these turned into <mark> tags
+MARK_START, MARK_END = "\x02", "\x03"
+
+
+def marked_html(fragment: str) -> str:
+    """Escape a highlighted fragment and turn its match delimiters into <mark> tags"""
+    if not fragment:
+        return ""
+    escaped = html.escape(fragment)
+    return escaped.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+
+def highlight(value: str, terms: set, max_len: int = 160) -> str:
+    """Escaped text with matched terms wrapped in <mark>, trimmed around the first match"""
+    if not value:
+        return ""
+    value = value.replace(MARK_START, "").replace(MARK_END, "")
+    matches = [m for m in TOKEN_RE.finditer(value) if m.group().lower() in terms]
+    if not matches:
+        return html.escape(value[:max_len])
+    start = max(0, matches[0].start() - max_len // 4)
+    end = min(len(value), start + max_len)
+    out, pos = [], start
+    for m in matches:
+        if m.start() < start or m.end() > end:
+            continue
+        out.append(value[pos:m.start()])
+        out.append(MARK_START + m.group() + MARK_END)
+        pos = m.end()
+    out.append(value[pos:end])
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(value) else ""
+    return marked_html(prefix + "".join(out) + suffix)
+
+
+# ==================== Backends ====================
+
+class _InvertedIndex:
+    """token -> {video_id: weighted term frequency}, plus the indexed fields per video"""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.docs = {}
+
+    def add(self, video: Video):
+        self.remove(video.id)
+        fields = video_fields(video)
+        weights = defaultdict(float)
+        for field, value in fields.items():
+            for token in tokenize(value):
+                weights[token] += FIELD_WEIGHTS[field]
+        for token, weight in weights.items():
+            self.postings[token][video.id] = weight
+        self.docs[video.id] = fields
+
+    def remove(self, video_id: str):
+        fields = self.docs.pop(video_id, None)
+        if fields is None:
+            return
+        for token in set(tokenize(" ".join(fields.values()))):
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(video_id, None)
+                if not postings:
+                    del self.postings[token]
+
+
+class PythonSearchBackend:
+    """
+    In-process inverted index. Changes made in this process are applied
+    immediately; the index is rebuilt from the database every
+    SEARCH_INDEX_TTL_SECONDS so approvals and deletes handled by other
+    worker processes show up within that interval.
+    """
+
+    name = "python"
+
+    def __init__(self, ttl_seconds: float = None):
+        self.ttl_seconds = settings.SEARCH_INDEX_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._index = None
+        self._loaded_at = None
+
+    def _fresh(self) -> bool:
+        return self._index is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def _ensure_loaded(self, db: Session):
+        if self._fresh():
+            return
+        with self._rebuild_lock:
+            if self._fresh():
+                return
+            loaded_at = time.monotonic()
+            index = _InvertedIndex()
+            for video in db.query(Video).filter(Video.status == "approved").yield_per(500):
+                index.add(video)
+            with self._lock:
+                self._index = index
+                self._loaded_at = loaded_at
+
+    def setup(self):
+        pass
+
+    def index(self, db: Session, video: Video):
+        with self._lock:
+            if self._index is not None:
+                self._index.add(video)
+
+    def remove(self, db: Session, video_id: str):
+        with self._lock:
+            if self._index is not None:
+                self._index.remove(video_id)
+
+    def search(self, db: Session, q: str, limit: int) -> list[dict]:
+        self._ensure_loaded(db)
+        terms = tokenize(q)
+        if not terms:
+            return []
+        with self._lock:
+            postings_by_token, docs = self._index.postings, self._index.docs
+            total_docs = max(len(docs), 1)
+            scores = None
+            for term in set(terms):
+                postings = postings_by_token.get(term, {})
+                idf = math.log(1 + total_docs / (1 + len(postings)))
+                term_scores = {vid: w * idf for vid, w in postings.items()}
+                if scores is None:
+                    scores = term_scores
+                else:
+                    # AND semantics: keep only videos matching every term
+                    scores = {vid: s + term_scores[vid] for vid, s in scores.items() if vid in term_scores}
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            term_set = set(terms)
+            return [
+                {
+                    "id": vid,
+                    "score": score,
+                    "highlight": {
+                        "title": highlight(docs[vid]["title"], term_set),
+                        "description": highlight(docs[vid]["description"], term_set),
+                    },
+                }
+                for vid, score in ranked
+            ]
+
+
+class FTS5SearchBackend:
+    """SQLite FTS5 virtual table with bm25 ranking"""
+
+    name = "fts5"
+
+    def setup(self):
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS video_search USING fts5("
+                "video_id UNINDEXED, title, description, tags, ai_prompt, "
+                "tokenize='unicode61 remove_diacritics 2')"
+            ))
+        db = SessionLocal()
+        try:
+            # A crash between an approval and its index write leaves the two apart
+            indexed = db.execute(text("SELECT count(*) FROM video_search")).scalar()
+            approved = db.query(func.count(Video.id)).filter(Video.status == "approved").scalar()
+            if indexed != approved:
+                db.execute(text("DELETE FROM video_search"))
+                for video in db.query(Video).filter(Video.status == "approved").yield_per(500):
+                    self.index(db, video)
+                db.commit()
+        finally:
+            db.close()
+
+    def index(self, db: Session, video: Video):
+        self.remove(db, video.id)
+        db.execute(
+            text(
+                "INSERT INTO video_search (video_id, title, description, tags, ai_prompt) "
+                "VALUES (:video_id, :title, :description, :tags, :ai_prompt)"
+            ),
+            {"video_id": video.id, **video_fields(video)},
+        )
+
+    def remove(self, db: Session, video_id: str):
+        db.execute(text("DELETE FROM video_search WHERE video_id = :video_id"), {"video_id": video_id})
+
+    def search(self, db: Session, q: str, limit: int) -> list[dict]:
+        terms = tokenize(q)
+        if not terms:
+            return []
+        match = " ".join('"%s"' % t.replace('"', '""') for t in terms)
+        rows = db.execute(
+            text(
+                "SELECT video_id, bm25(video_search, 0, :w_title, :w_desc, :w_tags, :w_prompt) AS rank, "
+                "highlight(video_search, 1, :mark_start, :mark_end) AS title_hl, "
+                "snippet(video_search, 2, :mark_start, :mark_end, '…', 24) AS desc_hl "
+                "FROM video_search WHERE video_search MATCH :match "
+                "ORDER BY rank LIMIT :limit"
+            ),
+            {
+                "match": match,
+                "limit": limit,
+                "mark_start": MARK_START,
+                "mark_end": MARK_END,
+                "w_title": FIELD_WEIGHTS["title"],
+                "w_desc": FIELD_WEIGHTS["description"],
+                "w_tags": FIELD_WEIGHTS["tags"],
+                "w_prompt": FIELD_WEIGHTS["ai_prompt"],
+            },
+        ).all()
+        # bm25() is lower-is-better; flip it so higher scores rank first everywhere
+        return [
+            {
+                "id": r.video_id,
+                "score": -r.rank,
+                "highlight": {"title": marked_html(r.title_hl), "description": marked_html(r.desc_hl)},
+            }
+            for r in rows
+        ]
+
+
+class PostgresSearchBackend:
+    """Postgres tsvector search backed by a GIN expression index on videos"""
+
+    name = "postgres"
+
+    # Constants are rendered inline so queries match the index expression exactly
+    config = text("'simple'::regconfig")
+
+    def __init__(self):
+        def weighted(column, weight):
+            document = func.to_tsvector(self.config, func.coalesce(column, text("''")))
+            return func.setweight(document, text(f"'{weight}'"))
+
+        self.document = (
+            weighted(Video.title, "A")
+            .op("||")(weighted(cast(Video.tags, Text), "A"))
+            .op("||")(weighted(Video.description, "B"))
+            .op("||")(weighted(Video.ai_prompt, "C"))
+        )
+
+    def index_ddl(self, concurrently: bool = False) -> Index:
+        """The GIN index the queries above use; not declared on the model, so create_all skips it"""
+        index = Index(SEARCH_INDEX, self.document, postgresql_using="gin", postgresql_concurrently=concurrently)
+        Video.__table__.indexes.discard(index)
+        return index
+
+    def setup(self):
+        # Building the index locks writes to videos, so it is left to migrations
+        if SEARCH_INDEX not in {ix["name"] for ix in inspect(engine).get_indexes("videos")}:
+            print(f"{SEARCH_INDEX} is missing; search scans every video until `alembic upgrade head` runs")
+
+    def index(self, db: Session, video: Video):
+        # The expression index is maintained by Postgres itself
+        pass
+
+    def remove(self, db: Session, video_id: str):
+        pass
+
+    def search(self, db: Session, q: str, limit: int) -> list[dict]:
+        terms = tokenize(q)
+        if not terms:
+            return []
+        tsquery = func.plainto_tsquery(self.config, " ".join(terms))
+        selectors = f'StartSel="{MARK_START}", StopSel="{MARK_END}"'
+        options = f"{selectors}, MaxWords=35, MinWords=15"
+        title_options = f"HighlightAll=true, {selectors}"
+        rows = db.execute(
+            select(
+                Video.id,
+                func.ts_rank(self.document, tsquery).label("rank"),
+                func.ts_headline(self.config, Video.title, tsquery, title_options).label("title_hl"),
+                func.ts_headline(self.config, func.coalesce(Video.description, ""), tsquery, options).label("desc_hl"),
+            )
+            .where(self.document.op("@@")(tsquery), Video.status == "approved")
+            .order_by(text("rank DESC"), Video.id)
+            .limit(limit)
+        ).all()
+        return [
+            {
+                "id": r.id,
+                "score": float(r.rank),
+                "highlight": {"title": marked_html(r.title_hl), "description": marked_html(r.desc_hl)},
+            }
+            for r in rows
+        ]
+
+
+# ==================== Public API ====================
+
+_backend = None
+
+
+def _select_backend():
+    choice = settings.SEARCH_BACKEND
+    dialect = engine.dialect.name
+    if choice == "postgres" or (choice == "auto" and dialect == "postgresql"):
+        return PostgresSearchBackend()
+    if choice == "fts5" or (choice == "auto" and dialect == "sqlite"):
+        backend = FTS5SearchBackend()
+        try:
+            backend.setup()
+            return backend
+        except OperationalError as e:
+            if choice == "fts5":
+                raise
+            print(f"FTS5 unavailable, falling back to Python search index: {e}")
+    return PythonSearchBackend()
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        _backend = _select_backend()
+    return _backend
+
+
+def init_search():
+    """Create native index structures at startup"""
+    backend = get_search_backend()
+    if backend.name != "fts5":  # FTS5 is set up while probing for support
+        backend.setup()
+    return backend
+
+
+def index_video(db: Session, video: Video):
+    """Add or refresh a video in the search index (call when it becomes approved)"""
+    get_search_backend().index(db, video)
+
+
+def remove_video(db: Session, video_id: str):
+    """Drop a video from the search index (call when it leaves approved)"""
+    get_search_backend().remove(db, video_id)
+
+
+def search_videos(db: Session, q: str, limit: int = None) -> list[dict]:
+    """Ranked hits: [{"id", "score", "highlight": {"title", "description"}}]"""
+    return get_search_backend().search(db, q, limit or settings.SEARCH_MAX_RESULTS)
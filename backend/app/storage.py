@@ -0,0 +1,391 @@
+"""
+Video Storage - Shared S3 client, presigned URL cache, multipart (resumable) upload backends
+
+Both backends speak the same protocol so clients and tests don't care where the
+bytes go:
+    create(key)                        -> multipart upload id
+    presign_parts(key, id, numbers, video_id) -> [{"part_number", "url"}]
+    list_parts(key, id)                -> [{"part_number", "etag", "size"}]  (for resume)
+    complete(key, id, parts)           -> total size in bytes
+    abort(key, id)
+"""
+
+import hashlib
+import hmac
+import io
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Optional
+
+import aiofiles
+from fastapi import HTTPException
+
+from app.cache import TTLCache
+from app.config import get_settings
+from app.metrics import register_metrics
+
+settings = get_settings()
+
+# S3 allows at most 10,000 parts per upload
+MAX_PARTS = 10000
+
+# complete_multipart_upload errors caused by the client's part list (400); anything else is 502
+S3_PART_ERRORS = {"InvalidPart", "InvalidPartOrder", "EntityTooSmall", "NoSuchUpload", "MalformedXML"}
+
+
+def s3_enabled() -> bool:
+    return bool(settings.AWS_ACCESS_KEY_ID and settings.AWS_SECRET_ACCESS_KEY)
+
+
+_s3_client = None
+_s3_client_lock = threading.Lock()
+
+
+def get_s3_client():
+    """
+    Process-wide S3 client. boto3 clients are thread-safe, so one client (and its
+    connection pool) is shared instead of resolving credentials per request.
+    """
+    global _s3_client
+    if _s3_client is None:
+        with _s3_client_lock:
+            if _s3_client is None:
+                import boto3
+                from botocore.config import Config
+                _s3_client = boto3.client(
+                    "s3",
+                    aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                    aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                    region_name=settings.AWS_REGION,
+                    config=Config(
+                        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                        retries={"max_attempts": 3, "mode": "standard"},
+                        tcp_keepalive=True,
+                    ),
+                )
+    return _s3_client
+
+
+def init_s3():
+    """Create the shared client at startup so the first request doesn't pay for it"""
+    if s3_enabled():
+        get_s3_client()
+
+
+# (s3_key, content disposition) -> presigned GET URL, kept while it still has
+# PRESIGNED_URL_MIN_REMAINING left
+presigned_url_cache = TTLCache(
+    "presigned_urls",
+    settings.PRESIGNED_URL_CACHE_MAX_ENTRIES,
+    settings.PRESIGNED_URL_EXPIRES - settings.PRESIGNED_URL_MIN_REMAINING,
+)
+register_metrics("presigned_url_cache", presigned_url_cache.stats)
+
+
+def presigned_get_url(key: str, content_disposition: str = None) -> str:
+    url = presigned_url_cache.get((key, content_disposition))
+    if url is None:
+        params = {"Bucket": settings.S3_BUCKET, "Key": key}
+        if content_disposition:
+            params["ResponseContentDisposition"] = content_disposition
+        url = get_s3_client().generate_presigned_url(
+            "get_object", Params=params, ExpiresIn=settings.PRESIGNED_URL_EXPIRES,
+        )
+        presigned_url_cache.set((key, content_disposition), url)
+    return url
+
+
+class S3ObjectReader(io.RawIOBase):
+    """Seekable read-only view of an S3 object; every read is a ranged GET"""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.size = get_s3_client().head_object(Bucket=settings.S3_BUCKET, Key=key)["ContentLength"]
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.position, io.SEEK_END: self.size}[whence]
+        self.position = max(base + offset, 0)
+        return self.position
+
+    def readinto(self, buffer) -> int:
+        if self.position >= self.size or not len(buffer):
+            return 0
+        end = min(self.position + len(buffer), self.size) - 1
+        body = get_s3_client().get_object(
+            Bucket=settings.S3_BUCKET, Key=self.key, Range=f"bytes={self.position}-{end}",
+        )["Body"].read()
+        buffer[:len(body)] = body
+        self.position += len(body)
+        return len(body)
+
+
+def open_video_file(key: str):
+    """Open a stored video (local path or S3 key) as a seekable binary file"""
+    if is_local_key(key):
+        return open(key, "rb")
+    return io.BufferedReader(S3ObjectReader(key), settings.S3_READ_BUFFER_SIZE)
+
+
+def replace_video_file(key: str, path: str):
+    """Atomically swap the stored video at `key` for the local file at `path` (consumed)"""
+    if is_local_key(key):
+        os.replace(path, key)
+        return
+    try:
+        get_s3_client().upload_file(path, settings.S3_BUCKET, key, ExtraArgs={"ContentType": "video/mp4"})
+    finally:
+        os.remove(path)
+
+
+def read_sidecar(key: str, suffix: str) -> Optional[bytes]:
+    """Small derived file stored next to a video (e.g. its keyframe index)"""
+    if is_local_key(key):
+        try:
+            with open(key + suffix, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    client = get_s3_client()
+    try:
+        return client.get_object(Bucket=settings.S3_BUCKET, Key=key + suffix)["Body"].read()
+    except client.exceptions.NoSuchKey:
+        return None
+
+
+def write_sidecar(key: str, suffix: str, data: bytes):
+    if is_local_key(key):
+        tmp_path = f"{key}{suffix}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, key + suffix)
+        return
+    get_s3_client().put_object(Bucket=settings.S3_BUCKET, Key=key + suffix, Body=data)
+
+
+def delete_sidecar(key: str, suffix: str):
+    if is_local_key(key):
+        if os.path.exists(key + suffix):
+            os.remove(key + suffix)
+        return
+    get_s3_client().delete_object(Bucket=settings.S3_BUCKET, Key=key + suffix)
+
+
+def scratch_path_for(key: str) -> str:
+    """Temporary file for rewriting `key`; same filesystem for local keys so replace is atomic"""
+    directory = os.path.dirname(key) if is_local_key(key) else os.path.join(settings.UPLOAD_DIR, ".tmp")
+    os.makedirs(directory or ".", exist_ok=True)
+    return os.path.join(directory, f".{uuid.uuid4().hex}.tmp")
+
+
+class S3MultipartStorage:
+    name = "s3"
+
+    def create(self, key: str) -> str:
+        response = get_s3_client().create_multipart_upload(
+            Bucket=settings.S3_BUCKET, Key=key, ContentType="video/mp4",
+        )
+        return response["UploadId"]
+
+    def presign_parts(self, key: str, upload_id: str, part_numbers: list[int], video_id: str = None) -> list[dict]:
+        client = get_s3_client()
+        return [
+            {
+                "part_number": n,
+                "url": client.generate_presigned_url(
+                    "upload_part",
+                    Params={"Bucket": settings.S3_BUCKET, "Key": key, "UploadId": upload_id, "PartNumber": n},
+                    ExpiresIn=settings.MULTIPART_URL_EXPIRES,
+                ),
+            }
+            for n in part_numbers
+        ]
+
+    def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        client = get_s3_client()
+        parts, marker = [], 0
+        while True:
+            response = client.list_parts(
+                Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id, PartNumberMarker=marker,
+            )
+            parts += [
+                {"part_number": p["PartNumber"], "etag": p["ETag"].strip('"'), "size": p["Size"]}
+                for p in response.get("Parts", [])
+            ]
+            if not response.get("IsTruncated"):
+                return parts
+            marker = response["NextPartNumberMarker"]
+
+    def complete(self, key: str, upload_id: str, parts: list[dict]) -> int:
+        from botocore.exceptions import BotoCoreError, ClientError
+
+        client = get_s3_client()
+        try:
+            client.complete_multipart_upload(
+                Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id,
+                MultipartUpload={"Parts": [
+                    {"PartNumber": p["part_number"], "ETag": p["etag"]} for p in parts
+                ]},
+            )
+            size = client.head_object(Bucket=settings.S3_BUCKET, Key=key)["ContentLength"]
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "")
+            if code in S3_PART_ERRORS:
+                raise HTTPException(status_code=400, detail=f"Multipart upload rejected: {code}")
+            raise HTTPException(status_code=502, detail=f"Storage error: {code or e}")
+        except BotoCoreError as e:
+            raise HTTPException(status_code=502, detail=f"Storage error: {e}")
+        if size > settings.MAX_UPLOAD_SIZE:
+            client.delete_object(Bucket=settings.S3_BUCKET, Key=key)
+            raise HTTPException(status_code=413, detail="File too large")
+        return size
+
+    def abort(self, key: str, upload_id: str):
+        get_s3_client().abort_multipart_upload(Bucket=settings.S3_BUCKET, Key=key, UploadId=upload_id)
+
+
+class LocalMultipartStorage:
+    """
+    Parts are PUT to /api/videos/{video_id}/parts/{n} with an HMAC-signed,
+    expiring query string (the local equivalent of a presigned URL) and kept
+    under UPLOAD_DIR/.multipart/{upload_id}/ until complete() joins them.
+    """
+
+    name = "local"
+
+    def _dir(self, upload_id: str) -> str:
+        if not upload_id or os.sep in upload_id or upload_id.startswith("."):
+            raise HTTPException(status_code=400, detail="Invalid upload id")
+        return os.path.join(settings.UPLOAD_DIR, ".multipart", upload_id)
+
+    def _part_path(self, upload_id: str, part_number: int) -> str:
+        return os.path.join(self._dir(upload_id), f"{part_number:05d}.part")
+
+    @staticmethod
+    def sign(upload_id: str, part_number: int, expires: int) -> str:
+        message = f"{upload_id}:{part_number}:{expires}".encode()
+        return hmac.new(settings.JWT_SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def verify_signature(self, upload_id: str, part_number: int, expires: int, signature: str):
+        expected = self.sign(upload_id, part_number, expires)
+        if expires < time.time() or not hmac.compare_digest(expected, signature or ""):
+            raise HTTPException(status_code=403, detail="Invalid or expired part URL")
+
+    def create(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(self._dir(upload_id), exist_ok=True)
+        return upload_id
+
+    def presign_parts(self, key: str, upload_id: str, part_numbers: list[int], video_id: str = None) -> list[dict]:
+        expires = int(time.time()) + settings.MULTIPART_URL_EXPIRES
+        return [
+            {
+                "part_number": n,
+                "url": (
+                    f"/api/videos/{video_id}/parts/{n}"
+                    f"?expires={expires}&signature={self.sign(upload_id, n, expires)}"
+                ),
+            }
+            for n in part_numbers
+        ]
+
+    async def write_part(self, upload_id: str, part_number: int, chunks) -> dict:
+        """Stream one part to disk; returns its etag (MD5, like S3) and size"""
+        part_dir = self._dir(upload_id)
+        if not os.path.isdir(part_dir):
+            raise HTTPException(status_code=404, detail="Upload not found")
+        final_path = self._part_path(upload_id, part_number)
+        tmp_path = f"{final_path}.{uuid.uuid4().hex}.tmp"
+        digest, size = hashlib.md5(), 0
+        max_size = min(settings.MULTIPART_MAX_PART_SIZE, settings.MAX_UPLOAD_SIZE)
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_size:
+                        raise HTTPException(status_code=413, detail="Part too large")
+                    digest.update(chunk)
+                    await f.write(chunk)
+            # Atomic replace so a retried part never leaves a half-written file
+            os.replace(tmp_path, final_path)
+            with open(final_path[:-len(".part")] + ".etag", "w") as f:
+                f.write(digest.hexdigest())
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {"part_number": part_number, "etag": digest.hexdigest(), "size": size}
+
+    def list_parts(self, key: str, upload_id: str) -> list[dict]:
+        part_dir = self._dir(upload_id)
+        if not os.path.isdir(part_dir):
+            raise HTTPException(status_code=404, detail="Upload not found")
+        parts = []
+        for name in sorted(os.listdir(part_dir)):
+            if not name.endswith(".part"):
+                continue
+            path = os.path.join(part_dir, name)
+            try:
+                with open(path[:-len(".part")] + ".etag") as f:
+                    etag = f.read().strip()
+            except FileNotFoundError:
+                continue  # part still being replaced
+            parts.append({
+                "part_number": int(name.split(".")[0]),
+                "etag": etag,
+                "size": os.path.getsize(path),
+            })
+        return parts
+
+    def complete(self, key: str, upload_id: str, parts: list[dict]) -> int:
+        stored = {p["part_number"]: p for p in self.list_parts(key, upload_id)}
+        for p in parts:
+            found = stored.get(p["part_number"])
+            if not found or found["etag"] != p["etag"].strip('"'):
+                raise HTTPException(status_code=400, detail=f"Part {p['part_number']} missing or ETag mismatch")
+        # Checked before anything is copied: the parts alone may already be over the limit
+        size = sum(stored[p["part_number"]]["size"] for p in parts)
+        if size > settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(status_code=413, detail="File too large")
+        os.makedirs(os.path.dirname(key) or ".", exist_ok=True)
+        tmp_path = f"{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as out:
+                for p in parts:
+                    with open(self._part_path(upload_id, p["part_number"]), "rb") as src:
+                        shutil.copyfileobj(src, out, settings.UPLOAD_CHUNK_SIZE)
+            os.replace(tmp_path, key)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+        return size
+
+    def abort(self, key: str, upload_id: str):
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+
+s3_multipart = S3MultipartStorage()
+local_multipart = LocalMultipartStorage()
+
+
+def multipart_storage_for(key: str):
+    """Local keys live under UPLOAD_DIR (same convention as upload-local)"""
+    return local_multipart if is_local_key(key) else s3_multipart
+
+
+def is_local_key(key: Optional[str]) -> bool:
+    return bool(key) and (key.startswith("./") or key.startswith(settings.UPLOAD_DIR))
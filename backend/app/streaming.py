@@ -0,0 +1,216 @@
+"""
+File Streaming - Range requests, conditional GETs and zero-copy file responses
+
+Serves local video files the way a CDN would: single `Range` requests get a 206
+with `Content-Range`, `If-Range` falls back to the full file when the validator
+no longer matches, and `If-None-Match` / `If-Modified-Since` short-circuit to 304.
+The body goes out via the ASGI `http.response.zerocopysend` extension (sendfile)
+when the server offers it, otherwise in fixed-size chunks read off the event loop,
+optionally paced to a per-connection byte rate.
+"""
+
+import asyncio
+import os
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import HTTPException, Request
+from starlette.responses import Response
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Strong validator from mtime + size (changes whenever the file is replaced)"""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end). Returns None when
+    the header should be ignored (malformed, other unit, multiple ranges) and
+    raises 416 when it is well-formed but outside the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and start > end:
+                return None
+        else:
+            suffix = int(last)
+            # "bytes=-0" is valid syntax but never satisfiable
+            start, end = (max(size - suffix, 0), size - 1) if suffix else (size, size)
+    except ValueError:
+        return None
+    if start >= size:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
+
+
+def _etag_matches(header: str, etag: str, weak: bool) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    if weak:
+        return etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+    return etag in candidates
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag, weak=True)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _if_range_matches(request: Request, etag: str, mtime: float) -> bool:
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return _etag_matches(if_range, etag, weak=False)
+    try:
+        return int(mtime) == int(parsedate_to_datetime(if_range).timestamp())
+    except (TypeError, ValueError):
+        return False
+
+
+def content_disposition(disposition: str, filename: str) -> str:
+    """RFC 6266 header with an ASCII fallback and a UTF-8 filename*"""
+    fallback = filename.encode("ascii", "ignore").decode().replace('"', "").replace("\\", "") or "download"
+    return f"{disposition}; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+class FileRangeResponse(Response):
+    """Streams bytes [start, end] of a file; headers are prepared by file_response()"""
+
+    def __init__(
+        self,
+        path: str,
+        start: int,
+        end: int,
+        status_code: int = 200,
+        headers: dict = None,
+        media_type: str = None,
+        chunk_size: int = None,
+        rate_limit: int = None,
+    ):
+        self.path = path
+        self.start = start
+        self.length = max(end - start + 1, 0)
+        self.status_code = status_code
+        self.media_type = media_type
+        self.chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+        self.rate_limit = rate_limit  # bytes/second for this connection, None = unpaced
+        if rate_limit:
+            # ~10 sends per second keeps the pacing smooth
+            self.chunk_size = max(min(self.chunk_size, rate_limit // 10), 16384)
+        self.background = None
+        self.init_headers(headers)
+        self.headers["content-length"] = str(self.length)
+
+    async def __call__(self, scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        if scope["method"].upper() == "HEAD" or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}) and not self.rate_limit:
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+            return
+
+        remaining = self.length
+        started = time.monotonic()
+        async with aiofiles.open(self.path, "rb") as f:
+            await f.seek(self.start)
+            while remaining > 0:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break  # file shrank underneath us
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if self.rate_limit and remaining > 0:
+                    # Sleep until the bytes sent so far are back under the rate
+                    ahead = (self.length - remaining) / self.rate_limit - (time.monotonic() - started)
+                    if ahead > 0:
+                        await asyncio.sleep(ahead)
+        if remaining > 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def file_response(
+    request: Request,
+    path: str,
+    media_type: str = "video/mp4",
+    filename: str = None,
+    disposition: str = "inline",
+    rate_limit: int = None,
+) -> Response:
+    """
+    Build a 200 / 206 / 304 response for `path` from the request's Range and
+    conditional headers.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Video file not found")
+
+    size = stat.st_size
+    etag = file_etag(stat)
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+    }
+    if filename:
+        headers["content-disposition"] = content_disposition(disposition, filename)
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    start, end, status_code = 0, size - 1, 200
+    range_header = request.headers.get("range")
+    if range_header and _if_range_matches(request, etag, stat.st_mtime):
+        byte_range = parse_range(range_header, size)
+        if byte_range:
+            start, end = byte_range
+            status_code = 206
+            headers["content-range"] = f"bytes {start}-{end}/{size}"
+
+    return FileRangeResponse(
+        path, start, end,
+        status_code=status_code, headers=headers, media_type=media_type, rate_limit=rate_limit,
+    )
@@ -0,0 +1,254 @@
+"""
+Timelines - Precomputed "following" feeds (fan-out on write, merge on read)
+
+When a video is approved it is pushed into the timeline of every follower of
+its owner with one INSERT ... SELECT over `follows`, so reading the feed is an
+indexed range scan of the viewer's own timeline instead of a follows x videos
+join. Accounts with FEED_FANOUT_MAX_FOLLOWERS or more followers are not fanned
+out; their recent videos are merged in at read time. Each timeline keeps the
+newest FEED_TIMELINE_MAX_ENTRIES entries; older ones are trimmed periodically.
+"""
+
+import asyncio
+import threading
+import time
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, and_, delete, desc, func, insert, literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.metrics import Histogram, register_metrics
+from app.models import Follow, TimelineEntry, User, Video
+from app.pagination import encode_key, key_bounds
+
+settings = get_settings()
+
+ENTRY_COLUMNS = ["user_id", "video_id", "owner_id", "created_at"]
+
+# Dialects whose INSERT can skip rows that already exist (ON CONFLICT DO NOTHING)
+_CONFLICT_SKIPPING_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _insert_entries(db: Session, rows=None, values: list = None) -> int:
+    """
+    Insert timeline entries from a SELECT (`rows`) or a list of dicts, skipping
+    ones the user already has (a concurrent follow backfill or fan-out); returns
+    the number written.
+    """
+    dialect_insert = _CONFLICT_SKIPPING_INSERTS.get(db.get_bind().dialect.name)
+    statement = (dialect_insert or insert)(TimelineEntry)
+    statement = statement.from_select(ENTRY_COLUMNS, rows) if rows is not None else statement.values(values)
+    if dialect_insert is not None:
+        return max(db.execute(statement.on_conflict_do_nothing()).rowcount, 0)
+    try:
+        with db.begin_nested():
+            return max(db.execute(statement).rowcount, 0)
+    except IntegrityError as e:
+        # No per-row conflict handling here: the whole batch is dropped
+        print(f"Timeline insert conflict: {e}")
+        return 0
+
+
+def _older_than(created_col, id_col, created_at, anchor_id):
+    """Rows after (created_at, anchor_id) in (created_at DESC, id DESC) order"""
+    return or_(
+        created_col < created_at,
+        and_(created_col == created_at, id_col < anchor_id),
+    )
+
+
+class TimelineStore:
+    def __init__(self, max_entries: int, fanout_max_followers: int, follow_backfill: int):
+        self.max_entries = max_entries
+        self.fanout_max_followers = fanout_max_followers
+        self.follow_backfill = follow_backfill
+        self._lock = threading.Lock()
+        self.fanouts = 0
+        self.fanout_skipped = 0  # large accounts, merged at read time instead
+        self.entries_written = 0
+        self.trimmed = 0
+        self.reads = 0
+        self.read_ms = Histogram()
+
+    def is_large(self, followers_count) -> bool:
+        return (followers_count or 0) >= self.fanout_max_followers
+
+    def fan_out(self, db: Session, video: Video) -> int:
+        """Push an approved video to its owner's followers (in the caller's transaction)"""
+        followers_count = db.query(User.followers_count).filter(User.id == video.owner_id).scalar()
+        if self.is_large(followers_count):
+            with self._lock:
+                self.fanout_skipped += 1
+            return 0
+        rows = (
+            select(
+                Follow.follower_id,
+                literal(video.id),
+                literal(video.owner_id),
+                literal(video.created_at, DateTime(timezone=True)),
+            )
+            .where(Follow.following_id == video.owner_id)
+        )
+        written = _insert_entries(db, rows=rows)
+        with self._lock:
+            self.fanouts += 1
+            self.entries_written += written
+        return written
+
+    def backfill(self, db: Session, user_id: str, owner_id: str) -> int:
+        """Seed a new follow with the owner's latest videos (in the caller's transaction)"""
+        followers_count = db.query(User.followers_count).filter(User.id == owner_id).scalar()
+        if self.is_large(followers_count) or not self.follow_backfill:
+            return 0
+        recent = (
+            db.query(Video.id, Video.created_at)
+            .filter(Video.owner_id == owner_id, Video.status == "approved")
+            .order_by(desc(Video.created_at), desc(Video.id))
+            .limit(self.follow_backfill)
+            .all()
+        )
+        if not recent:
+            return 0
+        written = _insert_entries(db, values=[
+            {"user_id": user_id, "video_id": v.id, "owner_id": owner_id, "created_at": v.created_at}
+            for v in recent
+        ])
+        with self._lock:
+            self.entries_written += written
+        return written
+
+    def remove_owner(self, db: Session, user_id: str, owner_id: str):
+        """Drop an unfollowed account's videos from the user's timeline"""
+        db.execute(delete(TimelineEntry).where(
+            TimelineEntry.user_id == user_id,
+            TimelineEntry.owner_id == owner_id,
+        ))
+
+    def read(self, db: Session, user_id: str, limit: int, cursor: dict = None):
+        """
+        One page of video ids, newest first: the user's timeline merged with
+        large followed accounts' videos. Returns (video ids, cursor data for
+        the next page or None); the cursor carries the last video's
+        created_at, so it stays valid if that video is removed.
+        """
+        start = time.perf_counter()
+        if cursor is not None:
+            anchor_id = cursor.get("id")
+            if not isinstance(anchor_id, str) or "key" not in cursor:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        timeline = (
+            db.query(TimelineEntry.created_at, TimelineEntry.video_id)
+            .join(Video, Video.id == TimelineEntry.video_id)
+            .filter(TimelineEntry.user_id == user_id, Video.status == "approved")
+        )
+        if cursor is not None:
+            created_col, created_at = key_bounds(TimelineEntry.created_at, cursor["key"])
+            timeline = timeline.filter(_older_than(created_col, TimelineEntry.video_id, created_at, anchor_id))
+        rows = set(
+            timeline.order_by(desc(TimelineEntry.created_at), desc(TimelineEntry.video_id))
+            .limit(limit + 1)
+            .all()
+        )
+
+        large = [
+            row.following_id for row in
+            db.query(Follow.following_id)
+            .join(User, User.id == Follow.following_id)
+            .filter(Follow.follower_id == user_id, User.followers_count >= self.fanout_max_followers)
+        ]
+        if large:
+            merged = db.query(Video.created_at, Video.id).filter(
+                Video.owner_id.in_(large), Video.status == "approved",
+            )
+            if cursor is not None:
+                created_col, created_at = key_bounds(Video.created_at, cursor["key"])
+                merged = merged.filter(_older_than(created_col, Video.id, created_at, anchor_id))
+            rows.update(
+                merged.order_by(desc(Video.created_at), desc(Video.id)).limit(limit + 1).all()
+            )
+
+        # Sets drop videos present in both (fanned out before the account grew large)
+        ordered = sorted(((r[0], r[1]) for r in rows), reverse=True)[:limit + 1]
+        with self._lock:
+            self.reads += 1
+        self.read_ms.observe((time.perf_counter() - start) * 1000)
+        next_page = None
+        if len(ordered) > limit:
+            created_at, video_id = ordered[limit - 1]
+            next_page = {"id": video_id, "key": encode_key(created_at)}
+        return [video_id for _, video_id in ordered[:limit]], next_page
+
+    def trim(self, db: Session, user_id: str) -> int:
+        """Keep only the newest max_entries entries of one timeline"""
+        cutoff = (
+            db.query(TimelineEntry.created_at, TimelineEntry.video_id.label("id"))
+            .filter(TimelineEntry.user_id == user_id)
+            .order_by(desc(TimelineEntry.created_at), desc(TimelineEntry.video_id))
+            .offset(self.max_entries - 1)
+            .first()
+        )
+        if cutoff is None:
+            return 0
+        created_col, created_at = key_bounds(TimelineEntry.created_at, encode_key(cutoff.created_at))
+        removed = db.execute(delete(TimelineEntry).where(
+            TimelineEntry.user_id == user_id,
+            _older_than(created_col, TimelineEntry.video_id, created_at, cutoff.id),
+        )).rowcount
+        with self._lock:
+            self.trimmed += removed
+        return removed
+
+    def trim_all(self) -> int:
+        """Trim every timeline that has grown past max_entries"""
+        db = SessionLocal()
+        try:
+            over = [
+                row.user_id for row in
+                db.query(TimelineEntry.user_id)
+                .group_by(TimelineEntry.user_id)
+                .having(func.count() > self.max_entries)
+            ]
+            removed = 0
+            for user_id in over:
+                removed += self.trim(db, user_id)
+                db.commit()
+            return removed
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_entries": self.max_entries,
+                "fanout_max_followers": self.fanout_max_followers,
+                "fanouts": self.fanouts,
+                "fanout_skipped": self.fanout_skipped,
+                "entries_written": self.entries_written,
+                "trimmed": self.trimmed,
+                "reads": self.reads,
+                "read_ms": self.read_ms.snapshot(),
+            }
+
+
+timeline_store = TimelineStore(
+    settings.FEED_TIMELINE_MAX_ENTRIES,
+    settings.FEED_FANOUT_MAX_FOLLOWERS,
+    settings.FEED_FOLLOW_BACKFILL,
+)
+register_metrics("timelines", timeline_store.stats)
+
+
+async def run_timeline_trimmer(interval: float = None):
+    """Background task: cap every timeline at FEED_TIMELINE_MAX_ENTRIES until cancelled"""
+    interval = interval or settings.FEED_TRIM_INTERVAL_SECONDS
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(timeline_store.trim_all)
+        except Exception as e:
+            print(f"Timeline trim failed: {e}")
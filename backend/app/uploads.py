@@ -0,0 +1,159 @@
+"""
+Upload Streaming - Parse multipart uploads straight from the request body to disk
+
+Unlike UploadFile, which spools the whole body before the handler runs, the file
+part is written in fixed-size chunks as it arrives. The size limit is enforced
+as bytes come in and the SHA-256 is computed on the fly, so memory per upload
+stays constant regardless of file size.
+"""
+
+import hashlib
+import os
+
+import aiofiles
+from fastapi import HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Max size of a non-file form field
+MAX_FIELD_BYTES = 64 * 1024
+
+
+class StreamedUpload:
+    """Result of a streamed multipart upload"""
+
+    def __init__(self):
+        self.fields = {}
+        self.path = None
+        self.filename = None
+        self.content_type = None
+        self.size = 0
+        self.sha256 = None
+
+
+class _PartCollector:
+    """Synchronous multipart callbacks; queues file chunks for the async writer"""
+
+    def __init__(self, file_field: str):
+        self.file_field = file_field
+        self.header_field = b""
+        self.header_value = b""
+        self.headers = {}
+        self.name = None
+        self.filename = None
+        self.content_type = None
+        self.field_data = bytearray()
+        self.in_file = False
+        self.file_chunks = []
+        self.fields = {}
+
+    def on_part_begin(self):
+        self.headers = {}
+        self.field_data = bytearray()
+
+    def on_header_field(self, data, start, end):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data, start, end):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        self.name = options.get(b"name", b"").decode("latin-1")
+        filename = options.get(b"filename")
+        self.in_file = filename is not None and self.name == self.file_field
+        if self.in_file:
+            self.filename = filename.decode("latin-1")
+            self.content_type = self.headers.get(b"content-type", b"").decode("latin-1") or None
+
+    def on_part_data(self, data, start, end):
+        if self.in_file:
+            self.file_chunks.append(data[start:end])
+        else:
+            self.field_data += data[start:end]
+            if len(self.field_data) > MAX_FIELD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Form field '{self.name}' too large")
+
+    def on_part_end(self):
+        if not self.in_file and self.name:
+            self.fields[self.name] = self.field_data.decode("utf-8")
+        self.in_file = False
+
+
+async def stream_upload_to_file(
+    request: Request,
+    dest_path: str,
+    file_field: str = "file",
+    max_bytes: int = None,
+    chunk_size: int = None,
+) -> StreamedUpload:
+    """
+    Write the `file_field` part of a multipart request to `dest_path` and
+    collect the other form fields. Raises 413 (and removes the partial file)
+    as soon as the file exceeds `max_bytes`.
+    """
+    max_bytes = max_bytes or settings.MAX_UPLOAD_SIZE
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE
+
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+
+    collector = _PartCollector(file_field)
+    parser = MultipartParser(boundary, {
+        "on_part_begin": collector.on_part_begin,
+        "on_part_data": collector.on_part_data,
+        "on_part_end": collector.on_part_end,
+        "on_header_field": collector.on_header_field,
+        "on_header_value": collector.on_header_value,
+        "on_header_end": collector.on_header_end,
+        "on_headers_finished": collector.on_headers_finished,
+    })
+
+    result = StreamedUpload()
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    os.makedirs(os.path.dirname(dest_path) or ".", exist_ok=True)
+
+    try:
+        async with aiofiles.open(dest_path, "wb") as f:
+            async for body_chunk in request.stream():
+                parser.write(body_chunk)
+                for piece in collector.file_chunks:
+                    result.size += len(piece)
+                    if result.size > max_bytes:
+                        raise HTTPException(status_code=413, detail="File too large")
+                    digest.update(piece)
+                    buffer += piece
+                collector.file_chunks.clear()
+                # Write in fixed-size chunks regardless of how the network framed the body
+                while len(buffer) >= chunk_size:
+                    await f.write(bytes(buffer[:chunk_size]))
+                    del buffer[:chunk_size]
+            parser.finalize()
+            if buffer:
+                await f.write(bytes(buffer))
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        raise
+
+    if collector.filename is None:
+        os.remove(dest_path)
+        raise HTTPException(status_code=400, detail=f"Missing file field '{file_field}'")
+
+    result.fields = collector.fields
+    result.path = dest_path
+    result.filename = collector.filename
+    result.content_type = collector.content_type
+    result.sha256 = digest.hexdigest()
+    return result
@@ -0,0 +1,229 @@
+"""
+Video Totals - Maintained per-(status, type, owner) counters for cheap listing totals
+
+A before_flush hook adjusts the video_counts table whenever a Video is inserted,
+deleted, or changes status/type/owner, so totals never need COUNT(*) over videos.
+Core UPDATE/DELETE statements and raw SQL bypass the hook; video_count_reconciler
+(run with the other counter reconcilers, app/counters.py) repairs that drift.
+"""
+
+import json
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import event, func, inspect, insert, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Video, VideoCount, generate_uuid
+
+settings = get_settings()
+
+BUCKET_FIELDS = ("status", "type", "owner_id")
+
+
+def _column_default(name: str):
+    default = Video.__table__.c[name].default
+    return default.arg if default is not None else None
+
+
+def _bucket(video: Video, old: bool = False) -> tuple:
+    values = []
+    for name in BUCKET_FIELDS:
+        if old:
+            history = inspect(video).attrs[name].history
+            value = history.deleted[0] if history.deleted else getattr(video, name)
+        else:
+            value = getattr(video, name)
+        values.append(value if value is not None else _column_default(name))
+    return tuple(values)
+
+
+def _adjust(conn, bucket: tuple, delta: int):
+    status, type_, owner_id = bucket
+    where = (
+        (VideoCount.status == status)
+        & (VideoCount.type == type_)
+        & (VideoCount.owner_id == owner_id)
+    )
+    bump = update(VideoCount).where(where).values(count=VideoCount.count + delta)
+    if conn.execute(bump).rowcount:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(insert(VideoCount).values(
+                id=generate_uuid(), status=status, type=type_,
+                owner_id=owner_id, count=max(delta, 0),
+            ))
+    except IntegrityError:
+        # Another writer created the bucket first
+        conn.execute(bump)
+
+
+@event.listens_for(Session, "before_flush")
+def _track_video_counts(session, flush_context, instances):
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Video):
+            key = _bucket(obj)
+            deltas[key] = deltas.get(key, 0) + 1
+    for obj in session.deleted:
+        if isinstance(obj, Video):
+            key = _bucket(obj, old=True)
+            deltas[key] = deltas.get(key, 0) - 1
+    for obj in session.dirty:
+        if isinstance(obj, Video) and any(
+            inspect(obj).attrs[name].history.has_changes() for name in BUCKET_FIELDS
+        ):
+            old, new = _bucket(obj, old=True), _bucket(obj)
+            if old != new:
+                deltas[old] = deltas.get(old, 0) - 1
+                deltas[new] = deltas.get(new, 0) + 1
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    conn = session.connection()
+    for bucket, delta in sorted(deltas.items()):
+        _adjust(conn, bucket, delta)
+
+
+def count_videos(db: Session, status: str, type: Optional[str] = None, owner: Optional[str] = None) -> int:
+    """Sum of maintained counters for the given filter"""
+    query = db.query(func.coalesce(func.sum(VideoCount.count), 0)).filter(VideoCount.status == status)
+    if type:
+        query = query.filter(VideoCount.type == type)
+    if owner:
+        query = query.filter(VideoCount.owner_id == owner)
+    return int(query.scalar())
+
+
+def estimate_count(db: Session, query) -> Optional[int]:
+    """Planner row estimate for a query (Postgres only), None elsewhere"""
+    if db.get_bind().dialect.name != "postgresql":
+        return None
+    statement = query.order_by(None).limit(None).offset(None).statement
+    sql = str(statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+    plan = db.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def video_total(db: Session, query, status: str, type: Optional[str] = None,
+                owner: Optional[str] = None, exact_only: bool = False) -> int:
+    """
+    Total for a video listing according to VIDEO_TOTALS_MODE. Filters the
+    counters can't express (e.g. search) set exact_only and always COUNT(*).
+    """
+    mode = settings.VIDEO_TOTALS_MODE
+    if exact_only or mode == "exact":
+        return query.count()
+    if mode == "estimate":
+        estimate = estimate_count(db, query)
+        if estimate is not None:
+            return estimate
+    return count_videos(db, status, type=type, owner=owner)
+
+
+def _actual_counts(db: Session) -> dict:
+    """{(status, type, owner_id): count} computed from the videos table"""
+    status = func.coalesce(Video.status, _column_default("status"))
+    type_ = func.coalesce(Video.type, _column_default("type"))
+    rows = db.query(status, type_, Video.owner_id, func.count(Video.id)).group_by(status, type_, Video.owner_id)
+    return {(bucket_status, bucket_type, owner_id): count for bucket_status, bucket_type, owner_id, count in rows}
+
+
+def rebuild_video_counts(db: Session) -> int:
+    """Recompute every counter from the videos table; returns the number of buckets"""
+    actual = _actual_counts(db)
+    db.query(VideoCount).delete(synchronize_session=False)
+    for (bucket_status, bucket_type, owner_id), count in actual.items():
+        db.add(VideoCount(status=bucket_status, type=bucket_type, owner_id=owner_id, count=count))
+    db.commit()
+    return len(actual)
+
+
+class VideoCountReconciler:
+    """
+    Compares every video_counts bucket with a GROUP BY over videos and repairs
+    the differences with compare-and-set updates, like CounterReconciler: the
+    counters are read before the videos, so a bucket that moved in between is
+    left for the next run instead of being set to a stale count.
+    """
+
+    name = "video_counts"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.rows_checked = 0
+        self.repaired = {"count": 0}
+        self.last_run_seconds = None
+        self.last_run_at = None
+
+    def _reconcile(self, db: Session) -> tuple[int, int]:
+        stored = {
+            (row.status, row.type, row.owner_id): (row.id, row.count)
+            for row in db.query(VideoCount.id, VideoCount.status, VideoCount.type, VideoCount.owner_id, VideoCount.count)
+        }
+        actual = _actual_counts(db)
+        repaired = 0
+        for bucket in stored.keys() | actual.keys():
+            count = actual.get(bucket, 0)
+            if bucket in stored:
+                bucket_id, observed = stored[bucket]
+                if observed != count:
+                    repaired += db.execute(
+                        update(VideoCount)
+                        .where(VideoCount.id == bucket_id, VideoCount.count == observed)
+                        .values(count=count)
+                    ).rowcount
+                continue
+            status, type_, owner_id = bucket
+            try:
+                with db.begin_nested():
+                    db.execute(insert(VideoCount).values(
+                        id=generate_uuid(), status=status, type=type_, owner_id=owner_id, count=count,
+                    ))
+                repaired += 1
+            except IntegrityError:
+                pass  # created by a concurrent write; checked again next run
+        db.commit()
+        return len(stored.keys() | actual.keys()), repaired
+
+    def run(self) -> dict:
+        start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            checked, repaired = self._reconcile(db)
+        finally:
+            db.close()
+        with self._lock:
+            self.runs += 1
+            self.rows_checked += checked
+            self.repaired["count"] += repaired
+            self.last_run_seconds = round(time.perf_counter() - start, 3)
+            self.last_run_at = time.time()
+        return {"count": repaired}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "rows_checked": self.rows_checked,
+                "repaired": dict(self.repaired),
+                "last_run_seconds": self.last_run_seconds,
+                "last_run_at": self.last_run_at,
+            }
+
+
+video_count_reconciler = VideoCountReconciler()
+
+
+def init_video_counts(db: Session):
+    """Backfill the counters on first start"""
+    if db.query(VideoCount.id).first() is None and db.query(Video.id).first() is not None:
+        rebuild_video_counts(db)
@@ -0,0 +1,94 @@
+"""
+View Counter - Write-behind aggregation of video view increments
+
+Views are accumulated in memory per video id and written in one bulk UPDATE
+every VIEW_FLUSH_INTERVAL_SECONDS, when VIEW_FLUSH_MAX_PENDING unflushed views
+pile up, and on shutdown. If the process dies, at most one interval's worth of
+views (never more than VIEW_FLUSH_MAX_PENDING) is lost.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+
+from sqlalchemy import bindparam, func, update
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import Video
+
+settings = get_settings()
+
+
+class ViewCounter:
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._deltas = defaultdict(int)
+        self._total = 0
+
+    def record(self, video_id: str):
+        """Count one view; flushes inline once the loss budget is used up"""
+        with self._lock:
+            self._deltas[video_id] += 1
+            self._total += 1
+            over_budget = self._total >= self.max_pending
+        if over_budget:
+            self.flush()
+
+    def pending(self, video_id: str) -> int:
+        """Views recorded for a video but not yet written"""
+        with self._lock:
+            return self._deltas.get(video_id, 0)
+
+    def _take(self) -> dict:
+        with self._lock:
+            deltas, self._deltas = self._deltas, defaultdict(int)
+            self._total = 0
+        return deltas
+
+    def _restore(self, deltas: dict):
+        with self._lock:
+            for video_id, delta in deltas.items():
+                self._deltas[video_id] += delta
+                self._total += delta
+
+    def flush(self) -> int:
+        """Write all pending deltas in a single executemany UPDATE; returns rows touched"""
+        with self._flush_lock:
+            deltas = self._take()
+            if not deltas:
+                return 0
+            stmt = (
+                update(Video)
+                .where(Video.id == bindparam("video_id"))
+                .values(views=func.coalesce(Video.views, 0) + bindparam("delta"))
+            )
+            params = [{"video_id": vid, "delta": delta} for vid, delta in deltas.items()]
+            db = SessionLocal()
+            try:
+                db.connection().execute(stmt, params)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                self._restore(deltas)
+                print(f"View counter flush failed: {e}")
+                return 0
+            finally:
+                db.close()
+            return len(params)
+
+
+view_counter = ViewCounter(max_pending=settings.VIEW_FLUSH_MAX_PENDING)
+
+
+async def run_view_flusher(interval: float = None):
+    """Background task: flush the view counter every interval until cancelled"""
+    interval = interval or settings.VIEW_FLUSH_INTERVAL_SECONDS
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(view_counter.flush)
+    finally:
+        await asyncio.to_thread(view_counter.flush)
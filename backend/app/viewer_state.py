@@ -0,0 +1,62 @@
+"""
+Viewer State - Batched per-viewer relationship lookups (liked, in playlist, following)
+
+Each relation is resolved for a whole page of ids with one indexed
+`IN (...)` query, so rendering N cards costs a fixed number of queries
+instead of one request per card.
+"""
+
+from sqlalchemy.orm import Session
+
+from app.models import Follow, Playlist, PlaylistVideo, VideoLike
+
+
+def liked_video_ids(db: Session, user_id: str, video_ids: list) -> set:
+    if not video_ids:
+        return set()
+    rows = db.query(VideoLike.video_id).filter(
+        VideoLike.user_id == user_id,
+        VideoLike.video_id.in_(video_ids),
+    )
+    return {row.video_id for row in rows}
+
+
+def playlisted_video_ids(db: Session, user_id: str, video_ids: list) -> set:
+    """Videos that are in at least one of the user's playlists"""
+    if not video_ids:
+        return set()
+    rows = (
+        db.query(PlaylistVideo.video_id)
+        .join(Playlist, Playlist.id == PlaylistVideo.playlist_id)
+        .filter(Playlist.user_id == user_id, PlaylistVideo.video_id.in_(video_ids))
+        .distinct()
+    )
+    return {row.video_id for row in rows}
+
+
+def followed_user_ids(db: Session, user_id: str, user_ids: list) -> set:
+    if not user_ids:
+        return set()
+    rows = db.query(Follow.following_id).filter(
+        Follow.follower_id == user_id,
+        Follow.following_id.in_(user_ids),
+    )
+    return {row.following_id for row in rows}
+
+
+def video_states(db: Session, user_id: str, video_ids: list) -> dict:
+    """video id -> {"is_liked", "in_playlist"} for the viewer"""
+    video_ids = list(dict.fromkeys(video_ids))
+    liked = liked_video_ids(db, user_id, video_ids)
+    playlisted = playlisted_video_ids(db, user_id, video_ids)
+    return {
+        vid: {"is_liked": vid in liked, "in_playlist": vid in playlisted}
+        for vid in video_ids
+    }
+
+
+def user_states(db: Session, user_id: str, user_ids: list) -> dict:
+    """user id -> {"is_following"} for the viewer"""
+    user_ids = list(dict.fromkeys(user_ids))
+    following = followed_user_ids(db, user_id, user_ids)
+    return {uid: {"is_following": uid in following} for uid in user_ids}
@@ -1,15 +1,32 @@
 """
 Database Initialization Script
-Creates all tables defined in SQLAlchemy models.
+Creates all tables defined in SQLAlchemy models and marks the database as
+up to date with the migrations (later schema changes: `alembic upgrade head`).
 """
 
+import os
+
+from alembic import command
+from alembic.config import Config
+
 from app.database import engine, Base
 from app.models import *  # Import all models to ensure they are registered
+from app.search import PostgresSearchBackend
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")
+
 
 def init_db():
     print("Creating database tables...")
     try:
         Base.metadata.create_all(bind=engine)
+        if engine.dialect.name == "postgresql":
+            # Not on the models; existing databases get it from migration 0012
+            PostgresSearchBackend().index_ddl().create(bind=engine, checkfirst=True)
+        with engine.begin() as connection:
+            config = Config(ALEMBIC_INI)
+            config.attributes["connection"] = connection
+            command.stamp(config, "head")
         print("Database tables created successfully!")
     except Exception as e:
         print(f"Error creating database tables: {e}")
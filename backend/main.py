@@ -3,6 +3,10 @@ CineVisor Backend - FastAPI Application
 AI Short Film Platform - Microservice Architecture
 """
 
+import asyncio
+from contextlib import asynccontextmanager
+
+import anyio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
@@ -12,7 +16,60 @@ import os
 load_dotenv()
 
 # Import routers
-from app.routers import auth, videos, comments, likes, reports, admin, notifications, users, playlists
+from app.routers import auth, videos, comments, likes, reports, admin, notifications, users, playlists, viewer
+from app.search import init_search
+from app.view_counter import run_view_flusher
+from app.counters import run_counter_reconciler
+from app.timelines import run_timeline_trimmer
+from app.video_counts import init_video_counts
+from app.database import SessionLocal, threadpool_workers, warm_pool
+from app.storage import init_s3
+from app.media import media_pipeline
+from app.config import get_settings
+
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup / shutdown hooks"""
+    # DB-bound handlers are plain `def` and run in this threadpool, off the event loop
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threadpool_workers()
+    try:
+        await asyncio.to_thread(warm_pool)
+    except Exception as e:
+        print(f"Database pool warm-up failed: {e}")
+    try:
+        init_s3()
+    except Exception as e:
+        print(f"S3 client setup failed: {e}")
+    try:
+        init_search()
+    except Exception as e:
+        print(f"Search index setup failed: {e}")
+    db = SessionLocal()
+    try:
+        init_video_counts(db)
+    except Exception as e:
+        print(f"Video counter backfill failed: {e}")
+    finally:
+        db.close()
+    try:
+        await asyncio.to_thread(media_pipeline.requeue_pending)
+    except Exception as e:
+        print(f"Media pipeline requeue failed: {e}")
+    view_flusher = asyncio.create_task(run_view_flusher())
+    reconciler = asyncio.create_task(run_counter_reconciler())
+    timeline_trimmer = asyncio.create_task(run_timeline_trimmer())
+    yield
+    media_pipeline.shutdown()
+    for task in (timeline_trimmer, reconciler, view_flusher):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -21,6 +78,7 @@ app = FastAPI(
     version="2.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS Configuration
@@ -30,6 +88,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Content-Range", "ETag"],
 )
 
 # Include routers
@@ -42,6 +101,7 @@ app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 app.include_router(notifications.router, prefix="/api/notifications", tags=["Notifications"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 app.include_router(playlists.router, prefix="/api/playlists", tags=["Playlists"])
+app.include_router(viewer.router, prefix="/api", tags=["Viewer"])
 
 
 @app.get("/api/health")
@@ -0,0 +1,77 @@
+"""
+Alembic Environment - Migrations against the app's DATABASE_URL
+
+New databases: `python init_db.py` creates every table and stamps the current
+revision. Existing databases: `alembic upgrade head` (one created before
+migrations existed: `alembic stamp 0001` first). Revisions skip changes that
+are already present, e.g. tables `create_all` added on its own.
+"""
+
+import os
+import sys
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.config import get_settings
+from app.database import Base
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.search import SEARCH_INDEX
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Created at runtime by the search backend (app/search.py), not by migrations
+RUNTIME_TABLES = {"video_search"}
+# Postgres-only expression index (revision 0012), not declared on the models
+UNMODELED_INDEXES = {SEARCH_INDEX}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    if type_ == "index":
+        return name not in UNMODELED_INDEXES
+    return not (type_ == "table" and name in RUNTIME_TABLES)
+
+
+def _configure(**kwargs):
+    context.configure(
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=True,  # SQLite can't ALTER constraints in place
+        transaction_per_migration=True,  # autocommit blocks (0012) commit only their own revision's work
+        **kwargs,
+    )
+
+
+def run_migrations_offline():
+    _configure(url=get_settings().DATABASE_URL, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # Callers (init_db.py, tests) may hand over an open connection
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    engine = create_engine(get_settings().DATABASE_URL, poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        _configure(connection=connection)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,150 @@
+"""
+Baseline schema (before migrations were introduced)
+
+Databases created earlier with init_db.py already have these tables; tables
+that exist are left alone, so `alembic upgrade head` works on them too.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _timestamp(name: str = "created_at"):
+    return sa.Column(name, sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)
+
+
+TABLES = {
+    "users": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("role", sa.String(), nullable=True),
+        sa.Column("avatar_url", sa.Text(), nullable=True),
+        sa.Column("bio", sa.Text(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        _timestamp(),
+        _timestamp("updated_at"),
+    ),
+    "password_resets": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("token", sa.String(), nullable=False, unique=True),
+        sa.Column("used", sa.Boolean(), nullable=True),
+        _timestamp(),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    ),
+    "follows": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("follower_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("following_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        _timestamp(),
+        sa.UniqueConstraint("follower_id", "following_id", name="uq_follower_following"),
+    ),
+    "notifications": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("is_read", sa.Boolean(), nullable=True),
+        sa.Column("reference_id", sa.String(), nullable=True),
+        _timestamp(),
+    ),
+    "playlists": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("is_public", sa.Boolean(), nullable=True),
+        _timestamp(),
+        _timestamp("updated_at"),
+    ),
+    "refresh_tokens": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("token", sa.String(), nullable=False, unique=True),
+        sa.Column("is_revoked", sa.Boolean(), nullable=True),
+        _timestamp(),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    ),
+    "videos": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("owner_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("tags", sa.JSON(), nullable=True),
+        sa.Column("type", sa.String(), nullable=True),
+        sa.Column("s3_key", sa.String(), nullable=True),
+        sa.Column("thumbnail_url", sa.Text(), nullable=True),
+        sa.Column("duration_seconds", sa.Integer(), nullable=True),
+        sa.Column("size_bytes", sa.BigInteger(), nullable=True),
+        sa.Column("allow_download", sa.Boolean(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("views", sa.BigInteger(), nullable=True),
+        sa.Column("likes_count", sa.Integer(), nullable=True),
+        sa.Column("comments_count", sa.Integer(), nullable=True),
+        sa.Column("ai_model", sa.String(), nullable=True),
+        sa.Column("ai_prompt", sa.Text(), nullable=True),
+        _timestamp(),
+        _timestamp("updated_at"),
+    ),
+    "comments": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("video_id", sa.String(), sa.ForeignKey("videos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("likes_count", sa.Integer(), nullable=True),
+        sa.Column("is_deleted", sa.Boolean(), nullable=True),
+        _timestamp(),
+        _timestamp("updated_at"),
+    ),
+    "playlist_videos": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("playlist_id", sa.String(), sa.ForeignKey("playlists.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("video_id", sa.String(), sa.ForeignKey("videos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=True),
+        _timestamp("added_at"),
+        sa.UniqueConstraint("playlist_id", "video_id", name="uq_playlist_video"),
+    ),
+    "reports": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("video_id", sa.String(), sa.ForeignKey("videos.id"), nullable=False),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("reason", sa.String(), nullable=False),
+        sa.Column("details", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        _timestamp(),
+    ),
+    "video_likes": lambda: (
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("video_id", sa.String(), sa.ForeignKey("videos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id"), nullable=False),
+        _timestamp(),
+        sa.UniqueConstraint("video_id", "user_id", name="uq_video_user_like"),
+    ),
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    for name, columns in TABLES.items():  # dependency order
+        if inspector.has_table(name):
+            continue
+        op.create_table(name, *columns())
+        if name == "users":
+            op.create_index("ix_users_email", "users", ["email"], unique=True)
+            op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+
+def downgrade():
+    for name in reversed(list(TABLES)):
+        op.drop_table(name)
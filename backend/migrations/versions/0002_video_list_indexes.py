@@ -0,0 +1,33 @@
+"""
+Keyset pagination indexes on videos (status, sort key, id)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_videos_status_created_id": ["status", "created_at", "id"],
+    "ix_videos_status_views_id": ["status", "views", "id"],
+    "ix_videos_status_likes_id": ["status", "likes_count", "id"],
+}
+
+
+def upgrade():
+    existing = {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes("videos")}
+    for name, columns in INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "videos", columns)
+
+
+def downgrade():
+    for name in INDEXES:
+        op.drop_index(name, table_name="videos")
@@ -0,0 +1,33 @@
+"""
+video_counts table for listing totals (filled on first start by init_video_counts)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("video_counts"):
+        return
+    op.create_table(
+        "video_counts",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("owner_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.UniqueConstraint("status", "type", "owner_id", name="uq_video_count_bucket"),
+    )
+
+
+def downgrade():
+    op.drop_table("video_counts")
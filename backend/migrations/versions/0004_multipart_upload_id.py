@@ -0,0 +1,26 @@
+"""
+videos.multipart_upload_id for resumable multipart uploads
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("videos")}
+    if "multipart_upload_id" not in existing:
+        op.add_column("videos", sa.Column("multipart_upload_id", sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("videos") as batch:
+        batch.drop_column("multipart_upload_id")
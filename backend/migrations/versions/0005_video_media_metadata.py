@@ -0,0 +1,37 @@
+"""
+videos media metadata and processing_status, filled by the media pipeline
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    "width": sa.Integer,
+    "height": sa.Integer,
+    "video_codec": sa.String,
+    "audio_codec": sa.String,
+    "bitrate": sa.Integer,
+    "processing_status": sa.String,  # queued, processing, ready, failed
+}
+
+
+def upgrade():
+    existing = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("videos")}
+    for name, type_ in COLUMNS.items():
+        if name not in existing:
+            op.add_column("videos", sa.Column(name, type_(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("videos") as batch:
+        for name in reversed(list(COLUMNS)):
+            batch.drop_column(name)
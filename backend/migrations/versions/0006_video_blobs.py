@@ -0,0 +1,44 @@
+"""
+video_blobs table and videos.content_sha256 for content-addressed storage
+
+Existing videos keep content_sha256 NULL and their own files; only new
+uploads are stored as shared blobs.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("video_blobs"):
+        op.create_table(
+            "video_blobs",
+            sa.Column("sha256", sa.String(64), primary_key=True),
+            sa.Column("s3_key", sa.String(), nullable=False),
+            sa.Column("size_bytes", sa.BigInteger(), nullable=True),
+            sa.Column("ref_count", sa.Integer(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        )
+    if "content_sha256" not in {c["name"] for c in inspector.get_columns("videos")}:
+        with op.batch_alter_table("videos") as batch:
+            batch.add_column(sa.Column("content_sha256", sa.String(64), nullable=True))
+            batch.create_foreign_key("videos_content_sha256_fkey", "video_blobs", ["content_sha256"], ["sha256"])
+            batch.create_index("ix_videos_content_sha256", ["content_sha256"])
+
+
+def downgrade():
+    with op.batch_alter_table("videos") as batch:
+        batch.drop_index("ix_videos_content_sha256")
+        batch.drop_constraint("videos_content_sha256_fkey", type_="foreignkey")
+        batch.drop_column("content_sha256")
+    op.drop_table("video_blobs")
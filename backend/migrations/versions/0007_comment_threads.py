@@ -0,0 +1,49 @@
+"""
+Threaded comments: comments.parent_id, replies_count and keyset pagination indexes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_comments_video_parent_created_id": ["video_id", "parent_id", "created_at", "id"],
+    "ix_comments_video_parent_likes_id": ["video_id", "parent_id", "likes_count", "id"],
+    "ix_comments_parent_created_id": ["parent_id", "created_at", "id"],
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("comments")}
+    indexes = {ix["name"] for ix in inspector.get_indexes("comments")}
+    with op.batch_alter_table("comments") as batch:
+        if "parent_id" not in columns:
+            batch.add_column(sa.Column("parent_id", sa.String(), nullable=True))
+            batch.create_foreign_key(
+                "comments_parent_id_fkey", "comments", ["parent_id"], ["id"], ondelete="CASCADE"
+            )
+        if "replies_count" not in columns:
+            batch.add_column(sa.Column("replies_count", sa.Integer(), nullable=True))
+        for name, index_columns in INDEXES.items():
+            if name not in indexes:
+                batch.create_index(name, index_columns)
+    # Existing comments are all top-level
+    op.execute("UPDATE comments SET replies_count = 0 WHERE replies_count IS NULL")
+
+
+def downgrade():
+    with op.batch_alter_table("comments") as batch:
+        for name in INDEXES:
+            batch.drop_index(name)
+        batch.drop_constraint("comments_parent_id_fkey", type_="foreignkey")
+        batch.drop_column("replies_count")
+        batch.drop_column("parent_id")
@@ -0,0 +1,24 @@
+"""
+Index playlists.user_id for viewer-state playlist lookups
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if "ix_playlists_user_id" not in {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes("playlists")}:
+        op.create_index("ix_playlists_user_id", "playlists", ["user_id"])
+
+
+def downgrade():
+    op.drop_index("ix_playlists_user_id", table_name="playlists")
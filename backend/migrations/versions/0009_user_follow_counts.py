@@ -0,0 +1,37 @@
+"""
+users.followers_count / following_count (backfilled from follows) and a follows.following_id index
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {c["name"] for c in inspector.get_columns("users")}
+    for name in ("followers_count", "following_count"):
+        if name not in columns:
+            op.add_column("users", sa.Column(name, sa.Integer(), nullable=True))
+    if "ix_follows_following_id" not in {ix["name"] for ix in inspector.get_indexes("follows")}:
+        op.create_index("ix_follows_following_id", "follows", ["following_id"])
+    op.execute(
+        "UPDATE users SET "
+        "followers_count = (SELECT COUNT(*) FROM follows WHERE follows.following_id = users.id), "
+        "following_count = (SELECT COUNT(*) FROM follows WHERE follows.follower_id = users.id)"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_follows_following_id", table_name="follows")
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("following_count")
+        batch.drop_column("followers_count")
@@ -0,0 +1,53 @@
+"""
+timeline_entries for the following feed, seeded from existing follows; per-owner videos index
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config import get_settings
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "ix_videos_owner_status_created_id" not in {ix["name"] for ix in inspector.get_indexes("videos")}:
+        op.create_index("ix_videos_owner_status_created_id", "videos", ["owner_id", "status", "created_at", "id"])
+    if inspector.has_table("timeline_entries"):
+        return
+    op.create_table(
+        "timeline_entries",
+        sa.Column("user_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("video_id", sa.String(), sa.ForeignKey("videos.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("owner_id", sa.String(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_timeline_user_created_video", "timeline_entries", ["user_id", "created_at", "video_id"])
+
+    # Fan out what followers would already have seen; large accounts are merged
+    # at read time instead, and the periodic trim caps each timeline
+    op.get_bind().execute(
+        sa.text(
+            "INSERT INTO timeline_entries (user_id, video_id, owner_id, created_at) "
+            "SELECT follows.follower_id, videos.id, videos.owner_id, videos.created_at "
+            "FROM follows "
+            "JOIN users ON users.id = follows.following_id "
+            "JOIN videos ON videos.owner_id = follows.following_id "
+            "WHERE videos.status = 'approved' AND videos.created_at IS NOT NULL "
+            "AND COALESCE(users.followers_count, 0) < :fanout_max_followers"
+        ),
+        {"fanout_max_followers": get_settings().FEED_FANOUT_MAX_FOLLOWERS},
+    )
+
+
+def downgrade():
+    op.drop_table("timeline_entries")
+    op.drop_index("ix_videos_owner_status_created_id", table_name="videos")
@@ -0,0 +1,38 @@
+"""
+One text format for SQLite timestamps (fractional seconds everywhere)
+
+Rows written through the CURRENT_TIMESTAMP server default are stored as
+'YYYY-MM-DD HH:MM:SS', ORM-written ones as 'YYYY-MM-DD HH:MM:SS.ffffff'. Cursor
+seeks compare the stored text against a bound value, so the old values get the
+same form. Other databases store real timestamps and are left alone.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != "sqlite":
+        return
+    inspector = sa.inspect(bind)
+    for table in inspector.get_table_names():
+        for column in inspector.get_columns(table):
+            if isinstance(column["type"], sa.DateTime):
+                name = column["name"]
+                bind.execute(sa.text(
+                    f'UPDATE "{table}" SET "{name}" = "{name}" || \'.000000\' WHERE length("{name}") = 19'
+                ))
+
+
+def downgrade():
+    pass  # both forms read back as the same datetime
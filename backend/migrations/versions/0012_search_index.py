@@ -0,0 +1,44 @@
+"""
+GIN index for Postgres full-text search, built without blocking writes
+
+CREATE INDEX CONCURRENTLY can't run inside a transaction, so it gets an
+autocommit block. A build that was interrupted leaves an invalid index behind,
+which is dropped and rebuilt. Other databases use the FTS5 table or the Python
+index instead (app/search.py).
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex
+
+from app.search import SEARCH_INDEX, PostgresSearchBackend
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        valid = bind.execute(
+            sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(CAST(:name AS text))"),
+            {"name": SEARCH_INDEX},
+        ).scalar()
+        if valid is False:
+            bind.execute(sa.text(f"DROP INDEX CONCURRENTLY {SEARCH_INDEX}"))
+        bind.execute(CreateIndex(PostgresSearchBackend().index_ddl(concurrently=True), if_not_exists=True))
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        op.get_bind().execute(sa.text(f"DROP INDEX CONCURRENTLY IF EXISTS {SEARCH_INDEX}"))
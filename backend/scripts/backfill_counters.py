@@ -0,0 +1,23 @@
+"""
+Counter backfill: recompute every denormalized counter once, now.
+
+Counter columns are added (and follower counts filled) by the migrations
+(`alembic upgrade head`). This runs every counter reconciler once, which
+computes the true values from the source tables in batches - useful after
+bulk imports or manual data fixes instead of waiting for the periodic
+reconciler. Safe to re-run.
+
+Usage: python scripts/backfill_counters.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.counters import reconcile_all
+
+
+if __name__ == "__main__":
+    for name, repaired in reconcile_all().items():
+        print(f"{name}: {repaired}")
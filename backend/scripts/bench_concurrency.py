@@ -0,0 +1,65 @@
+"""
+Concurrency benchmark: latency of fast requests while slow DB-bound requests are in flight.
+
+Blocking DB calls inside `async def` handlers stall the event loop, so /api/health
+latency tracks the slow requests. With DB-bound handlers declared as plain `def`
+they run in the threadpool and /api/health stays fast.
+
+Usage: python scripts/bench_concurrency.py [base_url] [slow_concurrency] [seconds]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+BASE_URL = sys.argv[1] if len(sys.argv) > 1 else "http://localhost:8000/api"
+SLOW_CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+DURATION = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+
+# DB-heavy requests: deep offset pages with exact totals
+SLOW_PATH = "/videos?sort=popular&limit=100&page=50"
+FAST_PATH = "/health"
+
+
+async def slow_worker(client, stop_at, counter):
+    while time.monotonic() < stop_at:
+        await client.get(SLOW_PATH)
+        counter[0] += 1
+
+
+async def fast_probe(client, stop_at):
+    latencies = []
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        await client.get(FAST_PATH)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def main():
+    limits = httpx.Limits(max_connections=SLOW_CONCURRENCY + 4)
+    async with httpx.AsyncClient(base_url=BASE_URL, limits=limits, timeout=60) as client:
+        baseline = await fast_probe(client, time.monotonic() + 2)
+
+        stop_at = time.monotonic() + DURATION
+        slow_done = [0]
+        workers = [slow_worker(client, stop_at, slow_done) for _ in range(SLOW_CONCURRENCY)]
+        results = await asyncio.gather(fast_probe(client, stop_at), *workers)
+        loaded = results[0]
+
+    def summary(values):
+        values = sorted(values)
+        p95 = values[int(len(values) * 0.95) - 1] if len(values) > 1 else values[0]
+        return f"n={len(values)} p50={statistics.median(values):.1f}ms p95={p95:.1f}ms max={values[-1]:.1f}ms"
+
+    print(f"Fast requests, idle:      {summary(baseline)}")
+    print(f"Fast requests, under load: {summary(loaded)}")
+    print(f"Slow requests completed:   {slow_done[0]} ({slow_done[0] / DURATION:.1f}/s)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
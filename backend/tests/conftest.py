@@ -0,0 +1,119 @@
+"""
+Test Fixtures - Isolated SQLite database, API client, users and a query counter
+
+Run from backend/: python -m pytest
+"""
+
+import os
+import sys
+import tempfile
+
+# Settings are read once at import time, so point them at a scratch dir first
+_TMP_DIR = tempfile.mkdtemp(prefix="cinevisor-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'test.db')}"
+os.environ["UPLOAD_DIR"] = os.path.join(_TMP_DIR, "uploads")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+import main
+from app import search
+from app.auth import create_access_token, principal_cache
+from app.cache import feed_cache
+from app.database import Base, SessionLocal, engine
+from app.media import media_pipeline
+from app.models import User, Video
+
+
+@pytest.fixture(autouse=True)
+def fresh_database():
+    """Every test starts from empty tables and empty in-process caches"""
+    Base.metadata.create_all(bind=engine)
+    yield
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS video_search"))
+    Base.metadata.drop_all(bind=engine)
+    search._backend = None
+    feed_cache.clear()
+    principal_cache.clear()
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def make_user(db):
+    """make_user(name, role="user") -> (user_id, auth headers)"""
+    def make(name: str, role: str = "user"):
+        user = User(email=f"{name}@example.com", username=name, password_hash="x", role=role)
+        db.add(user)
+        db.commit()
+        token = create_access_token({"sub": user.id})
+        return user.id, {"Authorization": f"Bearer {token}"}
+    return make
+
+
+@pytest.fixture
+def make_video(db):
+    """make_video(owner_id, **fields) -> video id"""
+    def make(owner_id: str, **fields):
+        fields.setdefault("title", "Video")
+        fields.setdefault("status", "approved")
+        video = Video(owner_id=owner_id, **fields)
+        db.add(video)
+        db.commit()
+        return video.id
+    return make
+
+
+@pytest.fixture
+def no_pipeline(monkeypatch):
+    """Record media pipeline submissions instead of running them; yields the video ids"""
+    submitted = []
+    monkeypatch.setattr(media_pipeline, "submit", lambda video_id: submitted.append(video_id) or True)
+    return submitted
+
+
+class QueryCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def count_queries():
+    """
+    Context manager counting SQL statements sent to the database:
+
+        with count_queries() as queries:
+            client.get(...)
+        assert len(queries) == 2
+    """
+    class _Counting:
+        def __enter__(self):
+            self.counter = QueryCounter()
+            event.listen(engine, "before_cursor_execute", self.counter._record)
+            return self.counter
+
+        def __exit__(self, *exc):
+            event.remove(engine, "before_cursor_execute", self.counter._record)
+
+    return _Counting
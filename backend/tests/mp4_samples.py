@@ -0,0 +1,94 @@
+"""
+MP4 Samples - Builds small synthetic MP4 files for the parser and media pipeline tests
+
+The files have a real box structure (ftyp, moov with one video and one audio
+track, mdat) but the sample data is filler: byte N of video sample i is `i`, so
+a test can check that a chunk offset still points at the right sample after a
+rewrite.
+"""
+
+import struct
+
+
+def box(box_type: str, payload: bytes) -> bytes:
+    return struct.pack(">I4s", len(payload) + 8, box_type.encode("latin-1")) + payload
+
+
+def full_box(box_type: str, payload: bytes, version: int = 0) -> bytes:
+    return box(box_type, struct.pack(">I", version << 24) + payload)
+
+
+def _table(box_type: str, entries, code: str = "I") -> bytes:
+    entries = list(entries)
+    flat = [value for entry in entries for value in (entry if isinstance(entry, tuple) else (entry,))]
+    return full_box(box_type, struct.pack(f">I{len(flat)}{code}", len(entries), *flat))
+
+
+def _stbl(entry: bytes, sample_sizes, samples_per_chunk: int, delta: int, chunk_offsets, sync, co64: bool) -> bytes:
+    tables = [
+        full_box("stsd", struct.pack(">I", 1) + entry),
+        _table("stts", [(len(sample_sizes), delta)]),
+    ]
+    if sync is not None:
+        tables.append(_table("stss", sync))
+    tables += [
+        _table("stsc", [(1, samples_per_chunk, 1)]),
+        full_box("stsz", struct.pack(f">II{len(sample_sizes)}I", 0, len(sample_sizes), *sample_sizes)),
+        _table("co64", chunk_offsets, "Q") if co64 else _table("stco", chunk_offsets),
+    ]
+    return box("stbl", b"".join(tables))
+
+
+def _trak(track_id: int, handler: str, timescale: int, duration: int, stbl: bytes, size=(0, 0)) -> bytes:
+    tkhd = full_box("tkhd", struct.pack(">IIIIIQHHHH36xII", 0, 0, track_id, 0, duration, 0, 0, 0, 0, 0,
+                                        size[0] << 16, size[1] << 16))
+    mdhd = full_box("mdhd", struct.pack(">IIIIHH", 0, 0, timescale, duration, 0x55C4, 0))
+    hdlr = full_box("hdlr", struct.pack(">I4s12x", 0, handler.encode("latin-1")) + b"\0")
+    return box("trak", tkhd + box("mdia", mdhd + hdlr + box("minf", stbl)))
+
+
+def build_mp4(
+    moov_first: bool = False,
+    co64: bool = False,
+    video_samples: int = 6,
+    samples_per_chunk: int = 2,
+    sync=(1, 4),
+    timescale: int = 1000,
+    delta: int = 500,
+    width: int = 640,
+    height: int = 360,
+) -> bytes:
+    """
+    An MP4 with `video_samples` H.264 samples (`delta` ticks apart, sync samples
+    listed in `sync` or all of them when it is None) followed by one AAC chunk
+    of two samples. moov goes after mdat unless `moov_first`.
+    """
+    video_sizes = [100 + i for i in range(video_samples)]
+    audio_sizes = [50, 50]
+    video_data = b"".join(bytes([i % 256]) * size for i, size in enumerate(video_sizes, start=1))
+    mdat = box("mdat", video_data + b"\xaa" * sum(audio_sizes))
+    ftyp = box("ftyp", b"isom" + struct.pack(">I", 512) + b"isomiso2avc1mp41")
+
+    avcc = box("avcC", bytes([1, 0x64, 0x00, 0x1F, 0xFF, 0xE0]))
+    avc1 = box("avc1", struct.pack(">6xHHH12xHHIIIH32sHh", 1, 0, 0, width, height,
+                                   0x00480000, 0x00480000, 0, 1, b"", 24, -1) + avcc)
+    mp4a = box("mp4a", struct.pack(">6xH8xHHHHI", 1, 2, 16, 0, 0, 44100 << 16))
+    duration = video_samples * delta
+
+    def moov(mdat_offset: int) -> bytes:
+        first = mdat_offset + 8
+        chunks = range(0, video_samples, samples_per_chunk)
+        video_offsets = [first + sum(video_sizes[:i]) for i in chunks]
+        audio_offset = first + len(video_data)
+        video = _trak(1, "vide", timescale, duration,
+                      _stbl(avc1, video_sizes, samples_per_chunk, delta, video_offsets, sync, co64),
+                      size=(width, height))
+        audio = _trak(2, "soun", timescale, duration,
+                      _stbl(mp4a, audio_sizes, 2, delta * 3, [audio_offset], None, co64))
+        mvhd = full_box("mvhd", struct.pack(">IIIIIH10x36x24xI", 0, 0, timescale, duration, 0x00010000, 0x0100, 3))
+        return box("moov", mvhd + video + audio)
+
+    moov_size = len(moov(0))
+    if moov_first:
+        return ftyp + moov(len(ftyp) + moov_size) + mdat
+    return ftyp + mdat + moov(len(ftyp))
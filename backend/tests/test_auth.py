@@ -0,0 +1,59 @@
+"""
+Auth Tests - Principal cache invalidation
+"""
+
+from sqlalchemy import update
+
+from app.auth import load_principal, principal_cache
+from app.database import SessionLocal
+from app.models import User
+
+
+def test_principal_invalidated_after_commit_not_flush(db, make_user):
+    user_id, _ = make_user("someone")
+    assert load_principal(db, user_id).role == "user"
+
+    user = db.query(User).filter(User.id == user_id).one()
+    user.role = "admin"
+    db.flush()
+    # Another request loads the principal before the change commits
+    other = SessionLocal()
+    try:
+        principal_cache.clear()
+        assert load_principal(other, user_id).role == "user"
+    finally:
+        other.close()
+
+    db.commit()
+    assert principal_cache.get(user_id) is None
+    assert load_principal(db, user_id).role == "admin"
+
+
+def test_principal_invalidated_when_user_deactivated(client, db, make_user):
+    user_id, headers = make_user("someone")
+    assert client.get("/api/videos/feed", headers=headers).status_code == 200
+
+    db.query(User).filter(User.id == user_id).one().is_active = False
+    db.commit()
+    assert client.get("/api/videos/feed", headers=headers).status_code == 401
+
+
+def test_unrelated_changes_keep_the_cache(db, make_user):
+    user_id, _ = make_user("someone")
+    load_principal(db, user_id)
+    db.query(User).filter(User.id == user_id).one().bio = "hello"
+    db.commit()
+    assert principal_cache.get(user_id) is not None
+
+
+def test_admin_access_is_checked_against_the_database(client, db, make_user):
+    admin_id, headers = make_user("root", role="admin")
+    assert client.get("/api/admin/metrics", headers=headers).status_code == 200
+    assert principal_cache.get(admin_id).role == "admin"
+
+    # Demoted elsewhere (another process, raw SQL): this process's cache still says admin
+    db.execute(update(User).where(User.id == admin_id).values(role="user"))
+    db.commit()
+    assert principal_cache.get(admin_id).role == "admin"
+    assert client.get("/api/admin/metrics", headers=headers).status_code == 403
+    assert principal_cache.get(admin_id).role == "user"
@@ -0,0 +1,100 @@
+"""
+Comment listing: cursor pages per sort, threaded replies and reply counts
+"""
+
+import pytest
+from sqlalchemy import update
+
+from app.models import Comment
+
+
+@pytest.fixture
+def video(make_user, make_video):
+    owner_id, headers = make_user("owner")
+    return make_video(owner_id), headers
+
+
+def post(client, video_id, headers, content, parent_id=None):
+    response = client.post(
+        f"/api/videos/{video_id}/comments",
+        json={"content": content, "parent_id": parent_id},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["data"]["id"]
+
+
+def walk(client, path, params, between_pages=None):
+    contents, cursor, page = [], None, 0
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        data = client.get(path, params=query).json()["data"]
+        contents += [c["content"] for c in data["comments"]]
+        page += 1
+        if between_pages:
+            between_pages(page, data)
+        cursor = data["next_cursor"]
+        if not cursor:
+            return contents
+
+
+@pytest.mark.parametrize("sort", ["newest", "oldest", "top"])
+def test_every_sort_pages_through_all_comments(client, video, sort):
+    video_id, headers = video
+    for i in range(7):
+        post(client, video_id, headers, f"c{i}")
+    contents = walk(client, f"/api/videos/{video_id}/comments", {"sort": sort, "limit": 3})
+    assert sorted(contents) == [f"c{i}" for i in range(7)]
+
+
+def test_top_sort_is_stable_when_anchor_likes_change(client, db, video):
+    video_id, headers = video
+    ids = [post(client, video_id, headers, f"c{i}") for i in range(6)]
+    for i, comment_id in enumerate(ids):
+        db.execute(update(Comment).where(Comment.id == comment_id).values(likes_count=100 - i))
+    db.commit()
+
+    def like_last_seen(page, data):
+        if page == 1:
+            db.execute(update(Comment).where(Comment.id == data["comments"][-1]["id"]).values(likes_count=1000))
+            db.commit()
+
+    contents = walk(client, f"/api/videos/{video_id}/comments", {"sort": "top", "limit": 2}, like_last_seen)
+    assert contents == [f"c{i}" for i in range(6)]
+
+
+def test_cursor_is_bound_to_its_sort(client, video):
+    video_id, headers = video
+    for i in range(3):
+        post(client, video_id, headers, f"c{i}")
+    cursor = client.get(f"/api/videos/{video_id}/comments", params={"limit": 1}).json()["data"]["next_cursor"]
+    response = client.get(f"/api/videos/{video_id}/comments", params={"sort": "top", "cursor": cursor})
+    assert response.status_code == 400
+
+
+def test_replies_are_counted_and_loaded_per_thread(client, video):
+    video_id, headers = video
+    root = post(client, video_id, headers, "root")
+    reply = post(client, video_id, headers, "reply", parent_id=root)
+    # A reply to a reply joins the root's thread
+    post(client, video_id, headers, "nested", parent_id=reply)
+
+    top_level = client.get(f"/api/videos/{video_id}/comments").json()["data"]["comments"]
+    assert [(c["content"], c["replies_count"]) for c in top_level] == [("root", 2)]
+
+    replies = walk(client, f"/api/comments/{root}/replies", {"limit": 1})
+    assert sorted(replies) == ["nested", "reply"]
+
+    client.delete(f"/api/comments/{reply}", headers=headers)
+    top_level = client.get(f"/api/videos/{video_id}/comments").json()["data"]["comments"]
+    assert top_level[0]["replies_count"] == 1
+
+
+def test_reply_parent_must_be_on_the_same_video(client, make_video, video):
+    video_id, headers = video
+    root = post(client, video_id, headers, "root")
+    other_video = make_video(client.get(f"/api/videos/{video_id}").json()["data"]["owner_id"])
+    response = client.post(
+        f"/api/videos/{other_video}/comments", json={"content": "x", "parent_id": root}, headers=headers
+    )
+    assert response.status_code == 404
@@ -0,0 +1,126 @@
+"""
+Counter Tests - Atomic increments and drift reconciliation
+"""
+
+from sqlalchemy import update
+
+from app import counters
+from app.counters import increment, video_counter_reconciler
+from app.database import SessionLocal
+from app.models import Comment, Follow, User, Video, VideoLike
+from app.video_counts import count_videos, video_count_reconciler
+
+
+def _like(db, video_id, user_id):
+    db.add(VideoLike(video_id=video_id, user_id=user_id))
+
+
+def _value(db, model, pk, column):
+    db.expire_all()
+    return db.query(getattr(model, column)).filter(model.id == pk).scalar()
+
+
+def test_like_counts_once_per_user(client, db, make_user, make_video):
+    owner_id, headers = make_user("owner")
+    video_id = make_video(owner_id)
+    assert client.post(f"/api/videos/{video_id}/like", headers=headers).status_code == 200
+    assert client.post(f"/api/videos/{video_id}/like", headers=headers).status_code == 400
+    assert _value(db, Video, video_id, "likes_count") == 1
+
+    assert client.post("/api/videos/missing/like", headers=headers).status_code == 404
+    assert db.query(VideoLike).filter(VideoLike.video_id == "missing").count() == 0
+
+
+def test_increment_floors_at_zero(db, make_user, make_video):
+    owner_id, _ = make_user("owner")
+    video_id = make_video(owner_id, likes_count=1)
+    assert increment(db, Video, video_id, "likes_count", -3)
+    db.commit()
+    assert _value(db, Video, video_id, "likes_count") == 0
+    assert not increment(db, Video, "missing", "likes_count")
+
+
+def test_reconcile_repairs_drift_in_batches(monkeypatch, db, make_user, make_video):
+    monkeypatch.setattr(video_counter_reconciler, "batch_size", 2)
+    owner_id, _ = make_user("owner")
+    fan_id, _ = make_user("fan")
+    videos = [make_video(owner_id, likes_count=7, comments_count=0) for _ in range(5)]
+    for video_id in videos[:3]:
+        _like(db, video_id, fan_id)
+    db.add(Comment(video_id=videos[0], user_id=fan_id, content="hi"))
+    db.add(Comment(video_id=videos[0], user_id=fan_id, content="gone", is_deleted=True))
+    db.commit()
+
+    assert video_counter_reconciler.run() == {"likes_count": 5, "comments_count": 1}
+    assert [_value(db, Video, v, "likes_count") for v in videos] == [1, 1, 1, 0, 0]
+    assert _value(db, Video, videos[0], "comments_count") == 1
+    # Nothing left to repair
+    assert video_counter_reconciler.run() == {"likes_count": 0, "comments_count": 0}
+
+
+def test_reconcile_skips_counters_that_moved_meanwhile(monkeypatch, db, make_user, make_video):
+    owner_id, _ = make_user("owner")
+    video_id = make_video(owner_id, likes_count=5)
+    real_sources = video_counter_reconciler.sources
+
+    def sources_with_concurrent_like(session, ids):
+        # A like lands after the batch was read but before the repair is written
+        other = SessionLocal()
+        try:
+            increment(other, Video, video_id, "likes_count")
+            other.commit()
+        finally:
+            other.close()
+        return real_sources(session, ids)
+
+    monkeypatch.setattr(video_counter_reconciler, "sources", sources_with_concurrent_like)
+    assert video_counter_reconciler.run()["likes_count"] == 1
+    assert _value(db, Video, video_id, "likes_count") == 6  # left for the next run
+
+    monkeypatch.setattr(video_counter_reconciler, "sources", real_sources)
+    video_counter_reconciler.run()
+    assert _value(db, Video, video_id, "likes_count") == 0
+
+
+def test_reconcile_all_covers_users_and_replies(client, db, make_user, make_video):
+    admin_id, admin_headers = make_user("admin", role="admin")
+    a_id, a_headers = make_user("a")
+    b_id, _ = make_user("b")
+    db.add(Follow(follower_id=a_id, following_id=b_id))
+    video_id = make_video(b_id)
+    root = Comment(video_id=video_id, user_id=a_id, content="root")
+    db.add(root)
+    db.commit()
+    db.add(Comment(video_id=video_id, user_id=b_id, content="reply", parent_id=root.id))
+    db.execute(update(User).values(followers_count=9, following_count=9))
+    db.commit()
+
+    assert client.post("/api/admin/counters/reconcile", headers=a_headers).status_code == 403
+    response = client.post("/api/admin/counters/reconcile", headers=admin_headers)
+    assert response.status_code == 200
+    repaired = response.json()["data"]["repaired"]
+    assert repaired["users"] == {"followers_count": 3, "following_count": 3}
+    assert repaired["comments"] == {"replies_count": 1}
+
+    assert _value(db, User, b_id, "followers_count") == 1
+    assert _value(db, User, a_id, "following_count") == 1
+    assert _value(db, User, admin_id, "followers_count") == 0
+    assert _value(db, Comment, root.id, "replies_count") == 1
+    assert counters.reconcile_all()["users"] == {"followers_count": 0, "following_count": 0}
+
+
+def test_core_status_update_is_reconciled_in_video_counts(db, make_user, make_video):
+    owner_id, _ = make_user("owner")
+    ids = [make_video(owner_id) for _ in range(3)]
+    assert count_videos(db, "approved") == 3
+
+    # Core statements skip the before_flush hook
+    db.execute(update(Video).where(Video.id.in_(ids[:2])).values(status="rejected"))
+    db.commit()
+    assert count_videos(db, "approved") == 3
+
+    assert video_count_reconciler.run() == {"count": 2}
+    db.expire_all()
+    assert count_videos(db, "approved") == 1
+    assert count_videos(db, "rejected") == 2
+    assert video_count_reconciler.run() == {"count": 0}
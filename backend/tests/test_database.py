@@ -0,0 +1,30 @@
+"""
+Database Tests - Handler threads sized to the connection pool
+"""
+
+import pytest
+
+from app.config import get_settings
+from app.database import BACKGROUND_CONNECTIONS, threadpool_workers
+
+settings = get_settings()
+
+
+@pytest.fixture
+def pool_of_30(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 10)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 20)
+    monkeypatch.setattr(settings, "MEDIA_WORKERS", 2)
+
+
+def test_threadpool_defaults_to_the_pool_capacity(monkeypatch, pool_of_30):
+    monkeypatch.setattr(settings, "THREADPOOL_WORKERS", 0)
+    assert threadpool_workers() == 30 - 2 - BACKGROUND_CONNECTIONS
+
+
+def test_threadpool_larger_than_the_pool_is_refused(monkeypatch, pool_of_30):
+    monkeypatch.setattr(settings, "THREADPOOL_WORKERS", 20)
+    assert threadpool_workers() == 20
+    monkeypatch.setattr(settings, "THREADPOOL_WORKERS", 40)
+    with pytest.raises(RuntimeError, match="THREADPOOL_WORKERS=40"):
+        threadpool_workers()
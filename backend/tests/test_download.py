@@ -0,0 +1,64 @@
+"""
+Download Tests - Signed ?token= links and Bearer downloads
+"""
+
+import os
+
+import pytest
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+@pytest.fixture
+def downloadable(make_user, make_video):
+    owner_id, headers = make_user("owner")
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_DIR, "download-test.mp4")
+    with open(path, "wb") as f:
+        f.write(b"0123456789" * 100)
+    video_id = make_video(owner_id, title="Clip", s3_key=path, allow_download=True)
+    return video_id, headers
+
+
+def test_signed_link_downloads_without_headers(client, downloadable):
+    video_id, headers = downloadable
+    link = client.post(f"/api/videos/{video_id}/download-link", headers=headers)
+    assert link.status_code == 200
+    url = link.json()["data"]["url"]
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == b"0123456789" * 100
+    assert response.headers["content-disposition"].startswith("attachment")
+
+    partial = client.get(url, headers={"Range": "bytes=0-9"})
+    assert partial.status_code == 206
+    assert partial.content == b"0123456789"
+
+
+def test_bearer_download_still_works(client, downloadable):
+    video_id, headers = downloadable
+    assert client.get(f"/api/videos/{video_id}/download", headers=headers).status_code == 200
+    assert client.get(f"/api/videos/{video_id}/download").status_code == 401
+
+
+def test_token_is_bound_to_its_video(client, downloadable, make_user, make_video):
+    video_id, headers = downloadable
+    other_owner, _ = make_user("other")
+    other_id = make_video(other_owner, s3_key="./uploads/other.mp4", allow_download=True)
+    url = client.post(f"/api/videos/{video_id}/download-link", headers=headers).json()["data"]["url"]
+    token = url.split("token=", 1)[1]
+
+    assert client.get(f"/api/videos/{other_id}/download?token={token}").status_code == 401
+    # Nor can it stand in for an access token
+    bearer = {"Authorization": f"Bearer {token}"}
+    assert client.get(f"/api/videos/{video_id}/download", headers=bearer).status_code == 401
+    assert client.post(f"/api/videos/{video_id}/download-link", headers=bearer).status_code == 401
+
+
+def test_link_respects_allow_download(client, make_user, make_video):
+    owner_id, headers = make_user("owner")
+    video_id = make_video(owner_id, s3_key="./uploads/x.mp4", allow_download=False)
+    assert client.post(f"/api/videos/{video_id}/download-link", headers=headers).status_code == 403
@@ -0,0 +1,109 @@
+"""
+Following feed: fan-out on approve, read-time merge for large accounts, caps and cursors
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete
+
+from app.models import TimelineEntry, Video
+from app.timelines import timeline_store
+
+T0 = datetime(2026, 1, 1)
+
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    monkeypatch.setattr(timeline_store, "fanout_max_followers", 3)
+    monkeypatch.setattr(timeline_store, "max_entries", 3)
+    monkeypatch.setattr(timeline_store, "follow_backfill", 1)
+
+
+@pytest.fixture
+def accounts(client, make_user, small_limits):
+    """reader follows `normal` (1 follower) and `large` (3 followers: at the fan-out limit)"""
+    users = {name: make_user(name) for name in ("reader", "normal", "large", "fan1", "fan2", "admin")}
+    users["admin"] = make_user("root", role="admin")
+    for follower in ("reader", "fan1", "fan2"):
+        client.post(f"/api/users/{users['large'][0]}/follow", headers=users[follower][1])
+    client.post(f"/api/users/{users['normal'][0]}/follow", headers=users["reader"][1])
+    return users
+
+
+def publish(client, make_video, accounts, owner, title, minute):
+    video_id = make_video(accounts[owner][0], title=title, status="pending", created_at=T0 + timedelta(minutes=minute))
+    response = client.post(f"/api/admin/videos/{video_id}/approve", headers=accounts["admin"][1])
+    assert response.status_code == 200
+    return video_id
+
+
+def read_feed(client, headers, limit=2):
+    titles, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        data = client.get("/api/videos/feed", params=params, headers=headers).json()["data"]
+        titles += [v["title"] for v in data["videos"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            return titles
+
+
+def test_feed_merges_fanned_out_and_large_accounts(client, db, make_video, accounts):
+    for minute, (owner, title) in enumerate([("normal", "n1"), ("large", "l1"), ("normal", "n2"), ("large", "l2")]):
+        publish(client, make_video, accounts, owner, title, minute)
+    # Only the normal account was fanned out
+    assert db.query(TimelineEntry).filter(TimelineEntry.user_id == accounts["reader"][0]).count() == 2
+    assert read_feed(client, accounts["reader"][1]) == ["l2", "n2", "l1", "n1"]
+    # Re-approving doesn't duplicate entries
+    video_id = db.query(Video.id).filter(Video.title == "n2").scalar()
+    client.post(f"/api/admin/videos/{video_id}/approve", headers=accounts["admin"][1])
+    assert read_feed(client, accounts["reader"][1]) == ["l2", "n2", "l1", "n1"]
+
+
+def test_cursor_survives_deleted_anchor(client, db, make_video, accounts):
+    ids = [publish(client, make_video, accounts, "normal", f"n{i}", i) for i in range(4)]
+    first = client.get("/api/videos/feed", params={"limit": 2}, headers=accounts["reader"][1]).json()["data"]
+    assert [v["title"] for v in first["videos"]] == ["n3", "n2"]
+    db.execute(delete(Video).where(Video.id == ids[2]))
+    db.commit()
+    second = client.get(
+        "/api/videos/feed", params={"limit": 2, "cursor": first["next_cursor"]}, headers=accounts["reader"][1]
+    ).json()["data"]
+    assert [v["title"] for v in second["videos"]] == ["n1", "n0"]
+
+
+def test_trim_caps_timelines(client, db, make_video, accounts):
+    for i in range(5):
+        publish(client, make_video, accounts, "normal", f"n{i}", i)
+    assert timeline_store.trim_all() == 2
+    assert read_feed(client, accounts["reader"][1]) == ["n4", "n3", "n2"]
+
+
+def test_follow_backfills_and_unfollow_removes(client, make_video, accounts):
+    publish(client, make_video, accounts, "normal", "n0", 0)
+    publish(client, make_video, accounts, "normal", "n1", 1)
+    fan = accounts["fan1"][1]
+    client.post(f"/api/users/{accounts['normal'][0]}/follow", headers=fan)
+    assert "n1" in read_feed(client, fan) and "n0" not in read_feed(client, fan)
+    client.delete(f"/api/users/{accounts['normal'][0]}/follow", headers=fan)
+    assert read_feed(client, fan) == []
+
+
+def test_fan_out_keeps_the_batch_when_a_follower_already_has_the_entry(client, db, make_video, accounts):
+    # fan1 follows normal too; a concurrent backfill already gave fan1 the video
+    client.post(f"/api/users/{accounts['normal'][0]}/follow", headers=accounts["fan1"][1])
+    video_id = make_video(accounts["normal"][0], title="n0", created_at=T0)
+    db.add(TimelineEntry(user_id=accounts["fan1"][0], video_id=video_id, owner_id=accounts["normal"][0], created_at=T0))
+    db.commit()
+
+    video = db.query(Video).filter(Video.id == video_id).one()
+    assert timeline_store.fan_out(db, video) == 1
+    db.commit()
+    assert {e.user_id for e in db.query(TimelineEntry).filter(TimelineEntry.video_id == video_id)} == {
+        accounts["reader"][0], accounts["fan1"][0],
+    }
+
+
+def test_feed_requires_auth(client):
+    assert client.get("/api/videos/feed").status_code == 401
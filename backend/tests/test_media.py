@@ -0,0 +1,69 @@
+"""
+Media Pipeline Tests - Claiming jobs and recovering abandoned ones
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import update
+
+from app import media
+from app.models import Video
+
+
+@pytest.fixture
+def queued_video(make_user, make_video):
+    owner_id, _ = make_user("owner")
+    return make_video(owner_id, s3_key="./uploads/queued.mp4", processing_status="queued")
+
+
+def _status(db, video_id):
+    db.expire_all()
+    return db.query(Video.processing_status).filter(Video.id == video_id).scalar()
+
+
+def test_second_worker_skips_a_claimed_job(monkeypatch, db, queued_video):
+    runs = []
+
+    def step(step_db, video):
+        runs.append(video.id)
+        # Another worker picks the same job up while this one is running
+        assert media.process_video(video.id) is True
+        assert _status(db, video.id) == "processing"
+
+    monkeypatch.setattr(media, "PIPELINE_STEPS", [step])
+    assert media.process_video(queued_video) is True
+    assert runs == [queued_video]
+    assert _status(db, queued_video) == "ready"
+
+    # Finished jobs are not run again either
+    media.process_video(queued_video)
+    assert runs == [queued_video]
+
+
+def test_failed_step_marks_the_job_failed(monkeypatch, db, queued_video):
+    def step(step_db, video):
+        raise RuntimeError("corrupt file")
+
+    monkeypatch.setattr(media, "PIPELINE_STEPS", [step])
+    assert media.process_video(queued_video) is False
+    assert _status(db, queued_video) == "failed"
+
+
+def test_requeue_recovers_stale_processing_jobs(monkeypatch, db, make_user, make_video, queued_video):
+    owner_id, _ = make_user("other")
+    stale = make_video(owner_id, s3_key="./uploads/stale.mp4", processing_status="processing")
+    running = make_video(owner_id, s3_key="./uploads/running.mp4", processing_status="processing")
+    db.execute(
+        update(Video).where(Video.id == stale)
+        .values(updated_at=datetime.now(timezone.utc) - timedelta(seconds=media.settings.MEDIA_STALE_SECONDS + 60))
+    )
+    db.commit()
+
+    submitted = []
+    monkeypatch.setattr(media.media_pipeline, "submit", lambda video_id: submitted.append(video_id) or True)
+    assert media.media_pipeline.requeue_pending() == 2
+
+    assert sorted(submitted) == sorted([queued_video, stale])
+    assert _status(db, stale) == "queued"
+    assert _status(db, running) == "processing"
@@ -0,0 +1,119 @@
+"""
+Migration Tests - Alembic revisions apply to new and pre-migration databases
+"""
+
+import os
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+
+from app.database import Base
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def scratch_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrations.db'}")
+    yield engine
+    engine.dispose()
+
+
+def _run(engine, fn, *args):
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        fn(config, *args)
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def _current(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+def test_upgrade_and_downgrade_from_empty(scratch_engine):
+    head = _run(scratch_engine, command.upgrade, "head")
+    assert _current(scratch_engine) == head
+    _run(scratch_engine, command.downgrade, "base")
+    _run(scratch_engine, command.upgrade, "head")
+    assert _current(scratch_engine) == head
+
+
+def test_migrations_match_models(scratch_engine):
+    _run(scratch_engine, command.upgrade, "head")
+    with scratch_engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"compare_type": False})
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_upgrade_database_created_before_migrations(scratch_engine):
+    # init_db.py's create_all already made every table and its indexes
+    Base.metadata.create_all(bind=scratch_engine)
+    _run(scratch_engine, command.stamp, "0001")
+    head = _run(scratch_engine, command.upgrade, "head")
+    assert _current(scratch_engine) == head
+
+
+def test_follow_counts_backfilled(scratch_engine):
+    _run(scratch_engine, command.upgrade, "0008")
+    with scratch_engine.begin() as conn:
+        for user_id in ("a", "b", "c"):
+            conn.execute(
+                text("INSERT INTO users (id, email, username, password_hash) VALUES (:id, :id, :id, 'x')"),
+                {"id": user_id},
+            )
+        for i, (follower, following) in enumerate([("a", "b"), ("c", "b"), ("b", "a")]):
+            conn.execute(
+                text("INSERT INTO follows (id, follower_id, following_id) VALUES (:id, :f, :t)"),
+                {"id": str(i), "f": follower, "t": following},
+            )
+    _run(scratch_engine, command.upgrade, "head")
+    with scratch_engine.connect() as conn:
+        counts = dict(
+            (row[0], (row[1], row[2])) for row in
+            conn.execute(text("SELECT id, followers_count, following_count FROM users"))
+        )
+    assert counts == {"a": (1, 1), "b": (2, 1), "c": (0, 1)}
+
+
+def test_timelines_seeded_from_follows(scratch_engine):
+    _run(scratch_engine, command.upgrade, "0009")
+    with scratch_engine.begin() as conn:
+        for user_id in ("fan", "creator"):
+            conn.execute(
+                text("INSERT INTO users (id, email, username, password_hash, followers_count) "
+                     "VALUES (:id, :id, :id, 'x', 0)"),
+                {"id": user_id},
+            )
+        conn.execute(text("INSERT INTO follows (id, follower_id, following_id) VALUES ('f', 'fan', 'creator')"))
+        conn.execute(text("UPDATE users SET followers_count = 1 WHERE id = 'creator'"))
+        for video_id, status in (("v1", "approved"), ("v2", "pending")):
+            conn.execute(
+                text("INSERT INTO videos (id, owner_id, title, status, created_at) "
+                     "VALUES (:id, 'creator', 't', :status, CURRENT_TIMESTAMP)"),
+                {"id": video_id, "status": status},
+            )
+    _run(scratch_engine, command.upgrade, "head")
+    with scratch_engine.connect() as conn:
+        rows = conn.execute(text("SELECT user_id, video_id, owner_id FROM timeline_entries")).all()
+    assert [tuple(r) for r in rows] == [("fan", "v1", "creator")]
+
+
+def test_sqlite_timestamps_get_fractional_seconds(scratch_engine):
+    _run(scratch_engine, command.upgrade, "0010")
+    with scratch_engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, email, username, password_hash, created_at) "
+                          "VALUES ('a', 'a', 'a', 'x', '2026-01-02 03:04:05')"))
+        conn.execute(text("INSERT INTO users (id, email, username, password_hash, created_at) "
+                          "VALUES ('b', 'b', 'b', 'x', '2026-01-02 03:04:05.250000')"))
+    _run(scratch_engine, command.upgrade, "head")
+    with scratch_engine.connect() as conn:
+        rows = dict(conn.execute(text("SELECT id, created_at FROM users")).all())
+    assert rows == {"a": "2026-01-02 03:04:05.000000", "b": "2026-01-02 03:04:05.250000"}
@@ -0,0 +1,115 @@
+"""
+MP4 Tests - Probe, fast-start rewrite and keyframe index on synthetic files
+"""
+
+import io
+import struct
+
+import pytest
+
+from app import mp4
+from mp4_samples import build_mp4
+
+
+def _top_level(data: bytes) -> list[str]:
+    return [box.type for box in mp4.iter_boxes(data)]
+
+
+def _chunk_offsets(data: bytes) -> dict:
+    """{(track index, box type): [chunk offsets]} for every track in the file"""
+    moov, moov_data, _ = mp4.read_moov(io.BytesIO(data))
+    tables = {}
+    traks = [box for box in mp4.iter_boxes(moov_data, moov.header_size) if box.type == "trak"]
+    for i, trak in enumerate(traks):
+        stbl = mp4.find_box(moov_data, "mdia/minf/stbl", trak.payload_offset, trak.end)
+        for box in mp4.iter_boxes(moov_data, stbl.payload_offset, stbl.end):
+            if box.type in ("stco", "co64"):
+                tables[i, box.type] = list(mp4._table(moov_data, box, "I" if box.type == "stco" else "Q"))
+    return tables
+
+
+def _faststart(data: bytes) -> tuple[bool, bytes]:
+    out = io.BytesIO()
+    rewritten = mp4.faststart(io.BytesIO(data), out, chunk_size=64)
+    return rewritten, out.getvalue()
+
+
+def test_probe_reads_the_headers():
+    info = mp4.probe(io.BytesIO(build_mp4(delta=500, video_samples=6, width=1280, height=720)))
+    assert info["duration"] == 3.0
+    assert (info["width"], info["height"]) == (1280, 720)
+    assert info["video_codec"] == "avc1.64001f"
+    assert info["audio_codec"] == "mp4a"
+    assert info["bitrate"] == int(info["size"] * 8 / 3.0)
+    assert info["faststart"] is False
+    assert mp4.probe(io.BytesIO(build_mp4(moov_first=True)))["faststart"] is True
+
+
+def test_probe_rejects_other_files():
+    with pytest.raises(mp4.MP4Error):
+        mp4.probe(io.BytesIO(b"\x00\x00\x00\x10junkjunkjunk" + b"\x00" * 64))
+
+
+@pytest.mark.parametrize("co64", [False, True])
+def test_faststart_moves_moov_and_fixes_chunk_offsets(co64):
+    original = build_mp4(moov_first=False, co64=co64)
+    assert _top_level(original) == ["ftyp", "mdat", "moov"]
+
+    rewritten, data = _faststart(original)
+    assert rewritten is True
+    assert _top_level(data) == ["ftyp", "moov", "mdat"]
+    assert len(data) == len(original)
+
+    before, after = _chunk_offsets(original), _chunk_offsets(data)
+    assert before.keys() == after.keys() == {(0, "co64" if co64 else "stco"), (1, "co64" if co64 else "stco")}
+    for table, offsets in before.items():
+        moved = after[table]
+        assert all(new > old for old, new in zip(offsets, moved))
+        # Every chunk offset still points at the same sample bytes
+        assert [data[o:o + 50] for o in moved] == [original[o:o + 50] for o in offsets]
+    assert mp4.probe(io.BytesIO(data))["faststart"] is True
+
+
+def test_faststart_leaves_fast_start_files_alone():
+    original = build_mp4(moov_first=True)
+    assert _faststart(original) == (False, b"")
+
+
+def test_chunk_offsets_past_4gb_switch_stco_to_co64():
+    original = build_mp4(moov_first=False)
+    moov, data, _ = mp4.read_moov(io.BytesIO(original))
+    with pytest.raises(mp4._NeedsCo64):
+        mp4._rewrite_moov(data, moov, lambda offset: offset + 2 ** 32, force_co64=False)
+
+    rewritten = mp4._rewrite_moov(data, moov, lambda offset: offset + 2 ** 32, force_co64=True)
+    assert b"stco" not in rewritten
+    # Each table grows by 4 bytes per entry: 3 video chunks and 1 audio chunk
+    assert len(rewritten) == moov.size + 4 * 4
+    first = rewritten.index(b"co64") + 12
+    assert struct.unpack_from(">Q", rewritten, first)[0] == _chunk_offsets(original)[0, "stco"][0] + 2 ** 32
+
+
+def test_keyframe_index_uses_sync_samples():
+    data = build_mp4(video_samples=6, samples_per_chunk=2, sync=(1, 4), delta=500)
+    points = mp4.keyframe_index(io.BytesIO(data))
+    assert [time for time, _ in points] == [0.0, 1.5]
+    # Sample 1 opens chunk 1; sample 4 is second in chunk 2, after sample 3 (102 bytes)
+    chunks = _chunk_offsets(data)[0, "stco"]
+    assert [offset for _, offset in points] == [chunks[0], chunks[1] + 102]
+    assert data[points[1][1]:points[1][1] + 103] == bytes([4]) * 103
+
+
+def test_keyframe_index_without_stss_is_thinned():
+    data = build_mp4(video_samples=6, sync=None, delta=500)
+    points = mp4.keyframe_index(io.BytesIO(data), min_spacing=1.0)
+    assert [time for time, _ in points] == [0.0, 1.0, 2.0]
+    assert [data[offset] for _, offset in points] == [1, 3, 5]
+
+
+def test_keyframe_index_follows_faststart():
+    original = build_mp4(moov_first=False)
+    _, data = _faststart(original)
+    before = mp4.keyframe_index(io.BytesIO(original))
+    after = mp4.keyframe_index(io.BytesIO(data))
+    assert [t for t, _ in after] == [t for t, _ in before]
+    assert [data[o] for _, o in after] == [original[o] for _, o in before] == [1, 4]
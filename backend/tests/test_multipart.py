@@ -0,0 +1,80 @@
+"""
+Multipart Upload Tests - Local part uploads, size limits and S3 completion errors
+"""
+
+import os
+
+import pytest
+
+from app import storage
+from app.config import get_settings
+from app.models import Video
+
+settings = get_settings()
+
+
+pytestmark = pytest.mark.usefixtures("no_pipeline")
+
+
+def _start(client, headers, parts: int):
+    init = client.post("/api/videos/init", headers=headers, json={"title": "Big", "multipart": True}).json()["data"]
+    urls = client.post(
+        f"/api/videos/{init['uploadId']}/parts", headers=headers, json={"part_numbers": list(range(1, parts + 1))}
+    ).json()["data"]["parts"]
+    return init, [u["url"] for u in urls]
+
+
+def _complete(client, headers, init):
+    return client.post("/api/videos/complete", headers=headers, json={
+        "uploadId": init["uploadId"], "s3_key": init["s3_key"],
+    })
+
+
+def test_parts_are_joined_in_order(client, db, make_user):
+    _, headers = make_user("owner")
+    init, urls = _start(client, headers, 2)
+    assert client.put(urls[1], content=b"world").status_code == 200
+    assert client.put(urls[0], content=b"hello ").status_code == 200
+
+    response = _complete(client, headers, init)
+    assert response.status_code == 200
+    video = db.query(Video).filter(Video.id == init["uploadId"]).one()
+    assert video.size_bytes == 11
+    with open(video.s3_key, "rb") as f:
+        assert f.read() == b"hello world"
+
+
+def test_oversized_part_is_rejected(client, monkeypatch, make_user):
+    monkeypatch.setattr(settings, "MULTIPART_MAX_PART_SIZE", 100)
+    _, headers = make_user("owner")
+    _, urls = _start(client, headers, 1)
+    assert client.put(urls[0], content=b"x" * 101).status_code == 413
+    assert client.put(urls[0], content=b"x" * 100).status_code == 200
+
+
+def test_oversized_total_is_rejected_before_joining(client, db, monkeypatch, make_user):
+    _, headers = make_user("owner")
+    init, urls = _start(client, headers, 3)
+    for url in urls:
+        client.put(url, content=b"x" * 40)
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 100)
+
+    response = _complete(client, headers, init)
+    assert response.status_code == 413
+    assert not os.path.exists(init["s3_key"])
+    # The upload is left open, so the parts are still listed
+    assert len(client.get(f"/api/videos/{init['uploadId']}/parts", headers=headers).json()["data"]["parts"]) == 3
+
+
+@pytest.mark.parametrize("code,status", [("InvalidPart", 400), ("NoSuchUpload", 400), ("InternalError", 502)])
+def test_s3_completion_errors(monkeypatch, code, status):
+    exceptions = pytest.importorskip("botocore.exceptions")
+
+    class Client:
+        def complete_multipart_upload(self, **kwargs):
+            raise exceptions.ClientError({"Error": {"Code": code, "Message": "no"}}, "CompleteMultipartUpload")
+
+    monkeypatch.setattr(storage, "get_s3_client", lambda: Client())
+    with pytest.raises(storage.HTTPException) as error:
+        storage.s3_multipart.complete("videos/a.mp4", "upload", [{"part_number": 1, "etag": "e"}])
+    assert error.value.status_code == status
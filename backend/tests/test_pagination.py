@@ -0,0 +1,113 @@
+"""
+Keyset cursor pagination on GET /api/videos
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import delete, text, update
+
+from app.cache import feed_cache
+from app.database import engine
+from app.models import Video
+from app.pagination import encode_cursor, seek_after
+
+
+def walk(client, params, between_pages=None):
+    """All titles across cursor pages; between_pages(page_number, data) runs after each page"""
+    titles, cursor, page = [], None, 0
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get("/api/videos", params=query)
+        assert response.status_code == 200, response.text
+        data = response.json()["data"]
+        titles += [v["title"] for v in data["videos"]]
+        page += 1
+        if between_pages:
+            between_pages(page, data)
+        feed_cache.clear()
+        cursor = data["next_cursor"]
+        if not cursor:
+            return titles
+
+
+@pytest.fixture
+def owner(make_user):
+    return make_user("owner")[0]
+
+
+def test_newest_with_equal_timestamps(client, owner, make_video):
+    # Many rows sharing one timestamp, with and without fractional seconds
+    for i in range(7):
+        make_video(owner, title=f"v{i}", created_at=datetime(2026, 1, 1, 12, 0, 0, 500000 * (i % 2)))
+    titles = walk(client, {"limit": 3})
+    assert sorted(titles) == [f"v{i}" for i in range(7)]
+
+
+def test_newest_seek_uses_the_status_created_index(db):
+    cursor = {"sort": "newest", "id": "x", "key": "2026-01-01T12:00:00"}
+    query = (
+        db.query(Video.id)
+        .filter(Video.status == "approved", seek_after(Video, Video.created_at, cursor))
+        .order_by(Video.created_at.desc(), Video.id.desc())
+        .limit(20)
+    )
+    sql = str(query.statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert "ix_videos_status_created_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.parametrize("sort,column", [("popular", "views"), ("likes", "likes_count")])
+def test_anchor_key_changes_between_pages(client, db, owner, make_video, sort, column):
+    ids = {}
+    for i in range(6):
+        ids[f"v{i}"] = make_video(owner, title=f"v{i}", **{column: 100 - i * 10})
+
+    def bump_last_seen(page, data):
+        if page == 1:
+            # The anchor jumps to the top; the next page must not restart from it
+            db.execute(update(Video).where(Video.id == data["videos"][-1]["id"]).values({column: 1000}))
+            db.commit()
+
+    titles = walk(client, {"sort": sort, "limit": 2}, bump_last_seen)
+    assert titles == [f"v{i}" for i in range(6)]
+
+
+def test_anchor_loses_likes(client, db, owner, make_video):
+    for i in range(6):
+        make_video(owner, title=f"v{i}", likes_count=100 - i * 10)
+
+    def drop_last_seen(page, data):
+        if page == 1:
+            db.execute(update(Video).where(Video.id == data["videos"][-1]["id"]).values(likes_count=0))
+            db.commit()
+
+    titles = walk(client, {"sort": "likes", "limit": 2}, drop_last_seen)
+    assert titles[:6] == [f"v{i}" for i in range(6)]
+
+
+def test_deleted_anchor_does_not_end_the_feed(client, db, owner, make_video):
+    for i in range(6):
+        make_video(owner, title=f"v{i}", views=100 - i)
+
+    def delete_last_seen(page, data):
+        if page == 1:
+            db.execute(delete(Video).where(Video.id == data["videos"][-1]["id"]))
+            db.commit()
+
+    titles = walk(client, {"sort": "popular", "limit": 2}, delete_last_seen)
+    assert titles == [f"v{i}" for i in range(6)]
+
+
+@pytest.mark.parametrize("payload", [
+    {"sort": "popular", "id": "x", "key": "not a number"},
+    {"sort": "newest", "id": "x", "key": "not a date"},
+    {"sort": "newest", "id": 5, "key": "2026-01-01T00:00:00"},
+    {"sort": "likes", "id": "x", "key": True},
+    {"sort": "popular", "id": "x"},
+])
+def test_invalid_cursor(client, payload):
+    response = client.get("/api/videos", params={"sort": payload["sort"], "cursor": encode_cursor(payload)})
+    assert response.status_code == 400
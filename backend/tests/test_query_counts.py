@@ -0,0 +1,114 @@
+"""
+Query-count regression guards: list endpoints must not issue one query per row
+"""
+
+import pytest
+
+from datetime import datetime, timedelta
+
+from app.auth import load_principal
+from app.cache import feed_cache
+from app.models import Comment, Playlist, PlaylistVideo
+from app.timelines import timeline_store
+
+ROWS = 5
+
+
+@pytest.fixture
+def populated(db, make_user, make_video):
+    """ROWS videos/comments/playlists, each owned by a different user"""
+    viewer_id, viewer = make_user("viewer")
+    admin_id, admin = make_user("admin", role="admin")
+    video_ids = []
+    for i in range(ROWS):
+        owner_id, _ = make_user(f"owner{i}")
+        video_ids.append(make_video(owner_id, title=f"approved {i}"))
+        make_video(owner_id, title=f"pending {i}", status="pending")
+        db.add(Comment(video_id=video_ids[0], user_id=owner_id, content=f"comment {i}"))
+        playlist = Playlist(user_id=viewer_id, title=f"playlist {i}")
+        db.add(playlist)
+        db.flush()
+        db.add(PlaylistVideo(playlist_id=playlist.id, video_id=video_ids[i]))
+    db.commit()
+    # Authenticated requests then resolve the caller from the principal cache
+    load_principal(db, viewer_id)
+    load_principal(db, admin_id)
+    feed_cache.clear()
+    return {"viewer": viewer, "admin": admin, "video_ids": video_ids}
+
+
+def test_list_videos(client, populated, count_queries):
+    with count_queries() as queries:
+        response = client.get("/api/videos", params={"limit": ROWS})
+    assert len(response.json()["data"]["videos"]) == ROWS
+    assert len(queries) == 2  # page + total
+
+
+def test_list_videos_cursor_page(client, populated, count_queries):
+    first = client.get("/api/videos", params={"limit": 2}).json()["data"]
+    with count_queries() as queries:
+        client.get("/api/videos", params={"limit": 2, "cursor": first["next_cursor"]})
+    assert len(queries) == 1
+
+
+def test_list_videos_with_viewer_state(client, populated, count_queries):
+    with count_queries() as queries:
+        response = client.get(
+            "/api/videos", params={"limit": ROWS, "viewer_state": "true"}, headers=populated["viewer"]
+        )
+    assert all("is_liked" in v for v in response.json()["data"]["videos"])
+    assert len(queries) == 4  # page + total + liked + in playlist
+
+
+def test_following_feed(client, db, monkeypatch, make_user, make_video, count_queries):
+    monkeypatch.setattr(timeline_store, "fanout_max_followers", 2)
+    viewer_id, viewer = make_user("viewer")
+    _, admin = make_user("admin", role="admin")
+    owners = [make_user(f"owner{i}") for i in range(3)]
+    large_id, _ = make_user("large")
+    for owner_id, _ in owners:
+        client.post(f"/api/users/{owner_id}/follow", headers=viewer)
+    for headers in (viewer, admin):
+        client.post(f"/api/users/{large_id}/follow", headers=headers)
+
+    # Fanned-out videos from three owners, interleaved with the large account's
+    t0 = datetime(2026, 1, 1)
+    owner_ids = [large_id] + [owner_id for owner_id, _ in owners]
+    for i in range(ROWS * 2):
+        owner_id = owner_ids[i % 4]
+        video_id = make_video(owner_id, title=f"v{i}", status="pending", created_at=t0 + timedelta(minutes=i))
+        client.post(f"/api/admin/videos/{video_id}/approve", headers=admin)
+    load_principal(db, viewer_id)
+
+    counts = []
+    for limit in (2, ROWS, ROWS * 2):
+        feed_cache.clear()
+        with count_queries() as queries:
+            response = client.get("/api/videos/feed", params={"limit": limit}, headers=viewer)
+        videos = response.json()["data"]["videos"]
+        assert len(videos) == limit
+        counts.append(len(queries))
+    assert {v["owner_id"] for v in videos} == set(owner_ids)
+    # timeline page + large followed accounts + their videos + the page's rows, whatever the page size
+    assert counts == [4, 4, 4]
+
+
+def test_pending_videos(client, populated, count_queries):
+    with count_queries() as queries:
+        response = client.get("/api/admin/pending", headers=populated["admin"])
+    assert len(response.json()["data"]["videos"]) == ROWS
+    assert len(queries) == 2  # admin role re-check + page
+
+
+def test_comments(client, populated, count_queries):
+    with count_queries() as queries:
+        response = client.get(f"/api/videos/{populated['video_ids'][0]}/comments")
+    assert len(response.json()["data"]["comments"]) == ROWS
+    assert len(queries) == 1
+
+
+def test_playlists(client, populated, count_queries):
+    with count_queries() as queries:
+        response = client.get("/api/playlists", headers=populated["viewer"])
+    assert len(response.json()["data"]["playlists"]) == ROWS
+    assert len(queries) == 2  # playlists + grouped video counts
@@ -0,0 +1,71 @@
+"""
+Search: ranked hits, HTML-safe highlights and the Python index's refresh
+"""
+
+import pytest
+from sqlalchemy import update
+
+from app import search
+from app.models import Video
+from app.search import FTS5SearchBackend, PythonSearchBackend, highlight
+
+
+@pytest.fixture(params=["python", "fts5"])
+def backend(request):
+    backend = PythonSearchBackend() if request.param == "python" else FTS5SearchBackend()
+    backend.setup()
+    search._backend = backend
+    return backend
+
+
+@pytest.fixture
+def approve(client, make_user, make_video):
+    _, admin = make_user("admin", role="admin")
+    owner_id, _ = make_user("owner")
+
+    def approve(**fields):
+        video_id = make_video(owner_id, status="pending", **fields)
+        assert client.post(f"/api/admin/videos/{video_id}/approve", headers=admin).status_code == 200
+        return video_id
+    return approve
+
+
+def test_highlight_escapes_stored_markup(client, backend, approve):
+    approve(title="<script>alert(1)</script> cat", description="funny <b>cat</b> & dog")
+    hits = client.get("/api/videos", params={"q": "cat"}).json()["data"]["videos"]
+    assert len(hits) == 1
+    marked = hits[0]["highlight"]
+    assert marked["title"] == "&lt;script&gt;alert(1)&lt;/script&gt; <mark>cat</mark>"
+    assert marked["description"] == "funny &lt;b&gt;<mark>cat</mark>&lt;/b&gt; &amp; dog"
+
+
+def test_highlight_without_match_is_escaped():
+    assert highlight("<i>x</i>", {"cat"}) == "&lt;i&gt;x&lt;/i&gt;"
+
+
+def test_python_index_picks_up_other_workers_changes(client, db, approve):
+    backend = PythonSearchBackend(ttl_seconds=3600)
+    search._backend = backend
+    approve(title="first cat")
+    client.get("/api/videos", params={"q": "cat"})
+
+    # Another worker approves a video: this process's index never hears about it
+    db.execute(update(Video).values(status="approved", title="second cat").where(Video.title == "first cat"))
+    db.commit()
+    assert backend.search(db, "second", 10) == []
+
+    backend.ttl_seconds = 0
+    assert len(backend.search(db, "second", 10)) == 1
+
+
+def test_fts5_setup_repairs_a_partial_index(db, make_user, make_video):
+    owner_id, _ = make_user("owner")
+    first = make_video(owner_id, status="approved", title="first cat")
+    backend = FTS5SearchBackend()
+    backend.setup()
+    # Approved after the index was built, but its index write was lost
+    second = make_video(owner_id, status="approved", title="second cat")
+    assert [hit["id"] for hit in backend.search(db, "cat", 10)] == [first]
+
+    FTS5SearchBackend().setup()
+    assert {hit["id"] for hit in backend.search(db, "cat", 10)} == {first, second}
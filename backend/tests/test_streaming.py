@@ -0,0 +1,114 @@
+"""
+Streaming Tests - Range requests and keyframe seeks
+"""
+
+import json
+import os
+
+import pytest
+
+from app import keyframes, media
+from app.config import get_settings
+from app.keyframes import KEYFRAME_SUFFIX, keyframe_at, keyframe_cache
+from app.routers import videos as videos_router
+from mp4_samples import build_mp4
+
+settings = get_settings()
+
+CONTENT = bytes(range(256)) * 4  # 1024 bytes
+POINTS = [[0.0, 0], [2.0, 100], [4.0, 300]]
+
+
+@pytest.fixture(autouse=True)
+def empty_keyframe_cache():
+    keyframe_cache.clear()
+    yield
+    keyframe_cache.clear()
+
+
+@pytest.fixture
+def local_video(make_user, make_video):
+    owner_id, _ = make_user("owner")
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_DIR, "stream-test.mp4")
+    with open(path, "wb") as f:
+        f.write(CONTENT)
+    with open(path + KEYFRAME_SUFFIX, "w") as f:
+        json.dump({"points": POINTS}, f)
+    yield make_video(owner_id, s3_key=path), path
+    for leftover in (path, path + KEYFRAME_SUFFIX):
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+
+def test_range_requests(client, local_video):
+    video_id, _ = local_video
+    url = f"/api/videos/{video_id}/stream"
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == CONTENT
+
+    partial = client.get(url, headers={"Range": "bytes=10-19"})
+    assert partial.status_code == 206
+    assert partial.content == CONTENT[10:20]
+    assert partial.headers["content-range"] == "bytes 10-19/1024"
+
+    suffix = client.get(url, headers={"Range": "bytes=-4"})
+    assert suffix.content == CONTENT[-4:]
+
+    assert client.get(url, headers={"Range": "bytes=5000-"}).status_code == 416
+
+
+def test_seek_returns_the_preceding_keyframe(client, local_video):
+    video_id, _ = local_video
+    response = client.get(f"/api/videos/{video_id}/seek?t=3")
+    assert response.status_code == 200
+    assert response.json()["data"] == {"time": 2.0, "offset": 100, "stream_url": f"/api/videos/{video_id}/stream"}
+
+    # The stream itself ignores ?t=: a player always needs the file from moov on
+    stream = client.get(f"/api/videos/{video_id}/stream?t=3")
+    assert stream.status_code == 200
+    assert stream.content == CONTENT
+
+
+def test_seek_without_an_index_uses_the_requested_time(client, monkeypatch, make_user, make_video):
+    owner_id, _ = make_user("owner")
+    video_id = make_video(owner_id, s3_key="videos/owner/clip.mp4")
+    sidecar_reads = []
+    monkeypatch.setattr(keyframes, "read_sidecar", lambda key, suffix: sidecar_reads.append(key))
+
+    assert client.get(f"/api/videos/{video_id}/seek?t=3").json()["data"]["time"] == 3
+    assert client.get(f"/api/videos/{video_id}/seek?t=1").json()["data"]["offset"] is None
+    assert sidecar_reads == ["videos/owner/clip.mp4"]
+    assert client.get(f"/api/videos/{video_id}/seek?t=-1").status_code == 422
+
+
+def test_seek_into_a_processed_upload(client, db, make_user, no_pipeline):
+    _, headers = make_user("owner")
+    content = build_mp4(moov_first=False, video_samples=6, samples_per_chunk=2, sync=(1, 4), delta=500)
+    video_id = client.post(
+        "/api/videos/upload-local",
+        headers=headers,
+        data={"title": "Clip"},
+        files={"video": ("clip.mp4", content, "video/mp4")},
+    ).json()["data"]["id"]
+    assert media.process_video(video_id) is True
+
+    seek = client.get(f"/api/videos/{video_id}/seek?t=2.2").json()["data"]
+    assert seek["time"] == 1.5  # sample 4 is the last sync sample before 2.2s
+
+    # The stream a player loads starts with moov, and the offset is sample 4's data
+    stream = client.get(seek["stream_url"])
+    assert [stream.content[4:8], stream.content[36:40]] == [b"ftyp", b"moov"]
+    sample = client.get(seek["stream_url"], headers={"Range": f"bytes={seek['offset']}-{seek['offset'] + 102}"})
+    assert sample.status_code == 206
+    assert sample.content == bytes([4]) * 103
+
+
+def test_missing_index_is_cached(monkeypatch):
+    reads = []
+    monkeypatch.setattr(keyframes, "read_sidecar", lambda key, suffix: reads.append(key))
+    assert keyframe_at("videos/x.mp4", 10) is None
+    assert keyframe_at("videos/x.mp4", 20) is None
+    assert reads == ["videos/x.mp4"]
@@ -0,0 +1,179 @@
+"""
+Upload Tests - Local uploads, the reference-counted blob store and dedup at init
+"""
+
+import hashlib
+import os
+
+import pytest
+
+from app import media
+from app.config import get_settings
+from app.models import Video, VideoBlob
+from mp4_samples import build_mp4
+
+settings = get_settings()
+
+
+pytestmark = pytest.mark.usefixtures("no_pipeline")
+
+
+def _upload(client, headers, content: bytes, title="Clip"):
+    return client.post(
+        "/api/videos/upload-local",
+        headers=headers,
+        data={"title": title, "tags": "a, b", "allow_download": "true"},
+        files={"video": ("clip.mp4", content, "video/mp4")},
+    )
+
+
+def test_local_upload_creates_a_queued_video(client, db, make_user, no_pipeline):
+    _, headers = make_user("owner")
+    response = _upload(client, headers, b"x" * 4096)
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert data["size_bytes"] == 4096
+    assert data["deduplicated"] is False
+    assert no_pipeline == [data["id"]]
+
+    video = db.query(Video).filter(Video.id == data["id"]).one()
+    assert video.status == "pending"
+    assert video.processing_status == "queued"
+    assert video.tags == ["a", "b"]
+    assert video.allow_download is True
+    assert video.content_sha256 == data["sha256"]
+    with open(video.s3_key, "rb") as f:
+        assert f.read() == b"x" * 4096
+
+
+def test_local_upload_requires_a_title(client, make_user):
+    _, headers = make_user("owner")
+    assert _upload(client, headers, b"x", title=" ").status_code == 400
+
+
+def _blob(db, sha256):
+    db.expire_all()
+    return db.query(VideoBlob).filter(VideoBlob.sha256 == sha256).first()
+
+
+def test_identical_uploads_share_one_blob(client, db, make_user):
+    _, headers = make_user("owner")
+    content = os.urandom(10000)
+    first = _upload(client, headers, content).json()["data"]
+    second = _upload(client, headers, content).json()["data"]
+    assert second["deduplicated"] is True
+    assert first["sha256"] == second["sha256"]
+
+    blob = _blob(db, first["sha256"])
+    key = blob.s3_key
+    assert blob.ref_count == 2
+    assert {v.s3_key for v in db.query(Video)} == {key}
+
+    assert client.delete(f"/api/videos/{first['id']}", headers=headers).status_code == 200
+    assert _blob(db, first["sha256"]).ref_count == 1
+    assert os.path.exists(key)
+    # Deleting twice doesn't release twice
+    client.delete(f"/api/videos/{first['id']}", headers=headers)
+    assert _blob(db, first["sha256"]).ref_count == 1
+
+    client.delete(f"/api/videos/{second['id']}", headers=headers)
+    assert _blob(db, first["sha256"]) is None
+    assert not os.path.exists(key)
+
+
+def _init(client, headers, **fields):
+    return client.post("/api/videos/init", headers=headers, json={"title": "Again", **fields})
+
+
+def test_known_file_completes_without_uploading(client, db, make_user):
+    _, headers = make_user("owner")
+    content = os.urandom(200000)
+    sha256 = _upload(client, headers, content).json()["data"]["sha256"]
+
+    unknown = _init(client, headers, sha256="0" * 64, size_bytes=len(content)).json()["data"]
+    assert unknown["dedup"] is None
+    init = _init(client, headers, sha256=sha256, size_bytes=len(content)).json()["data"]
+    challenge = init["dedup"]
+    assert challenge["length"] == settings.DEDUP_PROOF_BYTES
+
+    data = content[challenge["offset"]:challenge["offset"] + challenge["length"]]
+    proof = hashlib.sha256(challenge["nonce"].encode() + data).hexdigest()
+    response = client.post("/api/videos/complete", headers=headers, json={
+        "uploadId": init["uploadId"], "s3_key": init["s3_key"],
+        "dedup_token": challenge["token"], "dedup_proof": proof,
+    })
+    assert response.status_code == 200
+    assert response.json()["data"]["deduplicated"] is True
+
+    video = db.query(Video).filter(Video.id == init["uploadId"]).one()
+    assert video.content_sha256 == sha256
+    assert video.size_bytes == len(content)
+    assert video.processing_status == "queued"
+    assert _blob(db, sha256).ref_count == 2
+    assert video.s3_key == _blob(db, sha256).s3_key
+
+    # The proof is single-use per upload
+    again = client.post("/api/videos/complete", headers=headers, json={
+        "uploadId": init["uploadId"], "s3_key": init["s3_key"],
+        "dedup_token": challenge["token"], "dedup_proof": proof,
+    })
+    assert again.status_code == 409
+
+
+def test_knowing_the_hash_is_not_enough(client, db, make_user):
+    _, owner_headers = make_user("owner")
+    _, headers = make_user("guesser")
+    content = os.urandom(5000)
+    sha256 = _upload(client, owner_headers, content).json()["data"]["sha256"]
+
+    init = _init(client, headers, sha256=sha256, size_bytes=len(content)).json()["data"]
+    response = client.post("/api/videos/complete", headers=headers, json={
+        "uploadId": init["uploadId"], "s3_key": init["s3_key"],
+        "dedup_token": init["dedup"]["token"], "dedup_proof": hashlib.sha256(b"guess").hexdigest(),
+    })
+    assert response.status_code == 400
+    assert _blob(db, sha256).ref_count == 1
+
+
+def test_dedup_proof_covers_the_original_bytes_after_faststart(client, db, make_user):
+    _, headers = make_user("owner")
+    content = build_mp4(moov_first=False)
+    uploaded = _upload(client, headers, content).json()["data"]
+    assert media.process_video(uploaded["id"]) is True
+    with open(_blob(db, uploaded["sha256"]).s3_key, "rb") as f:
+        assert f.read() != content  # moov moved ahead of mdat in place
+
+    init = _init(client, headers, sha256=uploaded["sha256"], size_bytes=len(content)).json()["data"]
+    challenge = init["dedup"]
+    data = content[challenge["offset"]:challenge["offset"] + challenge["length"]]
+    response = client.post("/api/videos/complete", headers=headers, json={
+        "uploadId": init["uploadId"], "s3_key": init["s3_key"],
+        "dedup_token": challenge["token"],
+        "dedup_proof": hashlib.sha256(challenge["nonce"].encode() + data).hexdigest(),
+    })
+    assert response.status_code == 200
+    assert response.json()["data"]["deduplicated"] is True
+    assert _blob(db, uploaded["sha256"]).ref_count == 2
+
+
+def test_deleting_a_queued_upload_removes_its_file(client, db, make_user, make_video):
+    owner_id, headers = make_user("owner")
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    queued_path = os.path.join(settings.UPLOAD_DIR, "queued.mp4")
+    running_path = os.path.join(settings.UPLOAD_DIR, "running.mp4")
+    for path in (queued_path, running_path):
+        with open(path, "wb") as f:
+            f.write(b"x")
+    queued = make_video(owner_id, status="pending", s3_key=queued_path, processing_status="queued")
+    running = make_video(owner_id, status="pending", s3_key=running_path, processing_status="processing")
+
+    client.delete(f"/api/videos/{queued}", headers=headers)
+    assert not os.path.exists(queued_path)
+    db.expire_all()
+    assert db.query(Video.processing_status).filter(Video.id == queued).scalar() is None
+    # The pipeline won't pick it up afterwards
+    assert media.process_video(queued) is True
+
+    # A worker is still reading this one; it cleans up when it finishes
+    client.delete(f"/api/videos/{running}", headers=headers)
+    assert os.path.exists(running_path)
@@ -1,7 +1,7 @@
 'use client';
 
 import { useState, useEffect, useRef, use } from 'react';
-import { useRouter } from 'next/navigation';
+import { useRouter, useSearchParams } from 'next/navigation';
 import api from '@/lib/api';
 import { useAuth } from '@/context/AuthContext';
 import { useToast } from '@/components/Toast';
@@ -21,6 +21,7 @@ export default function WatchPage({ params }) {
     const { user, isLoggedIn } = useAuth();
     const { showToast } = useToast();
     const router = useRouter();
+    const startAt = parseFloat(useSearchParams().get('t'));
 
     useEffect(() => {
         if (videoId) {
@@ -99,6 +100,17 @@ export default function WatchPage({ params }) {
         }
     }
 
+    // "Watch from" links (?t=83): start at the keyframe before that second
+    async function handleLoadedMetadata() {
+        if (!(startAt > 0) || !videoRef.current) return;
+        try {
+            const res = await api.getSeekPoint(videoId, startAt);
+            videoRef.current.currentTime = res.data.time;
+        } catch (error) {
+            videoRef.current.currentTime = startAt;
+        }
+    }
+
     // Keyboard shortcuts
     useEffect(() => {
         function handleKeyDown(e) {
@@ -162,6 +174,7 @@ export default function WatchPage({ params }) {
                         autoPlay
                         className={styles.video}
                         poster={video.thumbnail_url}
+                        onLoadedMetadata={handleLoadedMetadata}
                     >
                         <source src={`${api.baseURL}/api/videos/${videoId}/stream`} type="video/mp4" />
                     </video>
@@ -197,8 +210,7 @@ export default function WatchPage({ params }) {
                                 <button
                                     onClick={async () => {
                                         try {
-                                            const res = await api.downloadVideo(videoId);
-                                            window.open(res.data?.url, '_blank');
+                                            window.location.href = await api.getDownloadUrl(videoId);
                                         } catch (error) {
                                             showToast('Download failed', 'error');
                                         }
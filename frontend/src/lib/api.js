@@ -309,8 +309,15 @@ class APIClient {
         return this.request(`/videos/${id}/stream`);
     }
 
-    async downloadVideo(id) {
-        return this.request(`/videos/${id}/download`);
+    // Keyframe at or before `seconds`, for "watch from" links
+    async getSeekPoint(id, seconds) {
+        return this.request(`/videos/${id}/seek?t=${seconds}`);
+    }
+
+    // Signed, short-lived URL the browser can open without an Authorization header
+    async getDownloadUrl(id) {
+        const res = await this.request(`/videos/${id}/download-link`, { method: 'POST' });
+        return `${this.baseURL}${res.data.url}`;
     }
 
     async deleteVideo(id) {